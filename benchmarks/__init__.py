@@ -0,0 +1,20 @@
+"""
+Benchmarks, run from the project root with the same environment as the server, e.g.
+`python -m benchmarks.fanout`. Results are printed as JSON.
+
+The benchmarks write to the database they run against. With `BENCHMARK_DB_CONNECTION_URL` set they run against
+that database instead of `POSTGRES_DB_CONNECTION_URL`, without replicas, and `benchmarks.data` may reset it freely.
+"""
+import os
+
+import django
+
+
+def setup():
+    url = os.getenv("BENCHMARK_DB_CONNECTION_URL")
+    if url:
+        # before the settings are read, also by the servers the benchmarks start
+        os.environ["POSTGRES_DB_CONNECTION_URL"] = url
+        os.environ["DATABASE_REPLICA_URLS"] = ""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+    django.setup()
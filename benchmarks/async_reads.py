@@ -0,0 +1,116 @@
+"""
+Requests per second and latency of the read endpoints served by the sync viewsets versus the async views,
+with concurrent clients calling the ASGI application in process, on the corpus of `benchmarks.data` with `--quotes`
+quotes. The response cache is bypassed unless `--cache` is given.
+
+    python -m benchmarks.async_reads --concurrency 100 1000 --requests 5000 --path /api/v1/quotes/
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import setup
+from benchmarks.stats import percentile
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+
+from benchmarks import data  # noqa: E402
+
+
+async def request(application, path: str) -> int:
+    path, _, query_string = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"localhost"), (b"accept", b"application/json")],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    disconnected = asyncio.Event()
+    sent_body = False
+    status = None
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Django listens for the disconnect until the response is sent
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    disconnected.set()
+    return status
+
+
+async def run(application, path: str, concurrency: int, requests: int) -> dict:
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            status = await request(application, path)
+            latencies.append(time.perf_counter() - started)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/v1/quotes/")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--cache", action="store_true", help="serve repeated requests from the response cache")
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    data.ensure(args.quotes, reset=args.reset)
+    if not args.cache:
+        settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, "TIMEOUT": 0}
+    application = get_asgi_application()
+
+    async def bench():
+        results = []
+        for async_views in (False, True):
+            settings.ASYNC_READ_VIEWS = async_views
+            await request(application, args.path)  # warm up
+            for concurrency in args.concurrency:
+                result = await run(application, args.path, concurrency, args.requests)
+                results.append({"views": "async" if async_views else "sync", **result})
+        return results
+
+    results = asyncio.run(bench())
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency of a read endpoint under each `DB_CONNECTION_MODE`: a connection per request, persistent connections
+per thread and the pool of `server.db.pool`, with concurrent clients calling the ASGI application in process.
+Each mode runs in its own process, since the mode is read with the settings. Pooling applies to PostgreSQL only.
+
+    python -m benchmarks.connections --concurrency 10 100 --requests 2000 --path /api/v1/quotes/
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import setup
+
+MODES = ("none", "persistent", "pool")
+
+
+def bench(args) -> list[dict]:
+    setup()
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.db import connection
+
+    from benchmarks import data
+    from benchmarks.async_reads import request, run
+    from server import metrics
+
+    data.ensure(args.quotes, reset=args.reset)
+    # the sync views run every request in a new thread, as with daphne, the response cache would hide the queries
+    settings.ASYNC_READ_VIEWS = False
+    settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, "TIMEOUT": 0}
+    application = get_asgi_application()
+
+    async def main():
+        await request(application, args.path)  # warm up
+        results = []
+        for concurrency in args.concurrency:
+            metrics.registry.clear()
+            result = await run(application, args.path, concurrency, args.requests)
+            wait = metrics.DB_POOL_WAIT._series.get(("default",))
+            if wait is not None:
+                result["pool_wait_mean_ms"] = round(wait[1] / max(sum(wait[0]), 1) * 1000, 3)
+            results.append({"mode": os.environ["DB_CONNECTION_MODE"], "engine": connection.vendor, **result})
+        return results
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/v1/quotes/")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    # a module level import would set up django before DB_CONNECTION_MODE is set for the children
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="replace the quotes of the database when it is not the one of BENCHMARK_DB_CONNECTION_URL",
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(bench(args)))
+        return
+    results = []
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.connections", "--child", *sys.argv[1:]],
+            env={**os.environ, "DB_CONNECTION_MODE": mode},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.extend(json.loads(output))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Seeded corpus of authors, tags, quotes and quote stats, the same rows for the same size and seed.
+One author per 20 quotes, one tag per 200 quotes, up to 4 tags per quote.
+
+Replacing the rows of a database other than the benchmark one (see `benchmarks`) takes `--reset`.
+
+    python -m benchmarks.data --size 100k --seed 0
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+import uuid
+
+from benchmarks import setup
+
+setup()
+
+from django.apps import apps  # noqa: E402
+from django.db import connections, transaction  # noqa: E402
+
+from quotes.aggregates import rebuild_counters  # noqa: E402
+from quotes.models import Author, Quote, QuoteStat, Tag  # noqa: E402
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+WORDS = (
+    "life love time world mind heart truth power peace hope fear dream light dark friend enemy nature art "
+    "knowledge wisdom courage freedom happiness success failure change future past present work money war "
+    "beauty death faith god man woman child people history science music book word silence day night "
+    "always never nothing everything learn forget believe remember begin end give take find lose keep"
+).split()
+FIRST_NAMES = ("Mark", "Albert", "Maya", "Oscar", "Jane", "Leo", "Virginia", "Ralph", "Marie", "Seneca")
+LAST_NAMES = ("Twain", "Einstein", "Angelou", "Wilde", "Austen", "Tolstoy", "Woolf", "Emerson", "Curie", "")
+
+
+def parse_size(size: str) -> int:
+    return SIZES.get(size.lower()) or int(size)
+
+
+def corpus_models() -> list:
+    """Every model of the quotes app, including the tables of many to many fields, the referencing ones first."""
+    remaining = list(apps.get_app_config("quotes").get_models(include_auto_created=True))
+    ordered = []
+    while remaining:
+        referenced = {
+            field.related_model for model in remaining for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not model
+        }
+        leaves = [model for model in remaining if model not in referenced] or remaining
+        ordered += leaves
+        remaining = [model for model in remaining if model not in leaves]
+    return ordered
+
+
+def add_reset_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="replace the quotes of the database when it is not the one of BENCHMARK_DB_CONNECTION_URL",
+    )
+
+
+def clear(using: str = "default", reset: bool = False):
+    """
+    Deletes the rows of every quote model with plain statements, without loading rows or sending signals.
+    Refuses to delete any from a database other than the benchmark one unless `reset` is given.
+    """
+    models = corpus_models()
+    if not reset and not os.getenv("BENCHMARK_DB_CONNECTION_URL"):
+        if any(model.objects.using(using).exists() for model in models):
+            raise RuntimeError(
+                f"The {using!r} database holds quotes, set BENCHMARK_DB_CONNECTION_URL to run against a dedicated "
+                f"database or pass --reset to replace them"
+            )
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for model in models:
+            cursor.execute(f"DELETE FROM {connections[using].ops.quote_name(model._meta.db_table)}")
+
+
+def generate(quotes: int, seed: int = 0, batch_size: int = 5000, using: str = "default") -> dict:
+    rng = random.Random(seed)
+
+    def new_id():
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+    authors = [
+        Author(
+            id=new_id(),
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=f"{rng.choice(LAST_NAMES)} {num}".strip(),
+            birth_date=datetime.date(1700, 1, 1) + datetime.timedelta(days=rng.randrange(100_000)),
+        )
+        for num in range(max(1, quotes // 20))
+    ]
+    tags = [Tag(id=new_id(), name=f"{rng.choice(WORDS)}-{num}") for num in range(max(1, quotes // 200))]
+    Author.objects.using(using).bulk_create(authors, batch_size=batch_size)
+    Tag.objects.using(using).bulk_create(tags, batch_size=batch_size)
+
+    for start in range(0, quotes, batch_size):
+        batch = [
+            Quote(
+                id=new_id(),
+                text=" ".join(rng.choices(WORDS, k=rng.randint(5, 25))).capitalize() + ".",
+                author_id=rng.choice(authors).id,
+                random_key=rng.random(),
+            )
+            for _ in range(min(batch_size, quotes - start))
+        ]
+        quote_tags = [
+            Quote.tags.through(quote_id=quote.id, tag_id=tag.id)
+            for quote in batch
+            for tag in rng.sample(tags, min(len(tags), rng.randint(0, 4)))
+        ]
+        # a few popular quotes and a long tail, like real traffic
+        stats = [QuoteStat(id=new_id(), quote_id=quote.id, views=int(rng.paretovariate(1.2)) - 1) for quote in batch]
+        with transaction.atomic(using=using):
+            Quote.objects.using(using).bulk_create(batch)
+            Quote.tags.through.objects.using(using).bulk_create(quote_tags)
+            QuoteStat.objects.using(using).bulk_create(stats)
+    rebuild_counters(using)
+    return {"quotes": quotes, "authors": len(authors), "tags": len(tags), "seed": seed}
+
+
+def ensure(quotes: int, seed: int = 0, using: str = "default", reset: bool = False) -> dict:
+    """Generates the corpus unless the database already holds that many quotes, see `clear` for `reset`."""
+    if Quote.objects.using(using).count() != quotes:
+        clear(using, reset)
+        return generate(quotes, seed, using=using)
+    return {
+        "quotes": quotes,
+        "authors": Author.objects.using(using).count(),
+        "tags": Tag.objects.using(using).count(),
+        "seed": seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help=f"one of {', '.join(SIZES)} or a number of quotes")
+    parser.add_argument("--seed", type=int, default=0)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    clear(reset=args.reset)
+    summary = generate(parse_size(args.size), args.seed)
+    print(json.dumps({**summary, "elapsed": round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
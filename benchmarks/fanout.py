@@ -0,0 +1,81 @@
+"""
+Messages delivered to sockets per published quote, with every socket in the notification room
+versus every socket subscribed to one author. Uses the in-memory channel layer and the real consumer.
+
+    python -m benchmarks.fanout --sockets 1000 --authors 100 --events 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from benchmarks import setup
+
+setup()
+
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from notifications.consumers import AsyncNotificationConsumer  # noqa: E402
+from notifications.outbox import NotificationOutbox, route  # noqa: E402
+
+
+async def connect(query_string: str) -> WebsocketCommunicator:
+    communicator = WebsocketCommunicator(AsyncNotificationConsumer.as_asgi(), f"/ws/notifications?{query_string}")
+    await communicator.connect()
+    return communicator
+
+
+async def count_received(communicator: WebsocketCommunicator) -> int:
+    received = 0
+    while not await communicator.receive_nothing(timeout=0.01):
+        await communicator.receive_from()
+        received += 1
+    return received
+
+
+async def run(scenario: str, sockets: int, author_ids: list[str], events: int) -> dict:
+    communicators = [
+        await connect("" if scenario == "room" else f"authors={random.choice(author_ids)}") for _ in range(sockets)
+    ]
+
+    started = time.perf_counter()
+    for _ in range(events):
+        event = {"kind": "new_quote", "quote_id": str(uuid.uuid4()), "author_id": random.choice(author_ids), "author": None}
+        await NotificationOutbox._send(route([event], {}))
+    publish_elapsed = time.perf_counter() - started
+    delivered = sum([await count_received(communicator) for communicator in communicators])
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    return {
+        "scenario": scenario,
+        "sockets": sockets,
+        "events": events,
+        "delivered": delivered,
+        "delivered_per_event": round(delivered / events, 1),
+        "publish_elapsed": round(publish_elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    # every message has to fit in the channels, the layer drops what exceeds their capacity
+    settings.CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": args.events * 2}}
+    }
+    random.seed(0)
+    author_ids = [str(uuid.uuid4()) for _ in range(args.authors)]
+    results = [asyncio.run(run(scenario, args.sockets, author_ids, args.events)) for scenario in ("room", "topics")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Latency of picking a random quote by seeking on `random_key` versus `order_by("?")`, as the corpus grows.
+Runs on the corpus of `benchmarks.data` generated for every size in turn.
+
+    python -m benchmarks.random_quote --sizes 1000 100000 10000000 --repeat 200
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup
+from benchmarks.stats import percentile
+
+setup()
+
+from benchmarks import data  # noqa: E402
+from quotes.models import Quote  # noqa: E402
+from quotes.sampling import random_quote  # noqa: E402
+
+
+def measure(pick, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pick()
+        timings.append(time.perf_counter() - started)
+    return {"p50_ms": round(percentile(timings, 0.50) * 1000, 3), "p95_ms": round(percentile(timings, 0.95) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--order-by-limit", type=int, default=100000, help="largest size to time order_by('?') on")
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    results = []
+    for size in sorted(args.sizes):
+        data.ensure(size, reset=args.reset)
+        result = {"quotes": Quote.objects.count(), "random_key": measure(lambda: random_quote(Quote.objects.all()), args.repeat)}
+        if size <= args.order_by_limit:
+            result["order_by_random"] = measure(lambda: Quote.objects.order_by("?").first(), max(1, args.repeat // 20))
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Render time of a page of quotes with DRF's `JSONRenderer` versus `FastJSONRenderer`, and the bytes sent
+for the page as JSON and compact JSON, identity and with every encoding available to `CompressionMiddleware`.
+Pages are serialized once, only the rendering and the compression are timed.
+
+    python -m benchmarks.rendering --page-sizes 10 100 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup
+from benchmarks.stats import percentile
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from benchmarks import data  # noqa: E402
+from quotes.models import Quote  # noqa: E402
+from quotes.serializers import QuoteListingSerializer  # noqa: E402
+from server.compression import get_codecs  # noqa: E402
+from server.renderers import CompactJSONRenderer, FastJSONRenderer  # noqa: E402
+
+
+def timed(func, repeat: int) -> float:
+    """The median duration of `func` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(percentile(timings, 0.50) * 1000, 3)
+
+
+def serialize(quotes: list, renderer) -> list:
+    request = Request(APIRequestFactory().get("/api/v1/quotes/"))
+    request.accepted_renderer = renderer
+    return QuoteListingSerializer(quotes, many=True, context={"request": request}).data
+
+
+def measure(quotes: list, repeat: int) -> dict:
+    page = serialize(quotes, FastJSONRenderer())
+    compact_page = serialize(quotes, CompactJSONRenderer())
+    result = {
+        "page_size": len(quotes),
+        "render_ms": {
+            "json_renderer": timed(lambda: JSONRenderer().render(page), repeat),
+            "fast_json_renderer": timed(lambda: FastJSONRenderer().render(page), repeat),
+        },
+        "bytes": {},
+        "compress_ms": {},
+    }
+    variants = {"json": FastJSONRenderer().render(page), "compact": FastJSONRenderer().render(compact_page)}
+    for variant, content in variants.items():
+        result["bytes"][variant] = len(content)
+        for encoding, compress in get_codecs().items():
+            level = settings.COMPRESSION["LEVELS"][encoding]
+            result["bytes"][f"{variant}+{encoding}"] = len(compress(content, level))
+            result["compress_ms"][f"{variant}+{encoding}"] = timed(lambda: compress(content, level), repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    largest = max(args.page_sizes)
+    if Quote.objects.count() < largest:
+        data.ensure(max(largest, 1000), reset=args.reset)
+    quotes = list(Quote.objects.select_related("stat")[:largest])
+    print(json.dumps([measure(quotes[:page_size], args.repeat) for page_size in args.page_sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
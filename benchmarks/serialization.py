@@ -0,0 +1,58 @@
+"""
+Time spent serializing a page of quotes with `QuoteSerializer` versus `QuoteListingSerializer`,
+with every field and with `?fields=id,text`. Rows are loaded once, only the serialization is timed.
+
+    python -m benchmarks.serialization --page-size 100 --repeat 200
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup
+from benchmarks.stats import percentile
+
+setup()
+
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from benchmarks import data  # noqa: E402
+from quotes.models import Quote  # noqa: E402
+from quotes.serializers import QuoteSerializer, QuoteListingSerializer  # noqa: E402
+
+
+def measure(serializer_class, quotes: list, repeat: int, fields=None) -> dict:
+    request = Request(APIRequestFactory().get("/api/v1/quotes/"))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serializer_class(quotes, many=True, context={"request": request}, fields=fields).data
+        timings.append(time.perf_counter() - started)
+    return {
+        "serializer": serializer_class.__name__,
+        "fields": ",".join(fields) if fields else "all",
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    if Quote.objects.count() < args.page_size:
+        data.ensure(max(args.page_size, 1000), reset=args.reset)
+    quotes = list(Quote.objects.select_related("author", "stat")[:args.page_size])
+    results = [
+        measure(serializer_class, quotes, args.repeat, fields)
+        for fields in (None, ("id", "text"))
+        for serializer_class in (QuoteSerializer, QuoteListingSerializer)
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_summary(timings: list[float], digits: int = 2) -> dict:
+    """p50, p95 and p99 of `timings` in seconds, reported in milliseconds."""
+    return {
+        f"p{int(fraction * 100)}_ms": round(percentile(timings, fraction) * 1000, digits)
+        for fraction in (0.50, 0.95, 0.99)
+    }
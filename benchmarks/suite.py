@@ -0,0 +1,227 @@
+"""
+Drives the API endpoints in process against a seeded corpus (see `benchmarks.data`) and reports,
+per endpoint, throughput, p50/p95/p99 latency and SQL query counts as JSON. Writes are rolled back,
+so runs on the same corpus are comparable. With `--baseline`, exits with 1 when an endpoint got slower
+than the tolerance allows or runs more queries than in the baseline.
+
+    python -m benchmarks.suite --size 10k --output bench.json
+    python -m benchmarks.suite --size 10k --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks import setup
+from benchmarks.stats import latency_summary
+
+setup()
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks import data  # noqa: E402
+from quotes.models import Author, Quote, Tag  # noqa: E402
+
+
+@dataclass
+class Sample:
+    """Ids and words the requests are built from, drawn once from the corpus."""
+    quote_ids: list
+    author_ids: list
+    tag_ids: list
+    first_names: list
+
+    @classmethod
+    def load(cls, size: int = 1000) -> "Sample":
+        return cls(
+            quote_ids=list(Quote.objects.order_by("random_key").values_list("id", flat=True)[:size]),
+            author_ids=list(Author.objects.values_list("id", flat=True)[:size]),
+            tag_ids=list(Tag.objects.values_list("id", flat=True)[:size]),
+            first_names=list(Author.objects.order_by().values_list("first_name", flat=True).distinct()[:size]),
+        )
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: Callable[[Sample, random.Random], str]
+    method: str = "get"
+    body: Callable[[Sample, random.Random], dict] | None = None
+
+    @property
+    def writes(self) -> bool:
+        return self.method != "get"
+
+
+def _ids(ids: list, rng: random.Random, count: int) -> str:
+    return ",".join(str(object_id) for object_id in rng.sample(ids, min(count, len(ids))))
+
+
+def _quote_body(sample: Sample, rng: random.Random) -> dict:
+    return {
+        "text": " ".join(rng.choices(data.WORDS, k=8)),
+        "author": reverse("author-detail", kwargs={"author_id": rng.choice(sample.author_ids)}),
+        "tags": [str(tag_id) for tag_id in rng.sample(sample.tag_ids, min(2, len(sample.tag_ids)))],
+    }
+
+
+ENDPOINTS = (
+    Endpoint("quotes.list", lambda s, r: reverse("quote-list")),
+    Endpoint("quotes.list.page_50", lambda s, r: f"{reverse('quote-list')}?page=50"),
+    Endpoint("quotes.list.keyset", lambda s, r: f"{reverse('quote-list')}?pagination=keyset"),
+    Endpoint("quotes.retrieve", lambda s, r: reverse("quote-detail", kwargs={"quote_id": r.choice(s.quote_ids)})),
+    Endpoint("quotes.search", lambda s, r: f"{reverse('quote-list')}?search={r.choice(data.WORDS)}"),
+    Endpoint("quotes.filter.tags_any", lambda s, r: f"{reverse('quote-list')}?tags_any={_ids(s.tag_ids, r, 3)}"),
+    Endpoint("quotes.filter.tags_all", lambda s, r: f"{reverse('quote-list')}?tags_all={_ids(s.tag_ids, r, 2)}"),
+    Endpoint("quotes.filter.author", lambda s, r: f"{reverse('quote-list')}?author_id={_ids(s.author_ids, r, 1)}"),
+    Endpoint("quotes.ordering", lambda s, r: f"{reverse('quote-list')}?ordering=created_at"),
+    Endpoint("quotes.random", lambda s, r: reverse("quote-random")),
+    Endpoint("quotes.trending", lambda s, r: f"{reverse('quote-trending')}?window={r.choice(('1h', '24h', '7d'))}"),
+    Endpoint("quotes.create", lambda s, r: reverse("quote-list"), method="post", body=_quote_body),
+    Endpoint("authors.list", lambda s, r: reverse("author-list")),
+    Endpoint("authors.retrieve", lambda s, r: reverse("author-detail", kwargs={"author_id": r.choice(s.author_ids)})),
+    Endpoint("authors.search", lambda s, r: f"{reverse('author-list')}?search={r.choice(s.first_names)}"),
+    Endpoint(
+        "authors.autocomplete",
+        lambda s, r: f"{reverse('author-autocomplete')}?q={r.choice(s.first_names)[:r.randint(1, 4)]}"
+    ),
+    Endpoint("authors.top", lambda s, r: f"{reverse('author-top')}?by={r.choice(('quotes', 'views'))}"),
+    Endpoint("tags.list", lambda s, r: reverse("tag-list")),
+    Endpoint("tags.retrieve", lambda s, r: reverse("tag-detail", kwargs={"tag_id": r.choice(s.tag_ids)})),
+    Endpoint("tags.autocomplete", lambda s, r: f"{reverse('tag-autocomplete')}?q={r.choice(data.WORDS)[:2]}"),
+    Endpoint("tags.top", lambda s, r: reverse("tag-top")),
+)
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def run_endpoint(client: APIClient, endpoint: Endpoint, sample: Sample, requests: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    timings, queries, errors = [], [], 0
+    for num in range(warmup + requests):
+        path = endpoint.path(sample, rng)
+        body = endpoint.body(sample, rng) if endpoint.body else None
+        with rolled_back() if endpoint.writes else nullcontext(), CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, endpoint.method)(path, body, format="json")
+            elapsed = time.perf_counter() - started
+        if num < warmup:
+            continue
+        timings.append(elapsed)
+        queries.append(len(captured))
+        errors += response.status_code >= 400
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / sum(timings), 1),
+        **latency_summary(timings),
+        "queries_mean": round(sum(queries) / len(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Describes every endpoint slower at p95 than the baseline plus `tolerance`, or running more queries."""
+    regressions = []
+    for name, result in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["queries_max"] > before["queries_max"]:
+            regressions.append(f"{name}: queries {before['queries_max']} -> {result['queries_max']}")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def get_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help=f"one of {', '.join(data.SIZES)} or a number of quotes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--endpoints", nargs="*", help="names or prefixes of the endpoints to run, e.g. quotes.list")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--output", help="file to write the results to, they are printed otherwise")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown, 0.25 is 25%%")
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    if not args.cache:
+        settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, "TIMEOUT": 0}
+    # views stay in the buffer instead of being written by a background thread during the run
+    settings.VIEW_COUNTER = {**settings.VIEW_COUNTER, "FLUSH_INTERVAL": 0}
+
+    corpus = data.ensure(data.parse_size(args.size), args.seed, reset=args.reset)
+    sample = Sample.load()
+    client = APIClient()
+    endpoints = [
+        endpoint for endpoint in ENDPOINTS
+        if not args.endpoints or any(endpoint.name.startswith(prefix) for prefix in args.endpoints)
+    ]
+
+    results = {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": get_revision(),
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "async_read_views": settings.ASYNC_READ_VIEWS,
+            "response_cache": args.cache,
+            "corpus": corpus,
+        },
+        "endpoints": {
+            endpoint.name: run_endpoint(client, endpoint, sample, args.requests, args.warmup, args.seed)
+            for endpoint in endpoints
+        },
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(json.load(file), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
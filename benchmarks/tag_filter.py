@@ -0,0 +1,66 @@
+"""
+Latency of the quote listing filtered by 1, 5 and 20 tags, with `tags_any` and `tags_all`,
+measured on the count and first page queries built by `ListFilter`, on the corpus of `benchmarks.data`
+with `--quotes` quotes (one tag per 200 quotes, up to 4 tags per quote).
+
+    python -m benchmarks.tag_filter --quotes 100000 --repeat 20
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks import setup
+from benchmarks.stats import percentile
+
+setup()
+
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from benchmarks import data  # noqa: E402
+from quotes.filters import ListFilter  # noqa: E402
+from quotes.models import Tag  # noqa: E402
+from quotes.views import QuoteModelViewSet  # noqa: E402
+
+
+def measure(param: str, tag_ids: list, repeat: int) -> dict:
+    factory = APIRequestFactory()
+    timings = []
+    for _ in range(repeat):
+        request = Request(factory.get("/", {param: ",".join(map(str, tag_ids))}))
+        started = time.perf_counter()
+        queryset = ListFilter().filter_queryset(request, QuoteModelViewSet.queryset, QuoteModelViewSet)
+        count = queryset.count()
+        list(queryset[:10])
+        timings.append(time.perf_counter() - started)
+    return {
+        "param": param,
+        "tags": len(tag_ids),
+        "matches": count,
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    data.add_reset_argument(parser)
+    args = parser.parse_args()
+
+    data.ensure(args.quotes, reset=args.reset)
+    random.seed(0)
+    tag_ids = sorted(Tag.objects.values_list("id", flat=True))
+    results = [
+        measure(param, random.sample(tag_ids, size), args.repeat)
+        for param in ("tags_any", "tags_all")
+        for size in (1, 5, 20)
+        if size <= len(tag_ids)
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
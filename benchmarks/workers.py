@@ -0,0 +1,134 @@
+"""
+Requests per second of the server run by `server.supervisor` with each number of workers, loaded over HTTP
+keep-alive connections by `--client-processes` separate processes. The workers serve the configured database,
+`RESPONSE_CACHE_TIMEOUT=0` is set unless `--cache` is given. Throughput only scales up to the number of CPUs,
+the load generator included.
+
+    python -m benchmarks.workers --workers 1 2 4 --concurrency 64 --requests 5000 --path /api/v1/quotes/
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.stats import percentile
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(reader, writer, request: bytes) -> int:
+    writer.write(request)
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("closed by the server")
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def load(port: int, path: str, connections: int, requests: int) -> tuple[list[float], int]:
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: application/json\r\n\r\n".encode()
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(reader, writer, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # e.g. a worker restarting, reconnect
+                status = None
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            latencies.append(time.perf_counter() - started)
+            errors += status != 200
+        writer.close()
+
+    await asyncio.gather(*[client() for _ in range(connections)])
+    return latencies, errors
+
+
+def load_process(arguments: tuple) -> tuple[list[float], int]:
+    return asyncio.run(load(*arguments))
+
+
+def wait_until_ready(port: int, path: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, errors = asyncio.run(load(port, path, 1, 1))
+            if not errors:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"The server did not answer {path} within {timeout}s.")
+        time.sleep(0.5)
+
+
+def bench(workers: int, args) -> dict:
+    port = free_port()
+    env = dict(os.environ)
+    if not args.cache:
+        env["RESPONSE_CACHE_TIMEOUT"] = "0"
+    command = [sys.executable, "-m", "server.supervisor", "--bind", "127.0.0.1", "--port", str(port)]
+    supervisor = subprocess.Popen([*command, "--workers", str(workers)], env=env, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, args.path)
+        # warm up every worker
+        load_process((port, args.path, workers * 2, workers * 20))
+        processes = args.client_processes
+        with multiprocessing.Pool(processes) as pool:
+            started = time.perf_counter()
+            shares = pool.map(
+                load_process,
+                [(port, args.path, max(args.concurrency // processes, 1), args.requests // processes)] * processes,
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        supervisor.send_signal(signal.SIGTERM)
+        supervisor.wait()
+    latencies = [latency for share, _ in shares for latency in share]
+    return {
+        "workers": workers,
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in shares),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/api/v1/quotes/")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--cache", action="store_true", help="serve repeated requests from the response cache")
+    args = parser.parse_args()
+
+    print(json.dumps([bench(workers, args) for workers in args.workers], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,73 @@
 import json
+from urllib.parse import parse_qs
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
 from django.utils.encoding import force_str
 from django.utils.translation import gettext_lazy as _
 
+from notifications.utils import TOPIC_KINDS, topic_group
+
 
 class AsyncNotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Sockets receive every notification unless they subscribe to topics, either with query params
+    (`?authors=<id>,<id>&tags=<id>`) or with `{"action": "subscribe", "authors": [...], "tags": [...]}` messages.
+    `{"action": "subscribe", "all": true}` subscribes to everything again.
+    A quote matching several topics of a socket is sent once per topic, its `quote_id` tells them apart.
+    """
     room = settings.NOTIFICATION_ROOM
     ERRORS = {
         "default_message": _("Something went wrong!"),
-        "receive_not_implement": _("You cannot send anything to this room!")
+        "invalid_message": _("Expected {\"action\": \"subscribe\" or \"unsubscribe\", \"authors\": [...], \"tags\": [...]}."),
+        "invalid_topic": _("Topics must be lists of ids."),
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subscriptions = set()
+
+    @staticmethod
+    def _get_topic_groups(topics: dict) -> set[str]:
+        groups = set()
+        for kind in TOPIC_KINDS:
+            ids = topics.get(kind) or []
+            if not isinstance(ids, list):
+                raise ValueError
+            groups.update(topic_group(kind, object_id) for object_id in ids)
+        if topics.get("all"):
+            groups.add(settings.NOTIFICATION_ROOM)
+        return groups
+
+    def _get_query_topics(self) -> dict:
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        topics = {
+            kind: [object_id for value in query.get(kind, []) for object_id in value.split(",") if object_id]
+            for kind in TOPIC_KINDS
+        }
+        topics["all"] = query.get("all", ["0"])[-1] in ("1", "true")
+        return topics
+
+    async def _subscribe(self, groups: set[str]):
+        for group in groups - self.subscriptions:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.subscriptions |= groups
+
+    async def _unsubscribe(self, groups: set[str]):
+        for group in groups & self.subscriptions:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions -= groups
+
     async def connect(self):
-        await self.channel_layer.group_add(self.room, self.channel_name)
+        try:
+            groups = self._get_topic_groups(self._get_query_topics())
+        except ValueError:
+            groups = set()
+        await self._subscribe(groups or {self.room})
         await self.accept()
 
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(self.room, self.channel_name)
+        await self._unsubscribe(set(self.subscriptions))
 
     async def send_message(self, event):
         await self.send(text_data=json.dumps(event['data']))
@@ -29,10 +78,29 @@ class AsyncNotificationConsumer(AsyncWebsocketConsumer):
         elif not reason:
             reason = self.ERRORS["default_message"]
 
-        await self.channel_layer.group_send(
-            self.room,
-            {'type': 'send_message', 'data': {"type": "error", "reason": force_str(reason)}}
-        )
+        await self.send(text_data=json.dumps({"type": "error", "reason": force_str(reason)}))
 
     async def receive(self, text_data=None, bytes_data=None):
-        await self.send_error_message(reason_key="receive_not_implement")
+        try:
+            message = json.loads(text_data or "")
+            action = message["action"]
+            if action not in ("subscribe", "unsubscribe"):
+                raise KeyError
+        except (ValueError, TypeError, KeyError):
+            await self.send_error_message(reason_key="invalid_message")
+            return
+
+        try:
+            groups = self._get_topic_groups(message)
+        except ValueError:
+            await self.send_error_message(reason_key="invalid_topic")
+            return
+
+        if action == "subscribe":
+            if self.room in self.subscriptions and groups - {self.room}:
+                # the first topic replaces the default subscription to everything
+                await self._unsubscribe({self.room})
+            await self._subscribe(groups)
+        else:
+            await self._unsubscribe(groups)
+        await self.send(text_data=json.dumps({"type": "subscriptions", "groups": sorted(self.subscriptions)}))
@@ -0,0 +1,160 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from notifications.utils import build_event, topic_group
+from quotes.models import Quote
+
+logger = logging.getLogger(__name__)
+
+
+def coalesce(events: list[dict]) -> list[dict]:
+    """Folds the new quote events of a window into one notification, other events are kept as they are."""
+    new_quotes = [event for event in events if event["kind"] == "new_quote"]
+    notifications = [event["data"] for event in events if event["kind"] == "notification"]
+
+    if len(new_quotes) == 1:
+        event = new_quotes[0]
+        text = f"Created a new quote from {event['author']}" if event["author"] else "Created a new quote"
+        notifications.insert(0, build_event(text, quote_id=event["quote_id"]))
+    elif new_quotes:
+        notifications.insert(0, build_event(
+            f"Created {len(new_quotes)} new quotes",
+            quote_ids=[event["quote_id"] for event in new_quotes]
+        ))
+    return notifications
+
+
+def route(events: list[dict], quote_tags: dict[str, list]) -> list[tuple[str, dict]]:
+    """
+    Pairs every notification with the group it is sent to: the room of the sockets following everything
+    gets all of them, the group of an author or a tag only gets the new quotes of that topic.
+    """
+    messages = [(settings.NOTIFICATION_ROOM, data) for data in coalesce(events)]
+
+    topics = defaultdict(list)
+    for event in events:
+        if event["kind"] != "new_quote":
+            continue
+        topics[topic_group("authors", event["author_id"])].append(event)
+        for tag_id in quote_tags.get(event["quote_id"], ()):
+            topics[topic_group("tags", tag_id)].append(event)
+
+    for group, group_events in topics.items():
+        messages.extend((group, data) for data in coalesce(group_events))
+    return messages
+
+
+def get_quote_tags(events: list[dict]) -> dict[str, list]:
+    quote_ids = [event["quote_id"] for event in events if event["kind"] == "new_quote"]
+    quote_tags = defaultdict(list)
+    if quote_ids:
+        for quote_id, tag_id in Quote.tags.through.objects.filter(quote_id__in=quote_ids).values_list("quote_id", "tag_id"):
+            quote_tags[str(quote_id)].append(tag_id)
+    return quote_tags
+
+
+class OutboxWorker(threading.Thread):
+    def __init__(self, outbox: "NotificationOutbox", window: float):
+        super().__init__(name="notification-outbox", daemon=True)
+        self.outbox = outbox
+        self.window = window
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                first = self.outbox.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            # let the rest of the burst arrive before publishing
+            self.stopped.wait(self.window)
+            self.outbox.publish([*first, *self.outbox.drain()])
+            close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class NotificationOutbox:
+    """
+    Collects events once their transaction commits and publishes them from a background worker,
+    every `window` seconds at most, so writes never wait on the channel layer.
+    Without a window there is no worker and events wait for `flush()`.
+    """
+
+    def __init__(self, window: float = 0, max_batch: int = 1000):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def put(self, kind: str, **event) -> None:
+        self.put_many(kind, [event])
+
+    def put_many(self, kind: str, events: list[dict]) -> None:
+        """Queues events which are always published together, e.g. the quotes of one bulk write."""
+        self.queue.put([{"kind": kind, **event} for event in events])
+        if self.window and self._worker is None:
+            self._start_worker()
+
+    def drain(self) -> list[dict]:
+        events = []
+        while len(events) < self.max_batch:
+            try:
+                events.extend(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def publish(self, events: list[dict]) -> None:
+        try:
+            async_to_sync(self._send)(route(events, get_quote_tags(events)))
+        except Exception:
+            logger.exception("Failed to publish %s notification events", len(events))
+
+    @staticmethod
+    async def _send(messages: list[tuple[str, dict]]) -> None:
+        channel_layer = get_channel_layer()
+        for group, data in messages:
+            await channel_layer.group_send(group, {"type": "send_message", "data": data})
+
+    def flush(self) -> None:
+        while events := self.drain():
+            self.publish(events)
+
+    def _start_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = OutboxWorker(self, self.window)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+
+@lru_cache(maxsize=None)
+def get_notification_outbox() -> NotificationOutbox:
+    config = settings.NOTIFICATION_OUTBOX
+    return NotificationOutbox(window=config.get("WINDOW", 0), max_batch=config.get("MAX_BATCH", 1000))
+
+
+@receiver(setting_changed)
+def reset_notification_outbox(setting, **kwargs):
+    if setting == "NOTIFICATION_OUTBOX" and get_notification_outbox.cache_info().currsize:
+        get_notification_outbox().stop()
+        get_notification_outbox.cache_clear()
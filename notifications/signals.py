@@ -1,14 +1,36 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from notifications.utils import send_notification
+from notifications.outbox import get_notification_outbox
+from notifications.utils import build_event
 from quotes.models import Quote
+from quotes.signals import quotes_imported, quotes_bulk_written
 
 
 @receiver(post_save, sender=Quote)
 def notification_on_new_quote(sender, instance, created, **kwargs):
     if created:
-        send_notification(
-            f"Created a new quote from {instance.author.full_name}",
-            quote_id=str(instance.id)
-        )
+        # the author is only named when already loaded, the notification is not worth a query
+        author = instance.author.full_name if Quote.author.is_cached(instance) else None
+        transaction.on_commit(lambda: get_notification_outbox().put(
+            "new_quote", quote_id=str(instance.id), author_id=str(instance.author_id), author=author
+        ))
+
+
+@receiver(quotes_imported)
+def notification_on_quotes_import(sender, report, **kwargs):
+    get_notification_outbox().put(
+        "notification", data=build_event(f"Imported {report.created} new quotes", count=report.created)
+    )
+
+
+@receiver(quotes_bulk_written)
+def notification_on_bulk_write(sender, created, **kwargs):
+    events = [
+        {"quote_id": str(quote.id), "author_id": str(quote.author_id), "author": quote.author.full_name}
+        for quote in created
+    ]
+    if events:
+        # published together, as one notification per group
+        transaction.on_commit(lambda: get_notification_outbox().put_many("new_quote", events))
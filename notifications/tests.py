@@ -0,0 +1,145 @@
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from notifications.consumers import AsyncNotificationConsumer
+from notifications.outbox import get_notification_outbox, coalesce, route
+from notifications.utils import topic_group
+from quotes.bulk import QuoteBulkWriter
+from quotes.models import Author, Quote, Tag
+
+IN_MEMORY_CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+MANUAL_OUTBOX = {"WINDOW": 0, "MAX_BATCH": 1000}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, NOTIFICATION_OUTBOX=MANUAL_OUTBOX)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.outbox = get_notification_outbox()
+
+    def test_coalesce(self):
+        single = coalesce([{"kind": "new_quote", "quote_id": "1", "author_id": "2", "author": "John Doe"}])
+        self.assertEqual(single, [{"type": "notification", "text": "Created a new quote from John Doe", "quote_id": "1"}])
+
+        events = [{"kind": "new_quote", "quote_id": str(num), "author_id": "2", "author": None} for num in range(3)]
+        self.assertEqual(
+            coalesce(events),
+            [{"type": "notification", "text": "Created 3 new quotes", "quote_ids": ["0", "1", "2"]}]
+        )
+
+    def test_events_wait_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Quote.objects.create(author=self.author, text="Some text number one")
+        self.assertEqual(self.outbox.drain(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.outbox.drain()[0]["author"], "John Doe")
+
+    async def test_burst_is_published_once(self):
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(settings.NOTIFICATION_ROOM, channel)
+
+        def create_quotes():
+            with self.captureOnCommitCallbacks(execute=True):
+                for num in range(5):
+                    Quote.objects.create(author=self.author, text=f"Some text number {num}")
+            self.outbox.flush()
+
+        await sync_to_async(create_quotes)()
+        message = await channel_layer.receive(channel)
+        self.assertEqual(message["data"]["text"], "Created 5 new quotes")
+        self.assertEqual(len(message["data"]["quote_ids"]), 5)
+
+    def test_bulk_write_is_one_batch(self):
+        self.outbox.put("notification", data={"text": "queued before"})
+        items = [{"text": f"Some text number {num}", "author": self.author.id} for num in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            QuoteBulkWriter(items).write()
+
+        # the quotes of a bulk write are never split across publications
+        self.addCleanup(setattr, self.outbox, "max_batch", self.outbox.max_batch)
+        self.outbox.max_batch = 2
+        events = self.outbox.drain()
+        self.assertEqual(len(events), 4)
+        self.assertEqual(coalesce(events)[0]["text"], "Created 3 new quotes")
+
+    def test_route(self):
+        other_author_id = "00000000-0000-0000-0000-000000000002"
+        tag_id = "00000000-0000-0000-0000-000000000003"
+        events = [
+            {"kind": "new_quote", "quote_id": "1", "author_id": str(self.author.id), "author": None},
+            {"kind": "new_quote", "quote_id": "2", "author_id": other_author_id, "author": None},
+        ]
+        messages = dict(route(events, {"2": [tag_id]}))
+        self.assertEqual(messages[settings.NOTIFICATION_ROOM]["quote_ids"], ["1", "2"])
+        self.assertEqual(messages[topic_group("authors", self.author.id)]["quote_id"], "1")
+        self.assertEqual(messages[topic_group("authors", other_author_id)]["quote_id"], "2")
+        self.assertEqual(messages[topic_group("tags", tag_id)]["quote_id"], "2")
+        self.assertEqual(len(messages), 4)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, NOTIFICATION_OUTBOX=MANUAL_OUTBOX)
+class ConsumerTests(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.other_author = Author.objects.create(first_name='Jane', last_name='Doe', birth_date='1990-01-01')
+        self.tag = Tag.objects.create(name="Test")
+
+    @staticmethod
+    async def connect(query_string=""):
+        communicator = WebsocketCommunicator(AsyncNotificationConsumer.as_asgi(), f"/ws/notifications?{query_string}")
+        connected, _ = await communicator.connect()
+        assert connected
+        return communicator
+
+    async def create_quotes(self):
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                quote = Quote.objects.create(author=self.author, text="Some text number one")
+                quote.tags.add(self.tag)
+                Quote.objects.create(author=self.other_author, text="Some text number two")
+            get_notification_outbox().flush()
+        await sync_to_async(create)()
+
+    async def test_topics_from_query_params(self):
+        everything = await self.connect()
+        by_author = await self.connect(f"authors={self.other_author.id}")
+        by_tag = await self.connect(f"tags={self.tag.id}")
+        await self.create_quotes()
+
+        self.assertEqual((await everything.receive_json_from())["text"], "Created 2 new quotes")
+        self.assertEqual((await by_author.receive_json_from())["text"], "Created a new quote from Jane Doe")
+        self.assertEqual((await by_tag.receive_json_from())["text"], "Created a new quote from John Doe")
+        for communicator in (everything, by_author, by_tag):
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+    async def test_subscribe_message(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({"action": "subscribe", "authors": [str(self.author.id)]})
+        reply = await communicator.receive_json_from()
+        self.assertEqual(reply, {"type": "subscriptions", "groups": [topic_group("authors", self.author.id)]})
+
+        await self.create_quotes()
+        self.assertEqual((await communicator.receive_json_from())["text"], "Created a new quote from John Doe")
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"action": "subscribe", "all": True})
+        reply = await communicator.receive_json_from()
+        self.assertIn(settings.NOTIFICATION_ROOM, reply["groups"])
+        await communicator.disconnect()
+
+    async def test_errors_are_sent_to_the_sender_only(self):
+        sender = await self.connect()
+        listener = await self.connect()
+        await sender.send_json_to({"action": "subscribe", "tags": ["not an id"]})
+        self.assertEqual((await sender.receive_json_from())["type"], "error")
+        await sender.send_to(text_data="not json")
+        self.assertEqual((await sender.receive_json_from())["type"], "error")
+        self.assertTrue(await listener.receive_nothing())
+        await sender.disconnect()
+        await listener.disconnect()
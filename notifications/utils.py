@@ -1,9 +1,15 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from uuid import UUID
+
 from django.conf import settings
 
+TOPIC_KINDS = ("authors", "tags")
+
+
+def build_event(message: str, **extra_data) -> dict:
+    return {"type": "notification", "text": message, **extra_data}
+
+
+def topic_group(kind: str, object_id) -> str:
+    """Group of the sockets subscribed to the quotes of one author or one tag."""
+    return f"{settings.NOTIFICATION_ROOM}.{kind}.{UUID(str(object_id))}"
 
-def send_notification(message: str, **extra_data):
-    channel_layer = get_channel_layer()
-    event = {'type': 'send_message', 'data': {"type": "notification", "text": message, **extra_data}}
-    async_to_sync(channel_layer.group_send)(settings.NOTIFICATION_ROOM, event)
@@ -1,21 +1,31 @@
 from django.contrib import admin
 from django.template.defaultfilters import truncatechars
 
+from quotes.autocomplete import autocomplete
 from quotes.models import Tag, Author, Quote, QuoteStat
 
 
+class AutocompleteSearchMixin:
+    """Searches like the autocomplete endpoints, by name prefix or id, also for the `autocomplete_fields` of others."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return autocomplete(queryset, search_term), False
+
+
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(AutocompleteSearchMixin, admin.ModelAdmin):
     list_display = ("id", "name")
-    search_fields = ("name", "id")
+    search_fields = ("^name", "=id")
     readonly_fields = ("id",)
 
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(AutocompleteSearchMixin, admin.ModelAdmin):
     list_display = ("id", "full_name", "birth_date", "death_date")
     list_display_links = ("id", "full_name")
-    search_fields = ("id", "first_name", "last_name")
+    search_fields = ("^first_name", "^last_name", "=id")
     list_filter = ("birth_date", "death_date")
     readonly_fields = ("id",)
 
@@ -0,0 +1,73 @@
+"""
+Denormalized counters: quotes per author and per tag, and views per author. They are maintained by the write
+paths with relative updates, so concurrent writers never overwrite each other, and rebuilt from the source
+tables by `rebuild_counters` when they drift, e.g. after raw SQL writes. The API renders them: quote counts change
+with writes and invalidate the cached responses of the objects changed and of their listing, while views change
+with every flush and are eventually consistent, like `QuoteStat.views`, until the responses expire.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from quotes.cache import list_scope, object_scope, response_cache
+from quotes.models import Author, Quote, QuoteStat, Tag
+
+# counters whose changes leave the cached responses until they expire
+EVENTUALLY_CONSISTENT = ("views_total",)
+
+
+def add_to_counter(model, field: str, deltas: dict, using: str = "default") -> None:
+    """Adds `deltas`, by primary key, to the counter `field` with a single UPDATE."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if len(set(deltas.values())) == 1:
+        delta = Value(next(iter(deltas.values())))
+    else:
+        delta = Case(*(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()), default=Value(0))
+    # a drifted counter stays at 0 rather than failing the write
+    model.objects.using(using).filter(pk__in=deltas).update(**{field: Greatest(F(field) + delta, Value(0))})
+    if field not in EVENTUALLY_CONSISTENT:
+        # `update` sends no signal, see `quotes.signals` for the other writes
+        resource = model._meta.model_name
+        response_cache.invalidate(list_scope(resource), *[object_scope(resource, pk) for pk in deltas])
+
+
+def count_quotes(author_ids=(), tag_ids=(), sign: int = 1) -> None:
+    """Counts quotes of the given authors and tags, once per occurrence, e.g. the author ids of created quotes."""
+    if author_ids:
+        add_to_counter(Author, "quotes_count", {pk: amount * sign for pk, amount in Counter(author_ids).items()})
+    if tag_ids:
+        add_to_counter(Tag, "quotes_count", {pk: amount * sign for pk, amount in Counter(tag_ids).items()})
+
+
+def move_quote(quote_id, old_author_id, new_author_id) -> None:
+    """Moves the quote and its views from one author's counters to the other's."""
+    views = QuoteStat.objects.filter(quote_id=quote_id).values_list("views", flat=True).first() or 0
+    add_to_counter(Author, "quotes_count", {old_author_id: -1, new_author_id: 1})
+    add_to_counter(Author, "views_total", {old_author_id: -views, new_author_id: views})
+
+
+def rebuild_counters(using: str = "default") -> None:
+    # the details are left to expire, rebuilds are rare
+    response_cache.invalidate(list_scope("author"), list_scope("tag"))
+    quotes = Quote.objects.using(using).filter(author=OuterRef("pk")).order_by().values("author")
+    Author.objects.using(using).update(
+        quotes_count=Coalesce(Subquery(quotes.annotate(count=Count("pk")).values("count")), 0),
+        views_total=Coalesce(Subquery(quotes.annotate(views=Sum("stat__views")).values("views")), 0),
+    )
+    links = Quote.tags.through.objects.using(using).filter(tag=OuterRef("pk")).order_by().values("tag")
+    Tag.objects.using(using).update(
+        quotes_count=Coalesce(Subquery(links.annotate(count=Count("pk")).values("count")), 0),
+    )
+
+
+def rebuild_counters_if_needed(using: str = "default", apps=None, **kwargs):
+    """Adding the counters leaves them at 0 for the existing rows, they are rebuilt once after the migration."""
+    # the models as migrated, e.g. back to before the counters
+    migrated = apps.get_model("quotes", "Tag") if apps is not None else Tag
+    if "quotes_count" not in {field.name for field in migrated._meta.fields}:
+        return
+    if Author.objects.using(using).filter(quotes_count=0, quotes__isnull=False).exists():
+        rebuild_counters(using)
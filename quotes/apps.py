@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class QuotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quotes'
+
+    def ready(self):
+        import quotes.signals
+        from quotes.aggregates import rebuild_counters_if_needed
+        from quotes.autocomplete import create_autocomplete_indexes
+        from quotes.sampling import reseed_random_keys_if_needed
+        from quotes.search import create_search_indexes
+
+        post_migrate.connect(create_search_indexes, sender=self)
+        post_migrate.connect(create_autocomplete_indexes, sender=self)
+        post_migrate.connect(reseed_random_keys_if_needed, sender=self)
+        post_migrate.connect(rebuild_counters_if_needed, sender=self)
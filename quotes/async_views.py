@@ -0,0 +1,129 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+
+
+class RenderedResponse(HttpResponse):
+    """
+    A rendered DRF response. Django renders responses having a `render` method in a thread,
+    which the async read path is meant to avoid. `data` is kept for the callers inspecting it, e.g. tests.
+    """
+
+    def __init__(self, response: Response):
+        response.render()
+        super().__init__(response.content, status=response.status_code, headers=dict(response.items()))
+        self.cookies = response.cookies
+        self.data = response.data
+
+
+class AsyncReadMixin:
+    """
+    Serves `list` and `retrieve` natively async when `settings.ASYNC_READ_VIEWS` is on: rows are read
+    with the async ORM and serialized on the event loop, other requests go to the sync viewset.
+    Querysets have to load everything their serializers read, e.g. with `select_related`,
+    since the sync ORM cannot run on the event loop.
+    """
+    async_actions = ("list", "retrieve")
+    # other renderers, e.g. the browsable api, read the user and build forms through the sync ORM
+    async_formats = ("json", "compact")
+    # query params whose filter backends read the database while filtering, rather than building the query
+    sync_filter_params = ()
+    _async_read = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        async_methods = {method for method, action in actions.items() if action in cls.async_actions}
+        if not async_methods:
+            return sync_view
+        sync_view_in_thread = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if settings.ASYNC_READ_VIEWS and request.method.lower() in async_methods:
+                self = cls(**initkwargs)
+                self.action_map = actions
+                if self.accepts_async_read(request, *args, **kwargs):
+                    return await self.adispatch(request, *args, **kwargs)
+            return await sync_view_in_thread(request, *args, **kwargs)
+
+        update_wrapper(view, sync_view)
+        return view
+
+    def accepts_async_read(self, request, *args, **kwargs) -> bool:
+        self.args, self.kwargs = args, kwargs
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        renderer, media_type = self.perform_content_negotiation(self.initialize_request(request), force=True)
+        return renderer.format in self.async_formats
+
+    def perform_authentication(self, request):
+        # left to the first access of `request.user`, `ainitial` only skips it when nothing reads the user
+        if not self._async_read:
+            super().perform_authentication(request)
+
+    async def ainitial(self, request, *args, **kwargs):
+        if self.get_throttles() or not all(isinstance(perm, permissions.AllowAny) for perm in self.get_permissions()):
+            # permissions and throttles authenticate the user through the sync ORM
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+        else:
+            self._async_read = True
+            self.initial(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """`APIView.dispatch` awaiting the async handler of the action."""
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = await self.afinalize_response(request, response, *args, **kwargs)
+        if isinstance(self.response, Response):
+            return RenderedResponse(self.response)
+        return self.response
+
+    async def afinalize_response(self, request, response, *args, **kwargs):
+        return self.finalize_response(request, response, *args, **kwargs)
+
+    async def afilter_queryset(self, queryset):
+        if any(self.request.query_params.get(param) for param in self.sync_filter_params):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, ValidationError, ValueError, TypeError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(await self.aget_object())
+        return Response(serializer.data)
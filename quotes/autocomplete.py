@@ -0,0 +1,49 @@
+"""
+Prefix search of authors and tags, most popular first, for the autocomplete endpoints and the admin.
+On PostgreSQL, `istartswith` is answered by the `text_pattern_ops` indexes created by `create_autocomplete_indexes`
+for long prefixes, which match few rows, and short prefixes by walking the popularity index of the counter
+(see `quotes.aggregates`) until enough rows match.
+"""
+from functools import reduce
+from operator import and_, or_
+from uuid import UUID
+
+from django.db import connections
+from django.db.models import Q
+
+from quotes.models import Author, Tag
+
+
+def autocomplete(queryset, text: str):
+    """
+    The rows whose `autocomplete_search_fields` start with every word of `text`, in any field, ordered by
+    `autocomplete_ranking`. A UUID is looked up by primary key.
+    """
+    model = queryset.model
+    try:
+        return queryset.filter(pk=UUID(text.strip()))
+    except ValueError:
+        pass
+    words = text.split()
+    if not words:
+        return queryset.none()
+    fields = model.autocomplete_search_fields
+    matches = reduce(and_, [reduce(or_, [Q(**{f"{field}__istartswith": word}) for field in fields]) for word in words])
+    return queryset.filter(matches).order_by(f"-{model.autocomplete_ranking}", "id")
+
+
+def create_autocomplete_indexes(using="default", **kwargs):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for model in (Author, Tag):
+            table = model._meta.db_table
+            for field in model.autocomplete_search_fields:
+                column = model._meta.get_field(field).column
+                # the expression mirrors the SQL emitted for `istartswith`, `text_pattern_ops` serves LIKE 'prefix%'
+                # whatever the collation of the database
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {model._meta.model_name}_{column}_prefix_idx ON {table} "
+                    f"((UPPER({column}::text)) text_pattern_ops)"
+                )
@@ -0,0 +1,125 @@
+from collections import Counter, defaultdict
+from functools import partial
+from uuid import uuid4
+
+from django.db import transaction
+from rest_framework import exceptions
+
+from quotes.aggregates import add_to_counter, count_quotes
+from quotes.cache import response_cache, list_scope, object_scope
+from quotes.models import Author, Quote, QuoteStat, Tag
+from quotes.search import InvertedIndexQuoteSearchBackend
+from quotes.signals import quotes_bulk_written
+
+
+class QuoteBulkWriter:
+    """
+    Creates and updates a list of validated quote items in one transaction, with a constant number of queries:
+    authors, tags and updated quotes are checked with one query each, quotes, stats, tag links and counters
+    are written with bulk statements, and the tags of updated quotes are synced by diffing their through rows.
+    No per-row signals are sent, `quotes_bulk_written` is sent once instead.
+    Items are the validated data of `QuoteBulkItemSerializer`, the ones with an `id` are updates.
+    """
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.created: list[Quote] = []
+        self.updated: list[Quote] = []
+
+    @staticmethod
+    def _missing(model, ids: set) -> set:
+        return ids - set(model.objects.filter(id__in=ids).values_list("id", flat=True))
+
+    def _check(self, quotes: dict, authors: dict):
+        missing_tags = self._missing(Tag, {tag_id for item in self.items for tag_id in item.get("tags", ())})
+        errors, has_errors = [], False
+        for item in self.items:
+            item_errors = {}
+            if "id" in item and item["id"] not in quotes:
+                item_errors["id"] = [f'Invalid pk "{item["id"]}" - object does not exist.']
+            if "author" in item and item["author"] not in authors:
+                item_errors["author"] = ["Invalid hyperlink - Object does not exist."]
+            if missing := [str(tag_id) for tag_id in item.get("tags", ()) if tag_id in missing_tags]:
+                item_errors["tags"] = [f'Invalid pk "{tag_id}" - object does not exist.' for tag_id in missing]
+            errors.append(item_errors)
+            has_errors = has_errors or bool(item_errors)
+        if has_errors:
+            raise exceptions.ValidationError(errors)
+
+    def _sync_tags(self, quote_tags: dict) -> None:
+        """Deletes and inserts only the through rows that differ, for the quotes given new tags."""
+        through = Quote.tags.through
+        existing = {}
+        for row_id, quote_id, tag_id in through.objects.filter(quote_id__in=quote_tags).values_list(
+            "id", "quote_id", "tag_id"
+        ):
+            existing[quote_id, tag_id] = row_id
+        wanted = {(quote_id, tag_id) for quote_id, tag_ids in quote_tags.items() for tag_id in tag_ids}
+
+        stale = {pair: row_id for pair, row_id in existing.items() if pair not in wanted}
+        if stale:
+            through.objects.filter(id__in=stale.values()).delete()
+        added = wanted - existing.keys()
+        through.objects.bulk_create([through(quote_id=quote_id, tag_id=tag_id) for quote_id, tag_id in added])
+        tags_count = Counter(tag_id for _, tag_id in added)
+        tags_count.subtract(tag_id for _, tag_id in stale)
+        add_to_counter(Tag, "quotes_count", tags_count)
+
+    def _count_authors(self, loaded_author_ids: dict) -> None:
+        count_quotes(author_ids=[quote.author_id for quote in self.created])
+        moved = {quote.id: quote for quote in self.updated if quote.author_id != loaded_author_ids[quote.id]}
+        if not moved:
+            return
+        quotes_count, views_total = defaultdict(int), defaultdict(int)
+        views = dict(QuoteStat.objects.filter(quote_id__in=moved).values_list("quote_id", "views"))
+        for quote_id, quote in moved.items():
+            quotes_count[loaded_author_ids[quote_id]] -= 1
+            quotes_count[quote.author_id] += 1
+            views_total[loaded_author_ids[quote_id]] -= views.get(quote_id, 0)
+            views_total[quote.author_id] += views.get(quote_id, 0)
+            quote._loaded_author_id = quote.author_id
+        add_to_counter(Author, "quotes_count", quotes_count)
+        add_to_counter(Author, "views_total", views_total)
+
+    def write(self) -> list[Quote]:
+        """Returns the written quotes in the order of the items."""
+        with transaction.atomic():
+            update_ids = {item["id"] for item in self.items if "id" in item}
+            quotes = Quote.objects.select_for_update().in_bulk(update_ids) if update_ids else {}
+            author_ids = {item["author"] for item in self.items if "author" in item}
+            author_ids |= {quote.author_id for quote in quotes.values()}
+            authors = Author.objects.only("id", "first_name", "last_name").in_bulk(author_ids)
+            self._check(quotes, authors)
+            loaded_author_ids = {quote_id: quote.author_id for quote_id, quote in quotes.items()}
+
+            written, quote_tags, updated_fields = [], {}, set()
+            for item in self.items:
+                if "id" in item:
+                    quote = quotes[item["id"]]
+                    self.updated.append(quote)
+                    updated_fields.update(name for name in ("text", "author") if name in item)
+                else:
+                    quote = Quote(id=uuid4())
+                    self.created.append(quote)
+                quote.text = item.get("text", quote.text)
+                quote.author = authors[item.get("author", quote.author_id)]
+                if "tags" in item:
+                    quote_tags[quote.id] = item["tags"]
+                written.append(quote)
+
+            Quote.objects.bulk_create(self.created)
+            QuoteStat.objects.bulk_create([QuoteStat(quote_id=quote.id) for quote in self.created])
+            if updated_fields:
+                Quote.objects.bulk_update(self.updated, sorted(updated_fields))
+            if quote_tags:
+                self._sync_tags(quote_tags)
+            self._count_authors(loaded_author_ids)
+
+            response_cache.invalidate(list_scope("quote"), *[object_scope("quote", quote.id) for quote in self.updated])
+            for quote in written:
+                transaction.on_commit(partial(
+                    InvertedIndexQuoteSearchBackend.index.add,
+                    quote.id, quote.text, quote.author.first_name, quote.author.last_name,
+                ))
+            quotes_bulk_written.send(sender=self.__class__, created=self.created, updated=self.updated)
+        return written
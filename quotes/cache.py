@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+def list_scope(resource: str) -> str:
+    return f"list:{resource}"
+
+
+def object_scope(resource: str, pk) -> str:
+    return f"object:{resource}:{pk}"
+
+
+class DelayedBumps:
+    """
+    Bumps the generations of scopes again after a delay, from a single thread shared by every invalidation.
+    A scope invalidated again before its bump is bumped once, after the delay of its last invalidation.
+    """
+
+    def __init__(self, bump):
+        self._bump = bump
+        self._condition = threading.Condition()
+        # scope -> when to bump it, on the monotonic clock
+        self._due = {}
+        self._thread = None
+
+    def schedule(self, scopes, delay: float) -> None:
+        due = time.monotonic() + delay
+        with self._condition:
+            self._due.update(dict.fromkeys(scopes, due))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="response-cache-bumps", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self) -> set[str]:
+        with self._condition:
+            return set(self._due)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                ready = [scope for scope, due in self._due.items() if due <= now]
+                if not ready:
+                    self._condition.wait(min(self._due.values()) - now if self._due else None)
+                    continue
+                for scope in ready:
+                    del self._due[scope]
+            try:
+                self._bump(ready)
+            except Exception:
+                logger.exception("Failed to invalidate %s cached response scopes", len(ready))
+
+
+class ResponseCache:
+    """
+    Rendered API responses keyed by url, accepted format and the generations of the scopes they depend on.
+    Invalidating a scope bumps its generation, so every response built from it is never looked up again.
+    """
+    key_prefix = "responses"
+
+    def __init__(self):
+        self.delayed_bumps = DelayedBumps(self._bump_generations)
+
+    @property
+    def config(self) -> dict:
+        return settings.RESPONSE_CACHE
+
+    @property
+    def cache(self):
+        return caches[self.config["ALIAS"]]
+
+    def _generation_key(self, scope: str) -> str:
+        return f"{self.key_prefix}:generation:{scope}"
+
+    def get_generations(self, scopes: list[str]) -> list[int]:
+        keys = [self._generation_key(scope) for scope in scopes]
+        generations = self.cache.get_many(keys)
+        missing = {key: time.time_ns() for key in keys if key not in generations}
+        if missing:
+            # start from the clock, so that a scope evicted from the cache never reuses an old generation
+            self.cache.set_many(missing, timeout=None)
+            generations |= missing
+        return [generations[key] for key in keys]
+
+    async def aget_generations(self, scopes: list[str]) -> list[int]:
+        keys = [self._generation_key(scope) for scope in scopes]
+        generations = await self.cache.aget_many(keys)
+        missing = {key: time.time_ns() for key in keys if key not in generations}
+        if missing:
+            await self.cache.aset_many(missing, timeout=None)
+            generations |= missing
+        return [generations[key] for key in keys]
+
+    def invalidate(self, *scopes: str) -> None:
+        # a response built before the commit would otherwise be cached under the new generation
+        transaction.on_commit(partial(self._bump_generations, scopes))
+        if settings.DATABASE_REPLICAS["ALIASES"]:
+            # and so would one read from a replica yet to replay the commit, for as long as clients stick to the primary
+            transaction.on_commit(partial(self._bump_generations_later, scopes))
+
+    def _bump_generations_later(self, scopes) -> None:
+        self.delayed_bumps.schedule(scopes, settings.DATABASE_REPLICAS["STICKY_WINDOW"])
+
+    def _bump_generations(self, scopes) -> None:
+        for scope in scopes:
+            key = self._generation_key(scope)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), timeout=None)
+
+    def _make_key(self, request, generations: list[int]) -> str:
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        raw_key = repr((request.build_absolute_uri(request.path), params, request.accepted_media_type, generations))
+        return f"{self.key_prefix}:{hashlib.md5(raw_key.encode()).hexdigest()}"
+
+    def get_key(self, request, scopes: list[str]) -> str:
+        return self._make_key(request, self.get_generations(scopes))
+
+    async def aget_key(self, request, scopes: list[str]) -> str:
+        return self._make_key(request, await self.aget_generations(scopes))
+
+    def get(self, key: str) -> dict | None:
+        return self.cache.get(key)
+
+    async def aget(self, key: str) -> dict | None:
+        return await self.cache.aget(key)
+
+    @staticmethod
+    def _make_entry(response) -> dict:
+        return {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "etag": quote_etag(hashlib.md5(response.content).hexdigest()),
+            "last_modified": int(time.time()),
+        }
+
+    def set(self, key: str, response) -> dict:
+        entry = self._make_entry(response)
+        self.cache.set(key, entry, timeout=self.config["TIMEOUT"])
+        return entry
+
+    async def aset(self, key: str, response) -> dict:
+        entry = self._make_entry(response)
+        await self.cache.aset(key, entry, timeout=self.config["TIMEOUT"])
+        return entry
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serves `list` and `retrieve` of a viewset, and their async variants, from the response cache.
+    Every response carries `ETag` and `Last-Modified`, so clients can revalidate with conditional requests.
+    """
+    cache_resource = None
+    # resources whose changes also change the list pages, e.g. through search or filters
+    list_cache_dependencies = ()
+    cacheable_formats = ("json", "compact")
+
+    def get_cache_lookup(self) -> str:
+        """
+        The primary key looked up in its canonical form, the one the writes invalidate,
+        e.g. a UUID requested in upper case or without hyphens.
+        """
+        value = self.kwargs[self.lookup_url_kwarg]
+        try:
+            return str(self.queryset.model._meta.pk.to_python(value))
+        except ValidationError:
+            # not found anyway
+            return value
+
+    def get_cache_scopes(self) -> list[str]:
+        if self.detail:
+            return [object_scope(self.cache_resource, self.get_cache_lookup())]
+        return [list_scope(resource) for resource in (self.cache_resource, *self.list_cache_dependencies)]
+
+    def _is_cacheable_request(self, request) -> bool:
+        return request.method == "GET" and request.accepted_renderer.format in self.cacheable_formats
+
+    def _get_response_from_entry(self, entry: dict | None) -> HttpResponse | None:
+        if entry is None:
+            return None
+        self._response_cache_entry = entry
+        return HttpResponse(entry["content"], content_type=entry["content_type"])
+
+    def get_cached_response(self, request) -> HttpResponse | None:
+        """Returns the cached response or remembers where to cache the one being built."""
+        if not self._is_cacheable_request(request):
+            return None
+        self._response_cache_key = response_cache.get_key(request, self.get_cache_scopes())
+        return self._get_response_from_entry(response_cache.get(self._response_cache_key))
+
+    async def aget_cached_response(self, request) -> HttpResponse | None:
+        if not self._is_cacheable_request(request):
+            return None
+        self._response_cache_key = await response_cache.aget_key(request, self.get_cache_scopes())
+        return self._get_response_from_entry(await response_cache.aget(self._response_cache_key))
+
+    def list(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+        return super().retrieve(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        cached_response = await self.aget_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+        return await super().alist(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        cached_response = await self.aget_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+        return await super().aretrieve(request, *args, **kwargs)
+
+    def _should_store(self, response) -> bool:
+        return (
+            getattr(self, "_response_cache_entry", None) is None
+            and getattr(self, "_response_cache_key", None) is not None
+            and isinstance(response, Response)
+            and response.status_code == 200
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._should_store(response):
+            response.render()
+            self._response_cache_entry = response_cache.set(self._response_cache_key, response)
+        return self._add_validators(request, response)
+
+    async def afinalize_response(self, request, response, *args, **kwargs):
+        # without the key, finalize_response leaves a new response for the async cache api to store
+        key, self._response_cache_key = getattr(self, "_response_cache_key", None), None
+        response = await super().afinalize_response(request, response, *args, **kwargs)
+        self._response_cache_key = key
+        if not self._should_store(response):
+            return response
+        response.render()
+        self._response_cache_entry = await response_cache.aset(key, response)
+        return self._add_validators(request, response)
+
+    def _add_validators(self, request, response):
+        entry = getattr(self, "_response_cache_entry", None)
+        if entry is None:
+            return response
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        patch_vary_headers(response, ("Accept",))
+        return get_conditional_response(
+            request, etag=entry["etag"], last_modified=entry["last_modified"], response=response
+        )
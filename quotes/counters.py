@@ -0,0 +1,231 @@
+import atexit
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from quotes.aggregates import add_to_counter
+from quotes.models import Author, Quote, QuoteStat
+from quotes.trending import compact_view_buckets_if_due, record_views, refresh_trending_if_due
+
+logger = logging.getLogger(__name__)
+
+
+class BaseViewCounterBuffer:
+    """Accumulates quote view increments until they are flushed into `QuoteStat`."""
+    # kept in the memory of each process, out of reach of `manage.py flush_view_counters`
+    process_local = False
+
+    def incr(self, quote_id, amount: int = 1) -> None:
+        raise NotImplementedError
+
+    async def aincr(self, quote_id, amount: int = 1) -> None:
+        await sync_to_async(self.incr, thread_sensitive=False)(quote_id, amount)
+
+    def incr_many(self, quote_ids) -> None:
+        for quote_id in quote_ids:
+            self.incr(quote_id)
+
+    def drain(self) -> dict[str, int]:
+        """Atomically take every pending increment out of the buffer."""
+        raise NotImplementedError
+
+
+class LocalViewCounterBuffer(BaseViewCounterBuffer):
+    """Per-process buffer, suitable for a single worker or for tests."""
+    process_local = True
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+
+    def incr(self, quote_id, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[str(quote_id)] += amount
+
+    async def aincr(self, quote_id, amount: int = 1) -> None:
+        # nothing to wait for, no need for a thread
+        self.incr(quote_id, amount)
+
+    def incr_many(self, quote_ids) -> None:
+        with self._lock:
+            for quote_id in quote_ids:
+                self._counts[str(quote_id)] += 1
+
+    def drain(self) -> dict[str, int]:
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        return dict(counts)
+
+
+class RedisViewCounterBuffer(BaseViewCounterBuffer):
+    """Buffer shared by all workers, kept in a redis hash."""
+
+    def __init__(self, url=None, key="quotes:views", **options):
+        import redis
+
+        self._client = redis.Redis.from_url(url or settings.REDIS_CONNECTION_URL)
+        self._key = key
+        self._response_error = redis.ResponseError
+
+    def incr(self, quote_id, amount: int = 1) -> None:
+        self._client.hincrby(self._key, str(quote_id), amount)
+
+    def incr_many(self, quote_ids) -> None:
+        # one round trip for the whole batch
+        pipe = self._client.pipeline(transaction=False)
+        for quote_id in quote_ids:
+            pipe.hincrby(self._key, str(quote_id), 1)
+        pipe.execute()
+
+    def drain(self) -> dict[str, int]:
+        # RENAME is atomic, so increments arriving during the flush land in a fresh hash. The key renamed to is
+        # unique to this drain: concurrent drains of other workers would otherwise overwrite each other's hash.
+        flushing_key = f"{self._key}:flushing:{uuid.uuid4().hex}"
+        try:
+            self._client.rename(self._key, flushing_key)
+        except self._response_error:
+            # nothing has been buffered since the last flush
+            return {}
+        pipe = self._client.pipeline()
+        pipe.hgetall(flushing_key)
+        pipe.delete(flushing_key)
+        counts, _ = pipe.execute()
+        return {key.decode(): int(value) for key, value in counts.items()}
+
+
+def flush_view_counters(buffer: BaseViewCounterBuffer = None) -> int:
+    """
+    Fold buffered views into `QuoteStat.views` and the current hourly buckets of `quotes.trending`,
+    returns the number of views written.
+    """
+    buffer = buffer or get_view_counter().buffer
+    counts = buffer.drain()
+    if not counts:
+        return 0
+
+    # Views of quotes deleted in the meantime are dropped.
+    authors = {
+        str(quote_id): author_id
+        for quote_id, author_id in Quote.objects.filter(id__in=counts.keys()).values_list("id", "author_id")
+    }
+    counts = {quote_id: amount for quote_id, amount in counts.items() if quote_id in authors}
+    author_views = defaultdict(int)
+    for quote_id, amount in counts.items():
+        author_views[authors[quote_id]] += amount
+
+    # Quotes sharing the same increment are updated by a single statement.
+    by_amount = defaultdict(list)
+    for quote_id, amount in counts.items():
+        by_amount[amount].append(quote_id)
+
+    try:
+        with transaction.atomic():
+            QuoteStat.objects.bulk_create(
+                [QuoteStat(quote_id=quote_id) for quote_id in counts],
+                ignore_conflicts=True
+            )
+            for amount, quote_ids in by_amount.items():
+                QuoteStat.objects.filter(quote_id__in=quote_ids).update(views=F("views") + amount)
+            add_to_counter(Author, "views_total", author_views)
+            record_views(counts)
+    except Exception:
+        # put the views back so that the next flush retries them
+        for quote_id, amount in counts.items():
+            buffer.incr(quote_id, amount)
+        raise
+    return sum(counts.values())
+
+
+class ViewCounterFlusher(threading.Thread):
+    def __init__(self, counter: "ViewCounter", interval: float):
+        super().__init__(name="view-counter-flusher", daemon=True)
+        self.counter = counter
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.counter.flush()
+            close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class ViewCounter:
+    def __init__(self, buffer: BaseViewCounterBuffer, flush_interval: float = 0):
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def incr(self, quote_id, amount: int = 1) -> None:
+        self.buffer.incr(quote_id, amount)
+        if self.flush_interval and self._flusher is None:
+            self._start_flusher()
+
+    async def aincr(self, quote_id, amount: int = 1) -> None:
+        await self.buffer.aincr(quote_id, amount)
+        if self.flush_interval and self._flusher is None:
+            self._start_flusher()
+
+    def incr_many(self, quote_ids) -> None:
+        """Counts one view of every quote, with a single write to the buffer."""
+        self.buffer.incr_many(quote_ids)
+        if self.flush_interval and self._flusher is None:
+            self._start_flusher()
+
+    def flush(self) -> int:
+        try:
+            views = flush_view_counters(self.buffer)
+        except Exception:
+            logger.exception("Failed to flush quote view counters")
+            return 0
+        if not views:
+            # no new buckets, the compaction and the rankings can wait for the next views
+            return 0
+        try:
+            compact_view_buckets_if_due()
+        except Exception:
+            logger.exception("Failed to compact quote view buckets")
+        try:
+            refresh_trending_if_due()
+        except Exception:
+            logger.exception("Failed to rank the trending quotes")
+        return views
+
+    def _start_flusher(self):
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = ViewCounterFlusher(self, self.flush_interval)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def stop(self):
+        if self._flusher is not None:
+            self._flusher.stop()
+            self._flusher = None
+
+
+@lru_cache(maxsize=None)
+def get_view_counter() -> ViewCounter:
+    config = settings.VIEW_COUNTER
+    buffer_class = import_string(config["BACKEND"])
+    return ViewCounter(buffer_class(**config.get("OPTIONS", {})), flush_interval=config.get("FLUSH_INTERVAL", 0))
+
+
+@receiver(setting_changed)
+def reset_view_counter(setting, **kwargs):
+    if setting == "VIEW_COUNTER" and get_view_counter.cache_info().currsize:
+        get_view_counter().stop()
+        get_view_counter.cache_clear()
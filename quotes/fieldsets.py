@@ -0,0 +1,92 @@
+from django.utils.functional import cached_property
+from rest_framework import exceptions
+
+
+def check_fields(requested: tuple[str, ...], allowed, param: str = "fields") -> None:
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise exceptions.ValidationError(
+            {param: f"Unknown fields: {', '.join(unknown)}. Must be among: {', '.join(allowed)}."}
+        )
+
+
+class SparseFieldsMixin:
+    """
+    Serializers taking `fields`, the names of the readable fields to render, and `expand`, the names
+    of the `expandable_fields` to render inline, whether `fields` lists them or not.
+    The other writable fields become write-only, so that a serializer restricted for its output
+    still validates the same input.
+    """
+    # name -> serializer class, or partial of one, rendering the related objects
+    expandable_fields = {}
+
+    def __init__(self, *args, fields: tuple[str, ...] | None = None, expand: tuple[str, ...] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expanded_fields = ()
+        if expand is not None:
+            check_fields(expand, tuple(self.expandable_fields), param="expand")
+            self.expanded_fields = tuple(name for name in self.expandable_fields if name in expand)
+        if fields is not None:
+            self.select_fields(tuple(name for name in fields if name not in self.expanded_fields))
+
+    def select_fields(self, fields: tuple[str, ...]) -> None:
+        readable = [name for name, field in self.fields.items() if not field.write_only]
+        check_fields(fields, readable)
+        for name in readable:
+            if name in fields or name in self.expanded_fields:
+                continue
+            if self.fields[name].read_only:
+                self.fields.pop(name)
+            else:
+                self.fields[name].write_only = True
+
+    @cached_property
+    def expanded_serializers(self) -> tuple:
+        return tuple((name, self.expandable_fields[name](context=self.context)) for name in self.expanded_fields)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        for name, serializer in self.expanded_serializers:
+            representation[name] = serializer.to_representation(getattr(instance, name))
+        return representation
+
+
+class SparseFieldsetMixin:
+    """
+    Renders only the fields listed by the `fields` query param, e.g. `?fields=id,text`, and the relations
+    listed by `expand` inline, e.g. `?expand=tags,author`, with serializers such as `SparseFieldsMixin`.
+    Unknown fields are a 400. Querysets load the expanded relations through `expand_queryset`.
+    """
+    fields_param = "fields"
+    expand_param = "expand"
+    expand_select_related = ()
+    expand_prefetch_related = ()
+
+    def _get_names(self, param: str) -> tuple[str, ...] | None:
+        request = getattr(self, "request", None)
+        value = request.query_params.get(param) if request is not None else None
+        if not value:
+            return None
+        return tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+
+    def get_requested_fields(self) -> tuple[str, ...] | None:
+        return self._get_names(self.fields_param)
+
+    def get_requested_expansions(self) -> tuple[str, ...] | None:
+        return self._get_names(self.expand_param)
+
+    def expand_queryset(self, queryset):
+        expand = self.get_requested_expansions() or ()
+        select_related = [name for name in self.expand_select_related if name in expand]
+        prefetch_related = [name for name in self.expand_prefetch_related if name in expand]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            kwargs.setdefault("fields", self.get_requested_fields())
+            kwargs.setdefault("expand", self.get_requested_expansions())
+        return super().get_serializer(*args, **kwargs)
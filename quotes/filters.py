@@ -1,17 +1,31 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import exceptions
 from rest_framework.filters import BaseFilterBackend
 
 
 class ListFilter(BaseFilterBackend):
+    """
+    Filters by the comma separated values of the query params declared in `view.filter_by_fields`,
+    mapped to a lookup, e.g. `{"author_id": "author_id__in"}`. Values are validated by the field before querying.
+    Many-to-many fields take `<field>__any` or `<field>__all`, answered by subqueries on the through table,
+    so that a row matching several values is still listed once.
+    """
     view_param = "filter_by_fields"
-    description = ""
+    descriptions = {
+        "any": "Comma separated ids, matches the rows having any of them.",
+        "all": "Comma separated ids, matches the rows having all of them.",
+    }
+    description = "Comma separated values."
 
     @staticmethod
-    def _get_filters(request, fields: dict[str, str]) -> dict[str, list[str]]:
+    def _get_filters(request, fields: dict[str, str]) -> dict[str, tuple[str, list[str]]]:
         filters = {}
         for param, source in fields.items():
             values = [value.strip() for value in request.query_params.get(param, "").split(",") if value.strip()]
             if values:
-                filters[source] = values
+                filters[param] = (source, values)
         return filters
 
     def _get_view_params(self, view) -> dict[str, str]:
@@ -19,11 +33,42 @@ class ListFilter(BaseFilterBackend):
         assert isinstance(attr, dict)
         return attr
 
+    @staticmethod
+    def _split_source(source: str) -> tuple[str, str]:
+        field_name, _, lookup = source.partition(LOOKUP_SEP)
+        return field_name, lookup
+
+    @staticmethod
+    def _clean_values(field, param: str, values: list[str]) -> list:
+        target = field.target_field if field.is_relation else field
+        try:
+            return list(dict.fromkeys(target.to_python(value) for value in values))
+        except ValidationError as exc:
+            raise exceptions.ValidationError({param: exc.messages})
+
+    @staticmethod
+    def _filter_many_to_many(queryset, field, lookup: str, values: list):
+        through = field.remote_field.through
+        source_column, target_column = field.m2m_field_name(), field.m2m_reverse_field_name()
+        matches = through.objects.filter(**{f"{target_column}__in": values})
+        if lookup == "any":
+            # a semi-join read from the index on the values, rather than an EXISTS probe for every row
+            return queryset.filter(pk__in=matches.values(source_column))
+        # one group per row, having as many through rows as requested values
+        groups = matches.values(source_column).annotate(matched=Count(target_column)).filter(matched=len(values))
+        return queryset.filter(pk__in=groups.values(source_column))
+
     def filter_queryset(self, request, queryset, view):
         view_params = self._get_view_params(view)
-        filters = self._get_filters(request, view_params)
-        if filters:
-            return queryset.filter(**filters)
+        for param, (source, values) in self._get_filters(request, view_params).items():
+            field_name, lookup = self._split_source(source)
+            field = queryset.model._meta.get_field(field_name)
+            values = self._clean_values(field, param, values)
+            if field.many_to_many:
+                assert lookup in self.descriptions, f"Use {field_name}__any or {field_name}__all for {param}"
+                queryset = self._filter_many_to_many(queryset, field, lookup, values)
+            else:
+                queryset = queryset.filter(**{source: values})
         return queryset
 
     def get_schema_operation_parameters(self, view):
@@ -34,7 +79,7 @@ class ListFilter(BaseFilterBackend):
                 'name': param,
                 'required': False,
                 'in': 'query',
-                'description': self.description,
+                'description': self.descriptions.get(self._split_source(source)[1], self.description),
                 'schema': {
                     'type': 'string',
                 }
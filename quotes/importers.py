@@ -0,0 +1,210 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from uuid import uuid4
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from quotes.aggregates import count_quotes
+from quotes.cache import response_cache, list_scope
+from quotes.models import Author, Quote, QuoteStat, Tag
+from quotes.signals import quotes_imported
+from quotes.validators import MinWordCountValidator
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    rejected: int = 0
+    errors: list[dict] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "created": self.created,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_second": round(self.rate, 1),
+        }
+
+
+def read_jsonl(stream):
+    """
+    One quote per line:
+    {"text": "...", "author": {"first_name": "...", "last_name": "...", "birth_date": "...", "death_date": null}, "tags": ["..."]}
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError
+        except ValueError:
+            yield line_number, {"non_field_errors": ["Invalid JSON object."]}
+            continue
+        yield line_number, row
+
+
+def read_csv(stream):
+    """
+    Header: text, author_first_name, author_last_name, author_birth_date, author_death_date, tags.
+    Tags are separated by `|`.
+    """
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        yield line_number, {
+            "text": row.get("text"),
+            "author": {
+                "first_name": row.get("author_first_name"),
+                "last_name": row.get("author_last_name") or "",
+                "birth_date": row.get("author_birth_date"),
+                "death_date": row.get("author_death_date") or None,
+            },
+            "tags": [tag for tag in (row.get("tags") or "").split("|") if tag.strip()],
+        }
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+class QuoteImporter:
+    """
+    Streams rows into the database chunk by chunk: authors and tags are resolved with one query each,
+    quotes, their tags and stats are written with `bulk_create`. No per-row signals are sent,
+    `quotes_imported` is sent once with the summary instead.
+    """
+    chunk_size = 5000
+    max_reported_errors = 100
+
+    text_validator = MinWordCountValidator(3)
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or self.chunk_size
+        self.report = ImportReport()
+
+    def run(self, stream, file_format: str) -> ImportReport:
+        rows = READERS[file_format](stream)
+        started = time.perf_counter()
+        while chunk := list(islice(rows, self.chunk_size)):
+            self.import_chunk(chunk)
+        self.report.elapsed = time.perf_counter() - started
+
+        if self.report.created:
+            # the authors and tags whose counters changed are invalidated by `count_quotes`
+            response_cache.invalidate(list_scope("quote"), list_scope("author"), list_scope("tag"))
+            quotes_imported.send(sender=self.__class__, report=self.report)
+        return self.report
+
+    def _reject(self, line_number: int, errors: dict):
+        self.report.rejected += 1
+        if len(self.report.errors) < self.max_reported_errors:
+            self.report.errors.append({"line": line_number, "errors": errors})
+
+    @staticmethod
+    def _clean_field(model, name, value, errors, prefix=""):
+        try:
+            return model._meta.get_field(name).clean(value, None)
+        except ValidationError as exc:
+            errors[prefix + name] = exc.messages
+
+    def clean_row(self, row: dict) -> tuple[dict, dict]:
+        if "non_field_errors" in row:
+            return {}, row
+
+        errors = {}
+        author = row.get("author") if isinstance(row.get("author"), dict) else {}
+        cleaned = {
+            "text": self._clean_field(Quote, "text", row.get("text"), errors),
+            "author": {
+                name: self._clean_field(Author, name, author.get(name, "" if name == "last_name" else None), errors, "author.")
+                for name in ("first_name", "last_name", "birth_date", "death_date")
+            },
+        }
+        if "text" not in errors:
+            try:
+                self.text_validator(cleaned["text"])
+            except ValidationError as exc:
+                errors["text"] = exc.messages
+
+        tags = row.get("tags") or []
+        if not isinstance(tags, list):
+            errors["tags"] = ["Expected a list of tag names."]
+            tags = []
+        cleaned["tags"] = list(dict.fromkeys(
+            self._clean_field(Tag, "name", str(tag).strip(), errors, "tags.") for tag in tags
+        ))
+        return cleaned, errors
+
+    @staticmethod
+    def _author_key(author: dict | Author) -> tuple:
+        if isinstance(author, Author):
+            return author.first_name, author.last_name, author.birth_date
+        return author["first_name"], author["last_name"], author["birth_date"]
+
+    def _resolve_authors(self, authors: dict[tuple, dict]) -> dict[tuple, object]:
+        def fetch(keys):
+            first_names, last_names, birth_dates = map(set, zip(*keys))
+            found = Author.objects.filter(
+                first_name__in=first_names, last_name__in=last_names, birth_date__in=birth_dates
+            ).only("id", "first_name", "last_name", "birth_date").order_by()
+            # the three IN lists may match more than the requested combinations
+            return {key: author.id for author in found if (key := self._author_key(author)) in keys}
+
+        resolved = fetch(authors.keys())
+        missing = [Author(**authors[key]) for key in authors if key not in resolved]
+        if missing:
+            # concurrent imports may have created some of them in the meantime
+            Author.objects.bulk_create(missing, ignore_conflicts=True)
+            resolved |= fetch({self._author_key(author) for author in missing})
+        return resolved
+
+    @staticmethod
+    def _resolve_tags(names: set[str]) -> dict[str, object]:
+        resolved = dict(Tag.objects.filter(name__in=names).order_by().values_list("name", "id"))
+        missing = [Tag(name=name) for name in names if name not in resolved]
+        if missing:
+            Tag.objects.bulk_create(missing, ignore_conflicts=True)
+            resolved |= dict(
+                Tag.objects.filter(name__in=[tag.name for tag in missing]).order_by().values_list("name", "id")
+            )
+        return resolved
+
+    def import_chunk(self, chunk: list[tuple[int, dict]]):
+        valid = []
+        for line_number, row in chunk:
+            self.report.total += 1
+            cleaned, errors = self.clean_row(row)
+            if errors:
+                self._reject(line_number, errors)
+            else:
+                valid.append(cleaned)
+        if not valid:
+            return
+
+        with transaction.atomic():
+            author_ids = self._resolve_authors({self._author_key(row["author"]): row["author"] for row in valid})
+            tag_ids = self._resolve_tags({name for row in valid for name in row["tags"]})
+
+            quotes, quote_tags = [], []
+            for row in valid:
+                quote = Quote(id=uuid4(), text=row["text"], author_id=author_ids[self._author_key(row["author"])])
+                quotes.append(quote)
+                quote_tags.extend(Quote.tags.through(quote_id=quote.id, tag_id=tag_ids[name]) for name in row["tags"])
+
+            Quote.objects.bulk_create(quotes)
+            Quote.tags.through.objects.bulk_create(quote_tags)
+            QuoteStat.objects.bulk_create([QuoteStat(quote_id=quote.id) for quote in quotes])
+            count_quotes(
+                author_ids=[quote.author_id for quote in quotes], tag_ids=[link.tag_id for link in quote_tags]
+            )
+        self.report.created += len(quotes)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from quotes.trending import compact_view_buckets
+
+
+class Command(BaseCommand):
+    help = "Folds the expired hourly quote view buckets into daily ones and deletes the expired daily ones"
+
+    def handle(self, *args, **options):
+        compacted, pruned = compact_view_buckets()
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} hourly buckets, pruned {pruned} buckets."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes.counters import flush_view_counters, get_view_counter
+
+
+class Command(BaseCommand):
+    help = "Writes the buffered quote views into the quote statistics"
+
+    def handle(self, *args, **options):
+        buffer = get_view_counter().buffer
+        if buffer.process_local:
+            raise CommandError(
+                f"{type(buffer).__name__} keeps the views in the memory of each server process, which flush them "
+                f"themselves: only a shared buffer, e.g. in redis, can be flushed from here."
+            )
+        views = flush_view_counters(buffer)
+        self.stdout.write(self.style.SUCCESS(f"Flushed {views} quote views."))
@@ -0,0 +1,29 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes.importers import QuoteImporter, READERS
+
+
+class Command(BaseCommand):
+    help = "Imports quotes with their authors and tags from a JSONL or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the file to import")
+        parser.add_argument("--format", choices=READERS.keys(), help="File format, guessed from the extension by default")
+        parser.add_argument("--chunk-size", type=int, default=QuoteImporter.chunk_size, help="Rows written per batch")
+
+    def handle(self, *args, path, format=None, chunk_size, **options):
+        file_format = format or os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in READERS:
+            raise CommandError(f"Unknown file format {file_format!r}, use --format.")
+
+        with open(path, newline="", encoding="utf-8") as stream:
+            report = QuoteImporter(chunk_size=chunk_size).run(stream, file_format)
+
+        for error in report.errors:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} of {report.total} rows in {report.elapsed:.2f}s "
+            f"({report.rate:.0f} rows/s), {report.rejected} rejected."
+        ))
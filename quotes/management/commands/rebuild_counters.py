@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quotes.aggregates import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recomputes the quote and view counters of every author and tag from the quotes, fixing any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        rebuild_counters(options["database"])
+        self.stdout.write(self.style.SUCCESS("Rebuilt the author and tag counters."))
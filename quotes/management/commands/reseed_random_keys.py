@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quotes.sampling import reseed_random_keys
+
+
+class Command(BaseCommand):
+    help = "Draws new random keys for every quote, the positions random and daily quotes are picked from"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        updated = reseed_random_keys(options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Reseeded {updated} quotes."))
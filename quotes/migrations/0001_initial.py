@@ -0,0 +1,72 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(blank=True, max_length=100)),
+                ('birth_date', models.DateField()),
+                ('death_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('id',),
+                'unique_together': {('first_name', 'last_name', 'birth_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to='quotes.author')),
+                ('tags', models.ManyToManyField(blank=True, related_name='quotes', to='quotes.tag')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='QuoteStat',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('quote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stat', to='quotes.quote')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(models.F('id'), models.F('text'), name='quote_text_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(models.F('id'), models.F('created_at'), name='quote_created_idx'),
+        ),
+    ]
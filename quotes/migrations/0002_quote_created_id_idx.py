@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quote_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['-created_at', 'id'], name='quote_created_id_idx'),
+        ),
+    ]
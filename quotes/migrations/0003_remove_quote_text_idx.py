@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0002_quote_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quote_text_idx',
+        ),
+    ]
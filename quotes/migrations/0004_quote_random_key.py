@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+import quotes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0003_remove_quote_text_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quote',
+            name='random_key',
+            field=models.FloatField(default=quotes.models.generate_random_key, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['random_key'], name='quote_random_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['author', 'random_key'], name='quote_author_random_key_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0004_quote_random_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='quotes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='views_total',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='quotes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-quotes_count', 'id'], name='author_quotes_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-views_total', 'id'], name='author_views_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-quotes_count', 'id'], name='tag_quotes_count_idx'),
+        ),
+    ]
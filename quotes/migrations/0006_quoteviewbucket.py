@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteViewBucket',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('resolution', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('start', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('quote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='quotes.quote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start', 'resolution'], name='quote_view_bucket_start_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quoteviewbucket',
+            constraint=models.UniqueConstraint(fields=('quote', 'resolution', 'start'), name='quote_view_bucket_unique'),
+        ),
+    ]
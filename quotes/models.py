@@ -1,3 +1,4 @@
+import random
 from uuid import uuid4
 
 from django.db import models
@@ -5,22 +6,45 @@ from django.db import models
 from quotes.validators import MinWordCountValidator
 
 
+def generate_random_key() -> float:
+    return random.random()
+
+
 class BaseModel(models.Model):
     objects = models.Manager()
 
     id = models.UUIDField(default=uuid4, primary_key=True)
+    # denormalized counters, only written by relative updates (see quotes.aggregates), never by `save()`
+    counter_fields = ()
 
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        if self.counter_fields and not self._state.adding and kwargs.get("update_fields") is None:
+            # the values loaded with the instance may be stale already
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class Tag(BaseModel):
     name = models.CharField(max_length=50, unique=True)
+    quotes_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ("quotes_count",)
+    # prefix searched fields and the counter ranking the matches, see quotes.autocomplete
+    autocomplete_search_fields = ("name",)
+    autocomplete_ranking = "quotes_count"
 
     def __str__(self):
         return self.name
 
     class Meta:
+        indexes = (
+            models.Index(fields=("-quotes_count", "id"), name="tag_quotes_count_idx"),
+        )
         ordering = ("name",)
 
 
@@ -29,6 +53,11 @@ class Author(BaseModel):
     last_name = models.CharField(max_length=100, blank=True)
     birth_date = models.DateField()
     death_date = models.DateField(blank=True, null=True)
+    quotes_count = models.PositiveIntegerField(default=0, editable=False)
+    views_total = models.PositiveBigIntegerField(default=0, editable=False)
+    counter_fields = ("quotes_count", "views_total")
+    autocomplete_search_fields = ("first_name", "last_name")
+    autocomplete_ranking = "quotes_count"
 
     @property
     def full_name(self):
@@ -41,20 +70,35 @@ class Author(BaseModel):
 
     class Meta:
         unique_together = ["first_name", "last_name", "birth_date"]
+        indexes = (
+            models.Index(fields=("-quotes_count", "id"), name="author_quotes_count_idx"),
+            models.Index(fields=("-views_total", "id"), name="author_views_total_idx"),
+        )
         ordering = ("id",)
 
 
 class Quote(BaseModel):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # uniform position of the quote in [0, 1), random quotes are picked by seeking to a random position
+    random_key = models.FloatField(default=generate_random_key, editable=False)
 
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="quotes")
     tags = models.ManyToManyField(Tag, blank=True, related_name="quotes")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the author counters move along when the quote changes author
+        instance._loaded_author_id = instance.__dict__.get("author_id")
+        return instance
+
     class Meta:
         indexes = (
-            models.Index("id", "text", name="quote_text_idx"),
-            models.Index("id", "created_at", name="quote_created_idx"),
+            # serves the default ordering and the keyset pages of the quote listing
+            models.Index(fields=("-created_at", "id"), name="quote_created_id_idx"),
+            models.Index(fields=("random_key",), name="quote_random_key_idx"),
+            models.Index(fields=("author", "random_key"), name="quote_author_random_key_idx"),
         )
         ordering = ("-created_at",)
 
@@ -62,3 +106,23 @@ class Quote(BaseModel):
 class QuoteStat(BaseModel):
     quote = models.OneToOneField(Quote, on_delete=models.CASCADE, related_name='stat')
     views = models.PositiveIntegerField(default=0)
+
+
+class QuoteViewBucket(BaseModel):
+    """Views of a quote during an hour, or a day once compacted (see quotes.trending)."""
+    HOUR = "hour"
+    DAY = "day"
+
+    quote = models.ForeignKey(Quote, on_delete=models.CASCADE, related_name="view_buckets")
+    resolution = models.CharField(max_length=4, choices=((HOUR, "Hour"), (DAY, "Day")))
+    start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=("quote", "resolution", "start"), name="quote_view_bucket_unique"),
+        )
+        indexes = (
+            # the windows, compaction and pruning all select the buckets by start
+            models.Index(fields=("start", "resolution"), name="quote_view_bucket_start_idx"),
+        )
@@ -0,0 +1,205 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Seeks to the rows after the cursor by the values of every ordering column,
+    so that each page is a range scan over the matching index, whatever its depth.
+    The ordering always ends with a unique column, which keeps the cursor stable under concurrent inserts.
+    """
+    ordering = ("pk",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        return self._set_page(list(self._get_page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        return self._set_page([obj async for obj in self._get_page_queryset(queryset, request, view)])
+
+    def _get_page_queryset(self, queryset, request, view):
+        """The rows of the page plus one, which tells whether another page follows."""
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        reverse, position = self.cursor or (False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._get_seek_filter(ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results: list):
+        reverse, position = self.cursor or (False, None)
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next, self.has_previous = has_following, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = getattr(view, "keyset_ordering", self.ordering)
+        ordering = super().get_ordering(request, queryset, view)
+
+        if not self._get_field(ordering[-1]).unique:
+            # the primary key breaks ties in the opposite direction of the leading column, so that the ordering
+            # or its reverse matches the `(-column, id)` indexes, e.g. `quote_created_id_idx`
+            ordering += ("pk" if ordering[0].startswith("-") else "-pk",)
+        return ordering
+
+    def _get_field(self, order):
+        name = order.lstrip("-")
+        if name == "pk":
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def _get_seek_filter(self, ordering, position) -> Q:
+        # (a, b) > (x, y) is spelled as a >= x AND (a > x OR (a = x AND b > y)): the redundant leading bound
+        # gives the planner a range on the first column of the index, which it cannot derive from the OR alone
+        conditions = []
+        for index, order in enumerate(ordering):
+            lookup = "lt" if order.startswith("-") else "gt"
+            equal = {self._get_field(prev).attname: position[num] for num, prev in enumerate(ordering[:index])}
+            conditions.append(Q(**equal, **{f"{self._get_field(order).attname}__{lookup}": position[index]}))
+        leading = ordering[0]
+        bound = Q(**{f"{self._get_field(leading).attname}__{'lte' if leading.startswith('-') else 'gte'}": position[0]})
+        return bound & reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return [
+            self._get_field(order).value_to_string(instance)
+            for order in ordering
+        ]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse, values = bool(payload["r"]), payload["p"]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [self._get_field(order).to_python(value) for order, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({"r": int(reverse), "p": position}, separators=(",", ":"))
+        encoded = urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(False, self._get_position_from_instance(self.page[-1], self.ordering))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(True, self._get_position_from_instance(self.page[0], self.ordering))
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Page number pagination by default, keyset pagination for clients that ask
+    for it with `?pagination=keyset` or follow a keyset `cursor` link.
+    """
+    mode_query_param = "pagination"
+    mode_query_description = _("Set to `keyset` to paginate with cursors instead of page numbers.")
+    keyset_pagination_class = KeysetPagination
+
+    def __init__(self):
+        self.keyset = None
+
+    def use_keyset(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == "keyset"
+            or self.keyset_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.keyset.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            page = await self.keyset.apaginate_queryset(queryset, request, view)
+            self.display_page_controls = self.keyset.display_page_controls
+            return page
+
+        # PageNumberPagination.paginate_queryset with the count and the page read by the async ORM
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.mode_query_description),
+                'schema': {'type': 'string', 'enum': ['keyset']},
+            },
+            *self.keyset_pagination_class().get_schema_operation_parameters(view),
+        ]
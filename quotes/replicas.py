@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.db import OperationalError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from server.routers import ais_pinned, health, is_pinned, pick_replica, pin_to_primary, read_from
+
+
+def get_client(request) -> str:
+    """Tells the clients apart by their credentials, or by their address when anonymous."""
+    credentials = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if credentials:
+        return f"credentials:{hashlib.md5(credentials.encode()).hexdigest()}"
+    return f"address:{BaseThrottle().get_ident(request)}"
+
+
+class ReplicaReadMixin:
+    """
+    Reads the data of safe requests from a replica, see `server.routers`, and retries them on the primary
+    when the replica fails. Successful writes pin their client to the primary for `STICKY_WINDOW` seconds.
+    Keep it before `AsyncReadMixin`, whose async reads go through `adispatch`.
+    """
+    # actions reading through unsafe methods, e.g. to take their input as a body
+    replica_read_actions = ("batch_get",)
+
+    def _is_read(self, request) -> bool:
+        return (
+            request.method in SAFE_METHODS
+            or self.action_map.get(request.method.lower()) in self.replica_read_actions
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self._is_read(request):
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code < 400 and settings.DATABASE_REPLICAS["ALIASES"]:
+                pin_to_primary(get_client(request))
+            return response
+        alias = pick_replica()
+        if alias is None or is_pinned(get_client(request)):
+            return super().dispatch(request, *args, **kwargs)
+        try:
+            with read_from(alias):
+                return super().dispatch(request, *args, **kwargs)
+        except OperationalError:
+            health.mark_failed(alias)
+            return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        # only safe requests are served async
+        alias = pick_replica()
+        if alias is None or await ais_pinned(get_client(request)):
+            return await super().adispatch(request, *args, **kwargs)
+        try:
+            with read_from(alias):
+                return await super().adispatch(request, *args, **kwargs)
+        except OperationalError:
+            health.mark_failed(alias)
+            return await super().adispatch(request, *args, **kwargs)
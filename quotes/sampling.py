@@ -0,0 +1,68 @@
+import datetime
+import random
+
+from django.core.cache import cache
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+from quotes.models import Quote
+
+
+class RandomFloat(Func):
+    """A uniform float in [0, 1) drawn by the database."""
+    function = "RANDOM"
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # RANDOM() is a signed 64-bit integer on SQLite
+        return "(RANDOM() / 18446744073709551616.0 + 0.5)", []
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="RAND", **extra_context)
+
+
+def pick_quote(queryset, position: float) -> Quote | None:
+    """The first quote at or after `position` in `random_key` order, wrapping around: one index seek."""
+    queryset = queryset.order_by("random_key")
+    return queryset.filter(random_key__gte=position).first() or queryset.first()
+
+
+def random_quote(queryset) -> Quote | None:
+    return pick_quote(queryset, random.random())
+
+
+def daily_position(day: datetime.date) -> float:
+    return random.Random(day.isoformat()).random()
+
+
+def daily_quote(queryset, day: datetime.date = None) -> Quote | None:
+    """
+    The quote of the day. The pick is remembered for the day,
+    so that quotes created in the meantime do not replace it.
+    """
+    day = day or timezone.localdate()
+    key = f"quotes:daily:{day.isoformat()}"
+    quote_id = cache.get(key)
+    if quote_id is not None and (quote := queryset.filter(pk=quote_id).first()) is not None:
+        return quote
+
+    quote = pick_quote(queryset, daily_position(day))
+    if quote is not None:
+        cache.set(key, quote.id, timeout=datetime.timedelta(days=1).total_seconds())
+    return quote
+
+
+def reseed_random_keys(using: str = "default") -> int:
+    return Quote.objects.using(using).update(random_key=RandomFloat())
+
+
+def reseed_random_keys_if_needed(using: str = "default", apps=None, **kwargs):
+    """Adding `random_key` gives every existing quote the same default, they are spread once after the migration."""
+    # the models as migrated, e.g. back to before the column
+    migrated = apps.get_model("quotes", "Quote") if apps is not None else Quote
+    if "random_key" not in {field.name for field in migrated._meta.fields}:
+        return
+    quotes = Quote.objects.using(using)
+    oldest_key = quotes.order_by("created_at").values_list("random_key", flat=True).first()
+    if oldest_key is not None and quotes.filter(random_key=oldest_key)[:2].count() > 1:
+        reseed_random_keys(using)
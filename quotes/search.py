@@ -0,0 +1,202 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from functools import reduce
+from operator import and_, or_
+from uuid import UUID
+
+from django.db import connections, router
+from django.db.models import Q, Case, When, Value, FloatField, Func, IntegerField
+from rest_framework.filters import SearchFilter
+
+from quotes.cache import list_scope, response_cache
+from quotes.models import Quote, Author
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BaseQuoteSearchBackend:
+    def search(self, queryset, terms: list[str]):
+        """Returns the quotes matching every term, annotated with a `search_rank` and ordered by it."""
+        raise NotImplementedError
+
+
+class PostgresQuoteSearchBackend(BaseQuoteSearchBackend):
+    """
+    Full-text search over the quote text plus trigram matching over author names.
+    Both are answered from the indexes created by `create_search_indexes`.
+    """
+    config = "english"
+
+    def search(self, queryset, terms: list[str]):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # like `InvertedIndex`, every term has to match, as a prefix of a word of the text or of an author name.
+        # Stop words leave their query empty, matching nothing, so they are ignored as by a websearch query.
+        terms = [token for term in terms for token in tokenize(term)]
+        queries = [SearchQuery(f"{term}:*", config=self.config, search_type="raw") for term in terms]
+        vector = SearchVector("text", config=self.config)
+        lexemes = {
+            f"search_lexemes_{index}": Func(query, function="numnode", output_field=IntegerField())
+            for index, query in enumerate(queries)
+        }
+        matches = [
+            Q(search_vector=query) | Q(**{f"search_lexemes_{index}": 0}) | Q(author_id__in=Author.objects.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term)
+            ).values("id"))
+            for index, (term, query) in enumerate(zip(terms, queries))
+        ]
+        return queryset.alias(search_vector=vector, **lexemes).annotate(
+            search_rank=SearchRank(vector, reduce(or_, queries))
+        ).filter(reduce(and_, matches)).order_by("-search_rank")
+
+    @staticmethod
+    def create_indexes(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            # the expressions mirror the SQL emitted for `SearchVector` and `icontains`, so the planner can use them
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS quote_text_search_idx ON {Quote._meta.db_table} "
+                f"USING gin (to_tsvector('{PostgresQuoteSearchBackend.config}'::regconfig, COALESCE(text, '')))"
+            )
+            for column in ("first_name", "last_name"):
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS author_{column}_trgm_idx ON {Author._meta.db_table} "
+                    f"USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+                )
+
+
+class InvertedIndex:
+    """
+    In-memory token to quote ids index, terms match the tokens they prefix.
+    Each worker has its own, versioned by the generation of the quote listing in the response cache: the writes of
+    any worker bump it, and the next search rebuilds the index. The writes of this worker are also added once committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(set)
+        self._documents = {}
+        self._vocabulary = []
+        self.is_built = False
+        self.generation = None
+
+    def build(self):
+        with self._lock:
+            # read before the quotes, so that a write committed meanwhile triggers another rebuild
+            generation, = response_cache.get_generations([list_scope("quote")])
+            if self.is_built and generation == self.generation:
+                return
+            self.reset()
+            rows = Quote.objects.values_list("id", "text", "author__first_name", "author__last_name")
+            for quote_id, *fields in rows.iterator():
+                self._add(quote_id, *fields)
+            self.generation = generation
+            self.is_built = True
+
+    def _add(self, quote_id, *fields):
+        tokens = set(tokenize(" ".join(filter(None, fields))))
+        self._documents[quote_id] = tokens
+        for token in tokens:
+            if token not in self._postings:
+                insort(self._vocabulary, token)
+            self._postings[token].add(quote_id)
+
+    def _remove(self, quote_id):
+        for token in self._documents.pop(quote_id, ()):
+            self._postings[token].discard(quote_id)
+
+    def add(self, quote_id, *fields):
+        with self._lock:
+            if self.is_built:
+                self._remove(quote_id)
+                self._add(quote_id, *fields)
+
+    def remove(self, quote_id):
+        with self._lock:
+            self._remove(quote_id)
+
+    def reset(self):
+        """Drops the index, it is rebuilt by the next search."""
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary.clear()
+            self.is_built = False
+
+    def _match(self, term: str) -> dict:
+        matches = defaultdict(int)
+        start = bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            for quote_id in self._postings[token]:
+                matches[quote_id] += 1
+        return matches
+
+    def search(self, terms: list[str]) -> dict:
+        """Returns the ids of the quotes matching every term mapped to the number of matched tokens."""
+        self.build()
+        with self._lock:
+            scores = None
+            for term in (token for term in terms for token in tokenize(term)):
+                matches = self._match(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {quote_id: score + matches[quote_id] for quote_id, score in scores.items() if quote_id in matches}
+                if not scores:
+                    break
+            return scores or {}
+
+
+class InvertedIndexQuoteSearchBackend(BaseQuoteSearchBackend):
+    """Fallback for databases without full-text search, e.g. SQLite in tests."""
+    index = InvertedIndex()
+
+    def search(self, queryset, terms: list[str]):
+        scores = self.index.search(terms)
+        by_score = defaultdict(list)
+        for quote_id, score in scores.items():
+            by_score[score].append(quote_id)
+        return queryset.filter(id__in=scores.keys()).annotate(
+            search_rank=Case(
+                *[When(id__in=quote_ids, then=Value(float(score))) for score, quote_ids in by_score.items()],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        ).order_by("-search_rank")
+
+
+def get_quote_search_backend(using=None) -> BaseQuoteSearchBackend:
+    connection = connections[using or router.db_for_read(Quote)]
+    if connection.vendor == "postgresql":
+        return PostgresQuoteSearchBackend()
+    return InvertedIndexQuoteSearchBackend()
+
+
+def create_search_indexes(using="default", **kwargs):
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        PostgresQuoteSearchBackend.create_indexes(connection)
+
+
+class QuoteSearchFilter(SearchFilter):
+    """`?search=` over quote text and author names, an exact quote id is looked up by primary key."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if len(terms) == 1:
+            try:
+                return queryset.filter(pk=UUID(terms[0]))
+            except ValueError:
+                pass
+        return get_quote_search_backend(queryset.db).search(queryset, terms)
@@ -1,25 +1,39 @@
+from functools import partial
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
+from quotes.fieldsets import SparseFieldsMixin, check_fields
+from quotes.importers import READERS
 from quotes.models import Quote, Author, Tag, QuoteStat
 from quotes.validators import MinWordCountValidator
+from server.renderers import is_compact
+from server.timing import TimedSerializerMixin, TimedListSerializer
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     first_name = serializers.CharField(max_length=100, write_only=True, required=True)
     last_name = serializers.CharField(max_length=100, write_only=True, required=False)
 
     class Meta:
         model = Author
-        fields = ("id", "first_name", "last_name", "full_name", "birth_date", "death_date")
-        read_only_fields = ("id",)
+        fields = (
+            "id", "first_name", "last_name", "full_name", "birth_date", "death_date", "quotes_count", "views_total"
+        )
+        read_only_fields = ("id", "quotes_count", "views_total")
+        list_serializer_class = TimedListSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
         read_only_fields = ("id",)
+        list_serializer_class = TimedListSerializer
 
 
 class QuoteStatSerializer(serializers.ModelSerializer):
@@ -28,7 +42,7 @@ class QuoteStatSerializer(serializers.ModelSerializer):
         exclude = ("quote",)
 
 
-class QuoteSerializer(serializers.ModelSerializer):
+class QuoteSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     text = serializers.CharField(validators=[MinWordCountValidator(3)])
     tag_listing = serializers.SerializerMethodField(read_only=True)
     author = serializers.HyperlinkedRelatedField(
@@ -45,14 +59,28 @@ class QuoteSerializer(serializers.ModelSerializer):
         required=False
     )
     stat = serializers.SerializerMethodField(read_only=True)
+    expandable_fields = {"author": AuthorSerializer, "tags": partial(TagSerializer, many=True)}
 
     class Meta:
         model = Quote
         fields = ("id", "text", "created_at", "tags", "author", "tag_listing", "stat")
         read_only_fields = ("id", "created_at")
+        list_serializer_class = TimedListSerializer
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if is_compact(self.context):
+            # the author by id, for the input as well, and no link to the tags, which are listed by id
+            fields["author"] = serializers.PrimaryKeyRelatedField(queryset=Author.objects.all(), required=True)
+            del fields["tag_listing"]
+        return fields
 
     def get_stat(self, obj):
-        stat, _ = QuoteStat.objects.get_or_create(quote=obj)
+        # stats are loaded together with the quote, quotes without them have not been viewed yet
+        try:
+            stat = obj.stat
+        except QuoteStat.DoesNotExist:
+            stat = QuoteStat(id=None, quote=obj)
         return QuoteStatSerializer(instance=stat, context=self.context).data
 
     def get_tag_listing(self, obj):
@@ -60,15 +88,156 @@ class QuoteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         tags = validated_data.pop("tags", None)
-        instance = super().create(validated_data)
-        if tags:
-            instance.tags.add(*tags)
-            instance.save()
+        # the new quote notification is routed by tags once the transaction commits
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            if tags:
+                instance.tags.add(*tags)
         return instance
 
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags", None)
-        if tags:
-            instance.tags.clear()
-            instance.tags.add(*tags)
+        if tags is not None:
+            # only the links that differ are deleted or inserted
+            instance.tags.set(tags)
         return super().update(instance, validated_data)
+
+
+class QuoteListingSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.BaseSerializer):
+    """
+    Read-only `QuoteSerializer` for listings, rendering the same representation without the field machinery.
+    URLs are built from templates reversed once per serializer rather than once per row,
+    and the author's URL only needs `author_id`, so the author does not have to be loaded.
+    """
+    readable_fields = ("id", "text", "created_at", "author", "tag_listing", "stat")
+    # left out by the compact representation, like `QuoteSerializer` does
+    url_fields = ("tag_listing",)
+    expandable_fields = QuoteSerializer.expandable_fields
+    # reversed in place of the id, then split around
+    url_marker = "__id__"
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    def __init__(self, *args, **kwargs):
+        self.compact = is_compact(kwargs.get("context", {}))
+        if self.compact:
+            self.readable_fields = tuple(name for name in self.readable_fields if name not in self.url_fields)
+        self.rendered_fields = self.readable_fields
+        super().__init__(*args, **kwargs)
+
+    def select_fields(self, fields):
+        check_fields(fields, self.readable_fields)
+        self.rendered_fields = tuple(name for name in self.readable_fields if name in fields)
+
+    def _url_template(self, view_name: str, lookup_url_kwarg: str, **kwargs) -> tuple[str, str]:
+        url = reverse(view_name, kwargs={lookup_url_kwarg: self.url_marker}, **kwargs)
+        prefix, suffix = self.context["request"].build_absolute_uri(url).split(self.url_marker)
+        return prefix, suffix
+
+    @cached_property
+    def _getters(self) -> tuple:
+        if self.compact:
+            get_author, get_tag_listing = (lambda quote: str(quote.author_id)), None
+        else:
+            author_prefix, author_suffix = self._url_template(
+                "author-detail", "author_id", request=self.context["request"], format=self.context.get("format")
+            )
+            tags_prefix, tags_suffix = self._url_template("quote-tags", "quote_id")
+
+            def get_author(quote):
+                return f"{author_prefix}{quote.author_id}{author_suffix}"
+
+            def get_tag_listing(quote):
+                return f"{tags_prefix}{quote.id}{tags_suffix}"
+
+        created_at = serializers.DateTimeField()
+
+        def get_stat(quote):
+            try:
+                stat = quote.stat
+            except QuoteStat.DoesNotExist:
+                return {"id": None, "views": 0}
+            return {"id": str(stat.id), "views": stat.views}
+
+        getters = {
+            "id": lambda quote: str(quote.id),
+            "text": lambda quote: quote.text,
+            "created_at": lambda quote: created_at.to_representation(quote.created_at),
+            "author": get_author,
+            "tag_listing": get_tag_listing,
+            "stat": get_stat,
+        }
+        for name, serializer in self.expanded_serializers:
+            getters[name] = partial(self._get_expanded, name, serializer)
+        # expanded fields which are not readable, like `tags`, come last as with `QuoteSerializer`
+        names = [name for name in self.readable_fields if name in self.rendered_fields or name in self.expanded_fields]
+        names.extend(name for name in self.expanded_fields if name not in self.readable_fields)
+        return tuple((name, getters[name]) for name in names)
+
+    @staticmethod
+    def _get_expanded(name, serializer, quote):
+        return serializer.to_representation(getattr(quote, name))
+
+    def to_representation(self, instance):
+        return {name: getter(instance) for name, getter in self._getters}
+
+
+class BatchGetSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, write_only=True)
+
+    def validate_ids(self, ids):
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > settings.BATCH_GET_MAX_IDS:
+            raise serializers.ValidationError(f"Ensure this field has no more than {settings.BATCH_GET_MAX_IDS} ids.")
+        return ids
+
+
+class AuthorLinkField(serializers.HyperlinkedRelatedField):
+    """Parses the author's URL into its id without reading it, `QuoteBulkWriter` checks the ids together."""
+
+    def get_object(self, view_name, view_args, view_kwargs):
+        return UUID(view_kwargs[self.lookup_url_kwarg])
+
+
+class QuoteBulkSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        if len(attrs) > settings.BULK_WRITE_MAX_QUOTES:
+            raise serializers.ValidationError(f"Ensure there are no more than {settings.BULK_WRITE_MAX_QUOTES} quotes.")
+        ids = [item["id"] for item in attrs if "id" in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Every quote can only be updated once.")
+        return attrs
+
+
+class QuoteBulkItemSerializer(serializers.Serializer):
+    """A quote to create, or to update when it has an `id`, with the fields of `QuoteSerializer`."""
+    id = serializers.UUIDField(required=False)
+    text = serializers.CharField(validators=[MinWordCountValidator(3)], required=False)
+    author = AuthorLinkField(
+        queryset=Author.objects.all(), view_name="author-detail", lookup_url_kwarg="author_id", required=False
+    )
+    tags = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+    class Meta:
+        list_serializer_class = QuoteBulkSerializer
+
+    def validate(self, attrs):
+        if "id" not in attrs:
+            missing = {name: ["This field is required."] for name in ("text", "author") if name not in attrs}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+class QuoteImportSerializer(serializers.Serializer):
+    file = serializers.FileField(write_only=True)
+    file_format = serializers.ChoiceField(choices=tuple(READERS), required=False, write_only=True)
+
+    def validate(self, attrs):
+        if "file_format" not in attrs:
+            extension = attrs["file"].name.rsplit(".", 1)[-1].lower()
+            if extension not in READERS:
+                raise serializers.ValidationError({"file_format": "Cannot be guessed from the file name."})
+            attrs["file_format"] = extension
+        return attrs
@@ -0,0 +1,126 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver, Signal
+
+from quotes.aggregates import count_quotes, move_quote, add_to_counter
+from quotes.cache import response_cache, list_scope, object_scope
+from quotes.models import Quote, QuoteStat, Author, Tag
+from quotes.search import InvertedIndexQuoteSearchBackend
+
+# sent once per bulk import with its `report`, the imported quotes send no `post_save`
+quotes_imported = Signal()
+# sent once per bulk write with the `created` and `updated` quotes, which send no `post_save`
+quotes_bulk_written = Signal()
+
+
+@receiver(post_save, sender=Quote)
+def create_quote_stat(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        QuoteStat.objects.create(quote=instance)
+
+
+@receiver(post_save, sender=Quote)
+def count_author_quotes(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        count_quotes(author_ids=[instance.author_id])
+    elif getattr(instance, "_loaded_author_id", instance.author_id) != instance.author_id:
+        move_quote(instance.pk, instance._loaded_author_id, instance.author_id)
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(pre_delete, sender=Quote)
+def collect_quote_counts(sender, instance, **kwargs):
+    # the links and the stat are deleted along with the quote
+    links = Quote.tags.through.objects.filter(quote_id=instance.pk)
+    instance._counted_tag_ids = list(links.values_list("tag_id", flat=True))
+    stat = QuoteStat.objects.filter(quote_id=instance.pk).values_list("views", flat=True)
+    instance._counted_views = stat.first() or 0
+
+
+@receiver(post_delete, sender=Quote)
+def uncount_quote(sender, instance, **kwargs):
+    count_quotes(author_ids=[instance.author_id], tag_ids=instance.__dict__.pop("_counted_tag_ids", ()), sign=-1)
+    add_to_counter(Author, "views_total", {instance.author_id: -instance.__dict__.pop("_counted_views", 0)})
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def count_tag_quotes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Counts the links added and removed, from either side of the relation."""
+    links = Quote.tags.through.objects.filter(**{"tag_id" if reverse else "quote_id": instance.pk})
+    column = "quote_id" if reverse else "tag_id"
+    if action == "pre_remove":
+        # removing ids which are not linked is a no-op
+        instance._removed_link_ids = list(links.filter(**{f"{column}__in": pk_set}).values_list(column, flat=True))
+    elif action == "pre_clear":
+        instance._removed_link_ids = list(links.values_list(column, flat=True))
+    elif action in ("post_remove", "post_clear", "post_add"):
+        if action == "post_add":
+            linked_ids, sign = pk_set, 1
+        else:
+            linked_ids, sign = instance.__dict__.pop("_removed_link_ids", ()), -1
+        if reverse:
+            count_quotes(tag_ids=[instance.pk] * len(linked_ids), sign=sign)
+        else:
+            count_quotes(tag_ids=linked_ids, sign=sign)
+
+
+# the index is only changed once the write is committed, a rolled back one would leave it matching phantoms
+@receiver(post_save, sender=Quote)
+def index_quote(sender, instance, **kwargs):
+    index = InvertedIndexQuoteSearchBackend.index
+    if index.is_built:
+        transaction.on_commit(partial(
+            index.add, instance.id, instance.text, instance.author.first_name, instance.author.last_name
+        ))
+
+
+@receiver(post_delete, sender=Quote)
+def unindex_quote(sender, instance, **kwargs):
+    transaction.on_commit(partial(InvertedIndexQuoteSearchBackend.index.remove, instance.id))
+
+
+@receiver(post_save, sender=Author)
+def index_author_quotes(sender, instance, created, **kwargs):
+    index = InvertedIndexQuoteSearchBackend.index
+    if index.is_built and not created:
+        for quote_id, text in instance.quotes.values_list("id", "text"):
+            transaction.on_commit(partial(index.add, quote_id, text, instance.first_name, instance.last_name))
+
+
+@receiver(post_save, sender=Quote)
+@receiver(post_delete, sender=Quote)
+def invalidate_quote_responses(sender, instance, **kwargs):
+    response_cache.invalidate(list_scope("quote"), object_scope("quote", instance.pk))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_responses(sender, instance, **kwargs):
+    # quote pages are searched by author names
+    response_cache.invalidate(list_scope("author"), object_scope("author", instance.pk), list_scope("quote"))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_responses(sender, instance, **kwargs):
+    # quote pages are filtered by tags, quote tag listings depend on the tag list scope
+    response_cache.invalidate(list_scope("tag"), object_scope("tag", instance.pk), list_scope("quote"))
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def invalidate_quote_tags_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # the cleared quotes are unknown once the rows are gone
+        instance._cleared_quote_ids = list(instance.quotes.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        quote_ids = pk_set if action != "post_clear" else instance.__dict__.pop("_cleared_quote_ids", ())
+    else:
+        quote_ids = [instance.pk]
+    response_cache.invalidate(list_scope("quote"), *[object_scope("quote", quote_id) for quote_id in quote_ids])
@@ -1,13 +1,55 @@
+import asyncio
+import copy
 import datetime
+import decimal
+import gc
+import gzip
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.test import TestCase
-from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 
-from quotes.models import Author, Quote, Tag
+from quotes.aggregates import rebuild_counters_if_needed
+from quotes.async_views import RenderedResponse
+from quotes.cache import DelayedBumps, list_scope, response_cache
+from quotes.counters import get_view_counter, flush_view_counters
+from quotes.importers import QuoteImporter
+from quotes.models import Author, Quote, Tag, QuoteStat, QuoteViewBucket
+from quotes.sampling import pick_quote, daily_position, daily_quote, reseed_random_keys_if_needed
+from quotes.search import InvertedIndexQuoteSearchBackend, PostgresQuoteSearchBackend
+from quotes.trending import bucket_start, compact_view_buckets, rank_quotes, trending_quotes
+from server import metrics
+from server.compression import negotiate_encoding
+from server.db.pool import ConnectionPool, PooledDatabaseWrapperMixin, PoolTimeout, close_pools
+from server.renderers import FastJSONRenderer, orjson
+from server.routers import health, read_from
+from server.supervisor import bind
+from server.worker import WorkerServer, check_shared_state, get_rss
+
+LOCAL_VIEW_COUNTER = {"BACKEND": "quotes.counters.LocalViewCounterBuffer", "FLUSH_INTERVAL": 0}
 
 
 class ModelsTestCase(TestCase):
@@ -66,6 +108,7 @@ class AuthorTestCase(APITestCase):
         ]
         Author.objects.bulk_create(self.authors)
         self._url = reverse("author-list")
+        cache.clear()
 
     def test_list(self):
         response = self.client.get(self._url, format='json')
@@ -89,7 +132,9 @@ class AuthorTestCase(APITestCase):
                 "id": author_id,
                 "full_name": test_author.full_name,
                 'birth_date': '1990-01-01',
-                'death_date': '2020-01-01'
+                'death_date': '2020-01-01',
+                'quotes_count': 0,
+                'views_total': 0,
             }
         )
 
@@ -143,7 +188,9 @@ class AuthorTestCase(APITestCase):
                 "id": author_id,
                 "full_name": 'John-updated Doe-updated',
                 'birth_date': '1990-01-02',
-                'death_date': None
+                'death_date': None,
+                'quotes_count': 0,
+                'views_total': 0,
             }
         )
 
@@ -153,6 +200,7 @@ class TagTests(APITestCase):
         self.tags = [Tag(name=f"test-{num}") for num in range(15)]
         Tag.objects.bulk_create(self.tags)
         self._url = reverse('tag-list')
+        cache.clear()
 
     def _get_tag(self) -> Tag:
         tag = self.tags[-1]
@@ -168,13 +216,25 @@ class TagTests(APITestCase):
         self.assertIn('results', response.data)
         self.assertEqual(len(response.data["results"]), 10)  # PAGE_SIZE which is set in settings
 
+    def test_keyset_list(self):
+        response = self.client.get(self._url, {"pagination": "keyset"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        names = [tag["name"] for tag in response.data["results"]]
+
+        response = self.client.get(response.data['next'], format='json')
+        self.assertIsNone(response.data['next'])
+        names += [tag["name"] for tag in response.data["results"]]
+        self.assertEqual(names, sorted(tag.name for tag in self.tags))
+
     def test_retrieve(self):
         tag = self._get_tag()
         tag_id = str(tag.id)
 
         response = self.client.get(f'{self._url}{tag_id}/', format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data,{"id": tag_id, "name": tag.name})
+        self.assertEqual(response.data, {"id": tag_id, "name": tag.name, "quotes_count": 0})
 
     def test_failure_retrieve(self):
         tag_id = "non-existent"
@@ -199,9 +259,10 @@ class TagTests(APITestCase):
 
         response = self.client.patch(f'{self._url}{tag_id}/', format='json', data=dict(name='tag-updated'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data,{"id": tag_id, "name": 'tag-updated'})
+        self.assertEqual(response.data, {"id": tag_id, "name": 'tag-updated', "quotes_count": 0})
 
 
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
 class QuoteTests(APITestCase):
     def setUp(self):
         self.author = Author.objects.create(
@@ -217,6 +278,7 @@ class QuoteTests(APITestCase):
         ]
         Quote.objects.bulk_create(self.quotes)
         self._url = reverse('quote-list')
+        cache.clear()
 
     def _get_quote(self):
         quote = self.quotes[-1]
@@ -232,14 +294,111 @@ class QuoteTests(APITestCase):
         self.assertIn('results', response.data)
         self.assertEqual(len(response.data["results"]), 10)  # PAGE_SIZE which is set in settings
 
+    def test_list_query_count(self):
+        with self.assertNumQueries(2):  # count and page
+            response = self.client.get(self._url, format='json')
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(response.data["results"][0]["stat"], {"id": None, "views": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.filter(id__in=[quote.id for quote in self.quotes[5:]]).delete()
+        with self.assertNumQueries(2):
+            response = self.client.get(self._url, format='json')
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_keyset_list(self):
+        Quote.objects.bulk_create([Quote(author=self.author, text=f"Another text number {num}") for num in range(5)])
+        expected = [str(quote_id) for quote_id in Quote.objects.order_by("-created_at", "id").values_list("id", flat=True)]
+
+        response = self.client.get(self._url, {"pagination": "keyset"}, format='json')
+        first_page = [quote["id"] for quote in response.data["results"]]
+        self.assertEqual(len(first_page), 10)
+
+        # a quote inserted while paging neither shifts nor repeats the following rows
+        Quote.objects.create(author=self.author, text="Quote created while paging")
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(response.data['next'], format='json')
+        # the leading column is bounded outside of the OR, so that the index is range scanned
+        self.assertIn('WHERE ("quotes_quote"."created_at" <= ', context.captured_queries[0]["sql"])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(first_page + [quote["id"] for quote in response.data["results"]], expected)
+
+        response = self.client.get(response.data['previous'], format='json')
+        self.assertEqual([quote["id"] for quote in response.data["results"]], first_page)
+
+    def test_search(self):
+        author = Author.objects.create(first_name='Albert', last_name='Einstein', birth_date='1879-03-14')
+        relative = Quote.objects.create(author=author, text="Everything is relative, even the text")
+        other = Quote.objects.create(author=self.author, text="Some relative wisdom")
+
+        response = self.client.get(self._url, {"search": "relat"}, format='json')
+        self.assertEqual({quote["id"] for quote in response.data["results"]}, {str(relative.id), str(other.id)})
+
+        response = self.client.get(self._url, {"search": "einstein text"}, format='json')
+        self.assertEqual([quote["id"] for quote in response.data["results"]], [str(relative.id)])
+
+        response = self.client.get(self._url, {"search": "nonexistent"}, format='json')
+        self.assertEqual(response.data["results"], [])
+
+    def test_search_backends_agree(self):
+        author = Author.objects.create(first_name='Albert', last_name='Einstein', birth_date='1879-03-14')
+        quote = Quote.objects.create(author=author, text="Imagination is more important than knowledge")
+        Quote.objects.create(author=author, text="Everything is relative")
+        Quote.objects.create(author=self.author, text="Some imagination")
+
+        for backend in (InvertedIndexQuoteSearchBackend(), PostgresQuoteSearchBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                if isinstance(backend, PostgresQuoteSearchBackend) and connection.vendor != "postgresql":
+                    self.skipTest("needs PostgreSQL")
+                InvertedIndexQuoteSearchBackend.index.reset()
+                # every term matches, either in the text or in the author name
+                results = backend.search(Quote.objects.all(), ["einstein", "imagination"])
+                self.assertEqual([result.id for result in results], [quote.id])
+                self.assertFalse(backend.search(Quote.objects.all(), ["einstein", "nonexistent"]).exists())
+
+    def test_search_index_versioning(self):
+        backend = InvertedIndexQuoteSearchBackend()
+
+        def search():
+            return {result.id for result in backend.search(Quote.objects.all(), ["imagination"])}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            quote = Quote.objects.create(author=self.author, text="Imagination is more important")
+        self.assertEqual(search(), {quote.id})
+
+        # rolled back writes are never indexed
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Quote.objects.create(author=self.author, text="Imagination rolled back")
+            raise IntegrityError
+        self.assertEqual(search(), {quote.id})
+
+        # written by another worker, this one only sees the generation of the listing bumped
+        other, = Quote.objects.bulk_create([Quote(author=self.author, text="Imagination elsewhere")])
+        self.assertEqual(search(), {quote.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            response_cache.invalidate(list_scope("quote"))
+        self.assertEqual(search(), {quote.id, other.id})
+
+
+        quote = self._get_quote()
+        with self.assertNumQueries(2):
+            response = self.client.get(self._url, {"search": str(quote.id)}, format='json')
+        self.assertEqual([item["id"] for item in response.data["results"]], [str(quote.id)])
+
+    def test_failure_keyset_cursor(self):
+        response = self.client.get(self._url, {"cursor": "invalid"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_retrieve(self):
         quote = self._get_quote()
         quote_id = str(quote.id)
 
-        response = self.client.get(f'{self._url}{quote_id}/', format='json')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'{self._url}{quote_id}/', format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], quote_id)
         self.assertEqual(response.data['text'], quote.text)
+        self.assertFalse(QuoteStat.objects.filter(quote=quote).exists())
 
     def test_failure_retrieve(self):
         tag_id = "non-existent"
@@ -253,6 +412,8 @@ class QuoteTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('id', response.data)
         self.assertEqual(response.data['text'], "new quote test")
+        self.assertEqual(response.data['stat']['views'], 0)
+        self.assertTrue(QuoteStat.objects.filter(quote_id=response.data['id']).exists())
 
     def test_failure_text_of_quote(self):
         author_url = reverse("author-detail", kwargs={"author_id": str(self.author.id)})
@@ -282,3 +443,1174 @@ class QuoteTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['id'], quote_id)
         self.assertEqual(response.data['text'], quote.text)
+
+
+    def test_filter_by_tags(self):
+        wisdom, courage, hope = Tag.objects.create(name="wisdom"), Tag.objects.create(name="courage"), Tag.objects.create(name="hope")
+        self.quotes[0].tags.add(wisdom, courage)
+        self.quotes[1].tags.add(wisdom)
+        self.quotes[2].tags.add(courage, hope)
+
+        def get_ids(**params):
+            response = self.client.get(self._url, params, format='json')
+            self.assertEqual(response.data["count"], len(response.data["results"]))
+            return {quote["id"] for quote in response.data["results"]}
+
+        both = f"{wisdom.id},{courage.id}"
+        expected_any = {str(quote.id) for quote in self.quotes[:3]}
+        self.assertEqual(get_ids(tags=both), expected_any)
+        self.assertEqual(get_ids(tags_any=both), expected_any)
+        self.assertEqual(get_ids(tags_all=both), {str(self.quotes[0].id)})
+        self.assertEqual(get_ids(tags_all=f"{both},{hope.id}"), set())
+        self.assertEqual(get_ids(tags_all=f"{courage.id},{courage.id}"), {str(self.quotes[0].id), str(self.quotes[2].id)})
+
+    def test_filter_by_authors(self):
+        other_author = Author.objects.create(first_name='Jane', birth_date='1990-01-01')
+        Quote.objects.create(author=other_author, text="Some text number ten")
+        response = self.client.get(self._url, {"author_id": f"{self.author.id},{other_author.id}"}, format='json')
+        self.assertEqual(response.data["count"], 11)
+        response = self.client.get(self._url, {"author_id": str(other_author.id)}, format='json')
+        self.assertEqual(response.data["count"], 1)
+
+    def test_filter_invalid_values(self):
+        response = self.client.get(self._url, {"tags_all": "not-an-id"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags_all", response.data)
+        response = self.client.get(self._url, {"author_id": "1"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.other_author = Author.objects.create(first_name='Jane', last_name='Doe', birth_date='1990-01-01')
+        self.tags = [Tag.objects.create(name=f"tag-{num}") for num in range(3)]
+        cache.clear()
+
+    def _counts(self):
+        authors = dict(Author.objects.values_list("first_name", "quotes_count"))
+        views = dict(Author.objects.values_list("first_name", "views_total"))
+        return authors, views, [tag.quotes_count for tag in Tag.objects.order_by("name")]
+
+    def test_write_paths(self):
+        payload = {
+            "author": reverse("author-detail", kwargs={"author_id": str(self.author.id)}),
+            "text": "Some text number one",
+            "tags": [str(tag.id) for tag in self.tags[:2]],
+        }
+        quote_id = self.client.post(reverse('quote-list'), payload, format='json').data["id"]
+        quote = Quote.objects.get(id=quote_id)
+        Quote.objects.create(author=self.author, text="Some text number two").tags.add(self.tags[0])
+        self.assertEqual(self._counts(), ({"John": 2, "Jane": 0}, {"John": 0, "Jane": 0}, [2, 1, 0]))
+
+        get_view_counter().incr(quote_id, 3)
+        flush_view_counters()
+        self.assertEqual(self._counts()[1], {"John": 3, "Jane": 0})
+
+        other_author_url = reverse("author-detail", kwargs={"author_id": str(self.other_author.id)})
+        quote_url = reverse('quote-detail', kwargs={"quote_id": quote_id})
+        payload = {"author": other_author_url, "tags": [str(self.tags[1].id), str(self.tags[2].id)]}
+        self.client.patch(quote_url, payload, format='json')
+        self.assertEqual(self._counts(), ({"John": 1, "Jane": 1}, {"John": 0, "Jane": 3}, [1, 1, 1]))
+
+        self.tags[1].quotes.clear()
+        quote.tags.remove(self.tags[0], self.tags[2])
+        self.assertEqual(self._counts()[2], [1, 0, 0])
+
+        Quote.objects.all().delete()
+        self.assertEqual(self._counts(), ({"John": 0, "Jane": 0}, {"John": 0, "Jane": 0}, [0, 0, 0]))
+
+    def test_cached_counters(self):
+        author_url = reverse("author-detail", kwargs={"author_id": str(self.author.id)})
+        tag_url = reverse("tag-detail", kwargs={"tag_id": str(self.tags[0].id)})
+        self.assertEqual(self.client.get(author_url, format='json').json()["quotes_count"], 0)
+        self.assertEqual(self.client.get(tag_url, format='json').json()["quotes_count"], 0)
+        self.assertEqual(self.client.get(reverse('author-list'), format='json').json()["results"][0]["quotes_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.create(author=self.author, text="Some text number one").tags.add(self.tags[0])
+        self.assertEqual(self.client.get(author_url, format='json').json()["quotes_count"], 1)
+        self.assertEqual(self.client.get(tag_url, format='json').json()["quotes_count"], 1)
+        response = self.client.get(reverse('author-list'), format='json')
+        self.assertEqual({author["quotes_count"] for author in response.json()["results"]}, {0, 1})
+
+        # views are eventually consistent, flushing them keeps the cached responses
+        get_view_counter().incr(Quote.objects.get().id)
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_view_counters()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(author_url, format='json').json()["views_total"], 0)
+
+    def test_rebuild(self):
+        quotes = Quote.objects.bulk_create([
+            Quote(author=self.author, text=f"Some text number {num}") for num in range(3)
+        ])
+        Quote.tags.through.objects.bulk_create([Quote.tags.through(quote=quote, tag=self.tags[0]) for quote in quotes])
+        QuoteStat.objects.bulk_create([QuoteStat(quote=quote, views=2) for quote in quotes])
+        # saving a stale instance leaves the counters alone
+        Author.objects.filter(id=self.other_author.id).update(quotes_count=5)
+        self.other_author.last_name = "Smith"
+        self.other_author.save()
+
+        rebuild_counters_if_needed()
+        self.assertEqual(self._counts(), ({"John": 3, "Jane": 0}, {"John": 6, "Jane": 0}, [3, 0, 0]))
+
+        Tag.objects.update(quotes_count=7)
+        call_command("rebuild_counters", stdout=io.StringIO())
+        self.assertEqual(self._counts()[2], [3, 0, 0])
+
+    def test_top(self):
+        Author.objects.filter(id=self.author.id).update(quotes_count=1, views_total=10)
+        Author.objects.filter(id=self.other_author.id).update(quotes_count=2, views_total=5)
+        Tag.objects.filter(id=self.tags[2].id).update(quotes_count=4)
+
+        response = self.client.get(reverse('author-top'), format='json')
+        self.assertEqual([author["id"] for author in response.data], [str(self.other_author.id), str(self.author.id)])
+        response = self.client.get(reverse('author-top'), {"by": "views", "limit": 1, "fields": "id"}, format='json')
+        self.assertEqual(response.data, [{"id": str(self.author.id)}])
+        response = self.client.get(reverse('tag-top'), {"limit": 1}, format='json')
+        self.assertEqual(response.data, [{"id": str(self.tags[2].id), "name": "tag-2", "quotes_count": 4}])
+
+        for params in ({"by": "tags"}, {"limit": 0}, {"limit": "many"}, {"limit": 1000}):
+            response = self.client.get(reverse('author-top'), params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        self.authors = [
+            Author.objects.create(first_name=first_name, last_name=last_name, birth_date='1990-01-01')
+            for first_name, last_name in (("John", "Doe"), ("Johanna", "Smith"), ("Jane", "Johnson"), ("Mark", "Twain"))
+        ]
+        for author, quotes_count in zip(self.authors, (1, 3, 2, 5)):
+            Author.objects.filter(id=author.id).update(quotes_count=quotes_count)
+        self.tags = [Tag.objects.create(name=name) for name in ("life", "love", "wisdom")]
+        Tag.objects.filter(id=self.tags[1].id).update(quotes_count=2)
+        cache.clear()
+
+    def _ids(self, url, q, **params):
+        response = self.client.get(url, {"q": q, "fields": "id", **params}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["id"] for item in response.data]
+
+    def test_prefix_ranked_by_popularity(self):
+        url = reverse('author-autocomplete')
+        ids = [str(author.id) for author in self.authors]
+        # any name starting with the prefix, case-insensitive, most quotes first
+        self.assertEqual(self._ids(url, "jo"), [ids[1], ids[2], ids[0]])
+        self.assertEqual(self._ids(url, "JO", limit=1), [ids[1]])
+        self.assertEqual(self._ids(url, "jo do"), [ids[0]])
+        self.assertEqual(self._ids(url, "ohn"), [])
+        self.assertEqual(self._ids(url, ids[3]), [ids[3]])
+        self.assertEqual(self._ids(reverse('tag-autocomplete'), "l"), [str(self.tags[1].id), str(self.tags[0].id)])
+
+        for params in ({}, {"q": " "}, {"q": "jo", "limit": 0}, {"q": "jo", "limit": 1000}):
+            response = self.client.get(url, params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_autocomplete(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="admin"))
+        params = {"app_label": "quotes", "model_name": "quote", "field_name": "author"}
+        response = self.client.get(reverse('admin:autocomplete'), {"term": "jo", **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = [item["id"] for item in response.json()["results"]]
+        self.assertEqual(results, [str(self.authors[index].id) for index in (1, 2, 0)])
+
+
+@override_settings(BULK_WRITE_MAX_QUOTES=20)
+class BulkWriteTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.other_author = Author.objects.create(first_name='Jane', last_name='Doe', birth_date='1990-01-01')
+        self.tags = Tag.objects.bulk_create([Tag(name=f"tag-{num}") for num in range(10)])
+        self.quote = Quote.objects.create(author=self.author, text="Some text number one")
+        self.quote.tags.add(*self.tags[:3])
+        self._url = reverse('quote-bulk')
+        cache.clear()
+
+    def _author_url(self, author):
+        return reverse("author-detail", kwargs={"author_id": str(author.id)})
+
+    def _payload(self, quotes: int, tags: int) -> list[dict]:
+        return [
+            {
+                "id": str(self.quote.id),
+                "author": self._author_url(self.other_author),
+                "tags": [str(tag.id) for tag in self.tags[2:2 + tags]],
+            },
+            *({
+                "text": f"Bulk text number {num}",
+                "author": self._author_url(self.author),
+                "tags": [str(tag.id) for tag in self.tags[:tags]],
+            } for num in range(quotes)),
+        ]
+
+    def test_bulk_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self._url, self._payload(quotes=2, tags=4), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]["id"], str(self.quote.id))
+        self.assertEqual(response.data[0]["text"], "Some text number one")
+        self.assertTrue(response.data[0]["author"].endswith(self._author_url(self.other_author)))
+        stat = QuoteStat.objects.get(quote_id=response.data[1]["id"])
+        self.assertEqual(response.data[1]["stat"], {"id": str(stat.id), "views": 0})
+
+        self.assertEqual(set(self.quote.tags.all()), set(self.tags[2:6]))
+        self.assertEqual(Quote.objects.get(id=response.data[2]["id"]).tags.count(), 4)
+        self.assertEqual(Quote.objects.filter(text__startswith="Bulk text").count(), 2)
+        # the cached listing is invalidated
+        self.assertEqual(self.client.get(reverse('quote-list'), format='json').data["count"], 3)
+
+    def test_queries_do_not_grow(self):
+        def count_queries(quotes, tags):
+            # every run moves the updated quote to another author and replaces some of its tags
+            Quote.objects.filter(id=self.quote.id).update(author=self.author)
+            self.quote.tags.set(self.tags[:3])
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.post(self._url, self._payload(quotes, tags), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(captured)
+
+        self.assertEqual(count_queries(quotes=1, tags=1), count_queries(quotes=10, tags=8))
+
+    def test_errors(self):
+        missing_id = "00000000-0000-0000-0000-000000000000"
+        payload = [
+            {"text": "Some valid text", "author": self._author_url(self.author)},
+            {"id": missing_id, "tags": [missing_id]},
+            {"text": "Some valid text"},
+        ]
+        response = self.client.post(self._url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(set(response.data[2]), {"author"})
+
+        payload = payload[:2]
+        response = self.client.post(self._url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(set(response.data[1]), {"id", "tags"})
+        self.assertEqual(Quote.objects.count(), 1)
+
+        for payload in ([], [{"id": str(self.quote.id)}] * 2, self._payload(quotes=20, tags=1)):
+            response = self.client.post(self._url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.tag = Tag.objects.create(name="life")
+        self.quotes = Quote.objects.bulk_create([
+            Quote(author=self.author, text=f"Some text number {num}") for num in range(3)
+        ])
+        self.quotes[0].tags.add(self.tag)
+        QuoteStat.objects.create(quote=self.quotes[0], views=5)
+        self._url = reverse('quote-list')
+        cache.clear()
+
+    def test_listing_matches_quote_serializer(self):
+        response = self.client.get(self._url, format='json')
+        self.assertEqual(len(response.data["results"]), 3)
+        for item in response.data["results"]:
+            detail = self.client.get(reverse('quote-detail', kwargs={"quote_id": item["id"]}), format='json')
+            self.assertEqual(json.loads(json.dumps(item)), detail.json())
+
+    def test_fields(self):
+        response = self.client.get(self._url, {"fields": "text,id"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([list(item) for item in response.data["results"]], [["id", "text"]] * 3)
+
+        quote_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        response = self.client.get(quote_url, {"fields": "stat"}, format='json')
+        self.assertEqual(response.data, {"stat": {"id": str(self.quotes[0].stat.id), "views": 5}})
+
+        response = self.client.get(reverse('author-list'), {"fields": "full_name"}, format='json')
+        self.assertEqual(response.data["results"], [{"full_name": "John Doe"}])
+        response = self.client.get(reverse('quote-tags', kwargs={"quote_id": str(self.quotes[0].id)}), {"fields": "name"})
+        self.assertEqual(response.data, [{"name": "life"}])
+
+    def test_fields_on_write(self):
+        # write-only fields are still accepted
+        payload = {
+            "author": reverse("author-detail", kwargs={"author_id": str(self.author.id)}),
+            "text": "new quote test",
+            "tags": [str(self.tag.id)],
+        }
+        response = self.client.post(f"{self._url}?fields=id", payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(response.data), ["id"])
+        self.assertTrue(Quote.objects.filter(id=response.data["id"], tags=self.tag).exists())
+
+    def test_unknown_fields(self):
+        for url in (self._url, reverse('author-list')):
+            response = self.client.get(url, {"fields": "id,first_name"}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("fields", response.data)
+
+        response = self.client.get(self._url, {"expand": "stat"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", response.data)
+
+    def test_expand(self):
+        Quote.objects.bulk_create([Quote(author=self.author, text=f"Another text number {num}") for num in range(5)])
+        expected_author = {
+            "id": str(self.author.id),
+            "full_name": "John Doe",
+            "birth_date": "1990-01-01",
+            "death_date": None,
+            # the quotes were inserted by bulk_create
+            "quotes_count": 0,
+            "views_total": 0,
+        }
+
+        with self.assertNumQueries(3):  # count, page with authors, tags
+            response = self.client.get(self._url, {"expand": "tags,author"}, format='json')
+        results = {item["id"]: item for item in response.data["results"]}
+        self.assertEqual(len(results), 8)
+        self.assertEqual(
+            results[str(self.quotes[0].id)]["tags"], [{"id": str(self.tag.id), "name": "life", "quotes_count": 1}]
+        )
+        self.assertEqual(results[str(self.quotes[1].id)]["tags"], [])
+        self.assertEqual(results[str(self.quotes[0].id)]["author"], expected_author)
+
+        quote_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        with self.assertNumQueries(2):
+            response = self.client.get(quote_url, {"expand": "tags,author"}, format='json')
+        self.assertEqual(json.loads(json.dumps(results[str(self.quotes[0].id)])), response.json())
+
+        response = self.client.get(self._url, {"fields": "id", "expand": "tags"}, format='json')
+        self.assertEqual(list(response.data["results"][0]), ["id", "tags"])
+
+    def test_expanded_quote_is_invalidated(self):
+        quote_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        self.client.get(quote_url, {"expand": "tags"}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = "love"
+            self.tag.save()
+        response = self.client.get(quote_url, {"expand": "tags"}, format='json')
+        self.assertEqual(response.data["tags"], [{"id": str(self.tag.id), "name": "love", "quotes_count": 1}])
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER, BATCH_GET_MAX_IDS=5)
+class BatchGetTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        self.tag = Tag.objects.create(name="life")
+        self.quotes = Quote.objects.bulk_create([
+            Quote(author=self.author, text=f"Some text number {num}") for num in range(4)
+        ])
+        self.quotes[2].tags.add(self.tag)
+        self._url = reverse('quote-batch-get')
+        cache.clear()
+
+    def test_batch_get(self):
+        missing_id = "00000000-0000-0000-0000-000000000000"
+        ids = [str(self.quotes[2].id), missing_id, str(self.quotes[0].id), str(self.quotes[2].id)]
+        with self.assertNumQueries(1):
+            response = self.client.post(self._url, {"ids": ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([quote["id"] for quote in response.data["results"]], [ids[0], ids[2]])
+        self.assertEqual([str(quote_id) for quote_id in response.data["missing"]], [missing_id])
+
+        detail = self.client.get(reverse('quote-detail', kwargs={"quote_id": ids[0]}), format='json')
+        self.assertEqual(json.loads(json.dumps(response.data["results"][0])), detail.json())
+        self.assertEqual(get_view_counter().buffer.drain(), {ids[0]: 2, ids[2]: 1})
+
+    def test_batch_get_fields_and_expand(self):
+        payload = {"ids": [str(self.quotes[2].id)]}
+        with self.assertNumQueries(2):
+            response = self.client.post(f"{self._url}?fields=id&expand=tags", payload, format='json')
+        expected_tags = [{"id": str(self.tag.id), "name": "life", "quotes_count": 1}]
+        self.assertEqual(response.data["results"], [{"id": str(self.quotes[2].id), "tags": expected_tags}])
+
+        payload = {"ids": [str(self.author.id)]}
+        response = self.client.post(f"{reverse('author-batch-get')}?fields=full_name", payload, format='json')
+        self.assertEqual(response.data, {"results": [{"full_name": "John Doe"}], "missing": []})
+        response = self.client.post(reverse('tag-batch-get'), {"ids": [str(self.tag.id)]}, format='json')
+        self.assertEqual(response.data["results"], [{"id": str(self.tag.id), "name": "life", "quotes_count": 1}])
+
+    def test_invalid_ids(self):
+        too_many = [str(quote.id) for quote in self.quotes] + [str(self.author.id), str(self.tag.id)]
+        for ids in ([], ["non-existent"], too_many):
+            response = self.client.post(self._url, {"ids": ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("ids", response.data)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class ViewCounterTests(APITestCase):
+    def setUp(self):
+        author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quote = Quote.objects.create(author=author, text="Some text number one")
+        self._url = reverse('quote-detail', kwargs={"quote_id": str(self.quote.id)})
+        cache.clear()
+
+    def _get_views(self):
+        return QuoteStat.objects.get(quote=self.quote).views
+
+    def test_retrieve_is_buffered(self):
+        response = self.client.get(self._url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(QuoteStat.objects.filter(quote=self.quote, views__gt=0).exists())
+
+        get_view_counter().flush()
+        self.assertEqual(self._get_views(), 1)
+
+    def test_flush_command_needs_shared_buffer(self):
+        # the buffer of another process cannot be reached, flushing it would always report 0 views
+        self.client.get(self._url, format='json')
+        with self.assertRaises(CommandError):
+            call_command("flush_view_counters", stdout=open(os.devnull, "w"))
+
+    def test_flush_skips_deleted_quotes(self):
+        counter = get_view_counter()
+        self.client.get(self._url, format='json')
+        self.quote.delete()
+        self.assertEqual(counter.flush(), 0)
+        self.assertEqual(counter.buffer.drain(), {})
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class ConcurrentViewCounterTests(APITransactionTestCase):
+    """The retrieving threads see the quote committed, unlike in a test wrapped in a transaction."""
+
+    def setUp(self):
+        author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quote = Quote.objects.create(author=author, text="Some text number one")
+        self._url = reverse('quote-detail', kwargs={"quote_id": str(self.quote.id)})
+        cache.clear()
+
+    def test_no_lost_views_on_concurrent_retrieves(self):
+        views_per_worker, workers = 50, 8
+
+        def retrieve(worker):
+            client = APIClient()
+            try:
+                for num in range(views_per_worker):
+                    self.assertEqual(client.get(self._url, format='json').status_code, status.HTTP_200_OK)
+                    # flushes interleave with the retrieves of the other workers
+                    if num % 10 == worker:
+                        flush_view_counters()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(retrieve, range(workers)))
+        flush_view_counters()
+
+        self.assertEqual(QuoteStat.objects.get(quote=self.quote).views, views_per_worker * workers)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class TrendingTests(APITestCase):
+    def setUp(self):
+        author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quotes = [Quote.objects.create(author=author, text=f"Some text number {i}") for i in range(3)]
+        self._url = reverse('quote-trending')
+        self.now = datetime.datetime(2026, 1, 10, 12, 30, tzinfo=datetime.timezone.utc)
+        cache.clear()
+
+    def _bucket(self, quote, start, views, resolution=QuoteViewBucket.HOUR):
+        return QuoteViewBucket.objects.create(quote=quote, resolution=resolution, start=start, views=views)
+
+    def test_trending_counts_retrieves(self):
+        for quote, views in zip(self.quotes, (1, 3)):
+            for _ in range(views):
+                self.client.get(reverse('quote-detail', kwargs={"quote_id": str(quote.id)}), format='json')
+        get_view_counter().flush()
+        self.assertEqual(QuoteViewBucket.objects.filter(resolution=QuoteViewBucket.HOUR).count(), 2)
+
+        # ranked by the flush, the request only reads the quotes
+        with self.assertNumQueries(1):
+            response = self.client.get(self._url, {"window": "1h", "fields": "id"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"window": "1h", "results": [
+            {"views": 3, "quote": {"id": str(self.quotes[1].id)}},
+            {"views": 1, "quote": {"id": str(self.quotes[0].id)}},
+        ]})
+
+        # the ranking is cached, deleted quotes are left out until it is recomputed
+        self.quotes[1].delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(self._url, {"window": "1h", "fields": "id"}, format='json')
+        self.assertEqual(response.data["results"], [{"views": 1, "quote": {"id": str(self.quotes[0].id)}}])
+
+    def test_windows(self):
+        self._bucket(self.quotes[0], self.now - datetime.timedelta(hours=3), 10)
+        self._bucket(self.quotes[1], bucket_start(self.now, QuoteViewBucket.HOUR), 2)
+        self._bucket(self.quotes[1], bucket_start(self.now, QuoteViewBucket.DAY) - datetime.timedelta(days=2), 2,
+                     resolution=QuoteViewBucket.DAY)
+        self._bucket(self.quotes[2], bucket_start(self.now, QuoteViewBucket.DAY) - datetime.timedelta(days=3), 50,
+                     resolution=QuoteViewBucket.DAY)
+
+        def ranking(window):
+            return [(str(quote_id), views) for quote_id, views in rank_quotes(window, now=self.now)]
+
+        quote_ids = [str(quote.id) for quote in self.quotes]
+        self.assertEqual(ranking("1h"), [(quote_ids[1], 2)])
+        self.assertEqual(ranking("24h"), [(quote_ids[0], 10), (quote_ids[1], 2)])
+        self.assertEqual(ranking("7d"), [(quote_ids[2], 50), (quote_ids[0], 10), (quote_ids[1], 4)])
+
+        # the window starts halfway through the oldest bucket, so half of its views count
+        self._bucket(self.quotes[2], bucket_start(self.now, QuoteViewBucket.HOUR) - datetime.timedelta(hours=1), 10)
+        self.assertEqual(ranking("1h"), [(quote_ids[2], 5), (quote_ids[1], 2)])
+
+        response = self.client.get(self._url, {"window": "1w"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("window", response.data)
+
+    def test_compaction(self):
+        quote = self.quotes[0]
+        day = datetime.datetime(2026, 1, 8, tzinfo=datetime.timezone.utc)
+        for hour, views in ((5, 1), (6, 2)):
+            self._bucket(quote, day.replace(hour=hour), views)
+        self._bucket(self.quotes[1], day.replace(hour=7), 4)
+        self._bucket(quote, day, 5, resolution=QuoteViewBucket.DAY)
+        recent = self._bucket(quote, bucket_start(self.now, QuoteViewBucket.HOUR), 1)
+        self._bucket(quote, day - datetime.timedelta(days=7), 9, resolution=QuoteViewBucket.DAY)
+
+        self.assertEqual(compact_view_buckets(now=self.now), (3, 1))
+        buckets = QuoteViewBucket.objects.values_list("quote_id", "resolution", "start", "views")
+        self.assertCountEqual(buckets, [
+            (quote.id, QuoteViewBucket.DAY, day, 8),
+            (self.quotes[1].id, QuoteViewBucket.DAY, day, 4),
+            (quote.id, QuoteViewBucket.HOUR, recent.start, 1),
+        ])
+        self.assertEqual(compact_view_buckets(now=self.now), (0, 0))
+
+    def test_single_ranking_request(self):
+        self._bucket(self.quotes[0], bucket_start(timezone.now(), QuoteViewBucket.HOUR), 3)
+        cache.add("quotes:trending:1h:lock", 1)
+
+        # another request is ranking the quotes, nothing to serve meanwhile
+        with self.assertNumQueries(0):
+            self.assertEqual(trending_quotes("1h"), [])
+
+        # it failed, rank them
+        cache.delete("quotes:trending:1h:lock")
+        self.assertEqual(trending_quotes("1h"), [(self.quotes[0].id, 3)])
+        self.assertEqual(cache.get("quotes:trending:1h"), [(self.quotes[0].id, 3)])
+
+        # the ranking expired and another request is ranking the quotes again, serve the previous ranking
+        self._bucket(self.quotes[1], bucket_start(timezone.now(), QuoteViewBucket.HOUR), 5)
+        cache.delete("quotes:trending:1h")
+        cache.add("quotes:trending:1h:lock", 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(trending_quotes("1h"), [(self.quotes[0].id, 3)])
+
+    def test_flush_compacts_once_per_interval(self):
+        old = timezone.now() - datetime.timedelta(days=30)
+        counter = get_view_counter()
+        self._bucket(self.quotes[1], old, 1)
+        counter.incr(self.quotes[0].id)
+        counter.flush()
+        self.assertEqual(list(QuoteViewBucket.objects.values_list("quote_id", flat=True)), [self.quotes[0].id])
+
+        self._bucket(self.quotes[1], old, 1)
+        counter.incr(self.quotes[0].id)
+        counter.flush()
+        self.assertEqual(QuoteViewBucket.objects.filter(quote=self.quotes[1]).count(), 1)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.tag = Tag.objects.create(name="wisdom")
+        self.quote = Quote.objects.create(author=self.author, text="Some text number one")
+        self._list_url = reverse('quote-list')
+        self._detail_url = reverse('quote-detail', kwargs={"quote_id": str(self.quote.id)})
+        cache.clear()
+
+    def test_cached_list(self):
+        response = self.client.get(self._list_url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self._list_url, format='json')
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response["ETag"], response["ETag"])
+
+    def test_invalidation(self):
+        self.client.get(self._list_url, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.create(author=self.author, text="Some text number two")
+        response = self.client.get(self._list_url, format='json')
+        self.assertEqual(response.json()["count"], 2)
+
+        tags_url = reverse('quote-tags', kwargs={"quote_id": str(self.quote.id)})
+        self.assertEqual(self.client.get(tags_url, format='json').json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.quotes.add(self.quote)
+        self.assertEqual(self.client.get(tags_url, format='json').json()[0]["name"], "wisdom")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = "courage"
+            self.tag.save()
+        self.assertEqual(self.client.get(tags_url, format='json').json()[0]["name"], "courage")
+
+    def test_non_canonical_ids(self):
+        url = reverse('quote-detail', kwargs={"quote_id": self.quote.id.hex.upper()})
+        self.assertEqual(self.client.get(url, format='json').json()["text"], "Some text number one")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self._detail_url, {"text": "Some text number two"}, format='json')
+        # cached under the same scope as the canonical id, and counted as views of the quote
+        self.assertEqual(self.client.get(url, format='json').json()["text"], "Some text number two")
+        self.client.get(url, format='json')
+        self.assertEqual(get_view_counter().buffer.drain()[str(self.quote.id)], 3)
+
+    def test_conditional_get(self):
+        response = self.client.get(self._detail_url, format='json')
+        response = self.client.get(self._detail_url, format='json', HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self._detail_url, format='json', HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_retrieve_counts_views(self):
+        for _ in range(3):
+            self.client.get(self._detail_url, format='json')
+        get_view_counter().flush()
+        self.assertEqual(QuoteStat.objects.get(quote=self.quote).views, 3)
+
+
+class DelayedBumpsTests(SimpleTestCase):
+    def test_single_thread(self):
+        bumped = []
+        bumps = DelayedBumps(bumped.extend)
+        before = threading.active_count()
+        bumps.schedule(["list:quote", "object:quote:1"], 0.2)
+        bumps.schedule(["list:quote"], 0.2)
+        bumps.schedule(["list:author"], 0.2)
+        # one thread for every invalidation, and a scope invalidated twice is bumped once
+        self.assertEqual(threading.active_count(), before + 1)
+        self.assertEqual(bumps.pending(), {"list:quote", "object:quote:1", "list:author"})
+        deadline = time.monotonic() + 5
+        while len(bumped) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(bumped), ["list:author", "list:quote", "object:quote:1"])
+        self.assertEqual(bumps.pending(), set())
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quotes = [Quote.objects.create(author=self.author, text=f"Some text number {num}") for num in range(12)]
+        self._list_url = reverse('quote-list')
+        self._detail_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        cache.clear()
+
+    def test_reads_are_async(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(self._list_url).func))
+        response = self.client.get(self._list_url, format='json')
+        self.assertIsInstance(response, RenderedResponse)
+        self.assertEqual(response.data["count"], 12)
+
+        # other renderers and methods are served by the sync viewset
+        self.assertNotIsInstance(self.client.get(self._list_url, {"format": "api"}), RenderedResponse)
+        with override_settings(ASYNC_READ_VIEWS=False):
+            response = self.client.get(self._list_url, format='json')
+        self.assertNotIsInstance(response, RenderedResponse)
+        self.assertEqual(response.json()["count"], 12)
+
+    def test_async_pagination(self):
+        response = self.client.get(self._list_url, {"page": 2}, format='json')
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(self.client.get(self._list_url, {"page": 3}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(self._list_url, {"pagination": "keyset"}, format='json')
+        next_page = self.client.get(response.data["next"], format='json')
+        self.assertEqual(len(response.data["results"]) + len(next_page.data["results"]), 12)
+
+    async def test_async_retrieve(self):
+        response = await self.async_client.get(self._detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["id"], str(self.quotes[0].id))
+        await self.async_client.get(self._detail_url)
+        self.assertEqual(get_view_counter().buffer.drain(), {str(self.quotes[0].id): 2})
+
+        missing_url = reverse('quote-detail', kwargs={"quote_id": "00000000-0000-0000-0000-000000000000"})
+        self.assertEqual((await self.async_client.get(missing_url)).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class RandomQuoteTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.other_author = Author.objects.create(first_name='Jane', birth_date='1990-01-01')
+        self.quotes = [
+            Quote.objects.create(author=self.author, text=f"Some text number {num}", random_key=num / 10)
+            for num in range(5)
+        ]
+        self.other_quote = Quote.objects.create(author=self.other_author, text="Some other text", random_key=0.9)
+        cache.clear()
+
+    def test_pick_quote(self):
+        queryset = Quote.objects.all()
+        with self.assertNumQueries(1):
+            self.assertEqual(pick_quote(queryset, 0.15), self.quotes[2])
+        # past the last key the pick wraps around to the first
+        self.assertEqual(pick_quote(queryset, 0.95), self.quotes[0])
+        self.assertEqual(pick_quote(queryset.filter(author=self.other_author), 0.1), self.other_quote)
+        self.assertIsNone(pick_quote(queryset.none(), 0.5))
+
+    def test_random(self):
+        url = reverse('quote-random')
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, {"author_id": str(self.other_author.id)}, format='json')
+        self.assertEqual(response.data["id"], str(self.other_quote.id))
+        # random picks are not views
+        self.assertNotIn(str(self.other_quote.id), get_view_counter().buffer.drain())
+        response = self.client.get(url, {"tags": "00000000-0000-0000-0000-000000000000"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_daily(self):
+        url = reverse('quote-daily')
+        quote_id = self.client.get(url, format='json').data["id"]
+        # a quote created during the day does not replace the quote of the day
+        Quote.objects.create(author=self.author, text="Some text number five", random_key=daily_position(timezone.localdate()))
+        self.assertEqual(self.client.get(url, format='json').data["id"], quote_id)
+
+        cache.clear()
+        self.assertEqual(daily_quote(Quote.objects.all(), datetime.date(2020, 1, 1)), daily_quote(Quote.objects.all(), datetime.date(2020, 1, 1)))
+
+    def test_reseed_after_migration(self):
+        reseed_random_keys_if_needed()
+        self.assertEqual(Quote.objects.filter(random_key=0.1).count(), 1)
+
+        Quote.objects.update(random_key=0.5)
+        reseed_random_keys_if_needed()
+        keys = set(Quote.objects.values_list("random_key", flat=True))
+        self.assertEqual(len(keys), 6)
+        self.assertTrue(all(0 <= key < 1 for key in keys))
+
+
+@override_settings(
+    VIEW_COUNTER=LOCAL_VIEW_COUNTER,
+    REQUEST_TIMING={"ENABLED": True, "SAMPLE_RATE": 1.0, "SERVER_TIMING_HEADER": True}
+)
+class RequestTimingTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quote = Quote.objects.create(author=self.author, text="Some text number one")
+        self._detail_url = reverse('quote-detail', kwargs={"quote_id": str(self.quote.id)})
+        metrics.registry.clear()
+        cache.clear()
+
+    def test_server_timing(self):
+        response = self.client.get(self._detail_url, format='json')
+        entries = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertEqual(set(entries), {"db", "serialize", "render", "total"})
+        self.assertIn('desc="1 queries"', entries["db"])
+
+        with override_settings(REQUEST_TIMING={"ENABLED": True, "SAMPLE_RATE": 0.0, "SERVER_TIMING_HEADER": True}):
+            response = self.client.get(self._detail_url, format='json')
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_metrics(self):
+        self.client.get(self._detail_url, format='json')
+        self.client.get(reverse('quote-list'), format='json')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{route="quote-detail",method="GET",status="200"} 1', content)
+        self.assertIn('http_request_db_queries_bucket{route="quote-list",method="GET",le="2"} 1', content)
+        self.assertIn('# TYPE http_request_serialize_duration_seconds histogram', content)
+
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        # forwarded by the reverse proxy, from an allowed address
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR="203.0.113.5")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_of_every_worker(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        metrics.DB_POOL_TIMEOUTS.inc("pooled")
+        metrics.DB_POOL_CONNECTIONS.set(2, "pooled", "in_use")
+        metrics.DB_REPLICA_HEALTHY.set(1, "replica_1")
+        # another worker running, whose replica failed, and one gone
+        running = {**metrics.registry.snapshot(), "db_replica_healthy": [[["replica_1"], 0]]}
+        gone = subprocess.Popen([sys.executable, "-c", "pass"])
+        gone.wait()
+        for pid, snapshot in ((os.getppid(), running), (gone.pid, metrics.registry.snapshot())):
+            with open(os.path.join(directory.name, f"{pid}.json"), "w") as file:
+                json.dump(snapshot, file)
+
+        settings = {"ALLOWED_NETWORKS": ["127.0.0.1"], "MULTIPROCESS_DIR": directory.name, "WRITE_INTERVAL": 5}
+        with override_settings(METRICS=settings):
+            content = self.client.get(reverse('metrics')).content.decode()
+            # the counters of the workers gone are kept, their gauges dropped
+            self.assertIn('db_pool_timeouts_total{alias="pooled"} 3.0', content)
+            self.assertIn('db_pool_connections{alias="pooled",state="in_use"} 4.0', content)
+            self.assertIn('db_replica_healthy{alias="replica_1"} 0', content)
+
+            metrics.registry.archive(directory.name)
+            metrics.registry.clear()
+            content = self.client.get(reverse('metrics')).content.decode()
+            self.assertIn('db_pool_timeouts_total{alias="pooled"} 3.0', content)
+            self.assertIn('db_pool_connections{alias="pooled",state="in_use"} 2', content)
+
+
+@override_settings(VIEW_COUNTER=LOCAL_VIEW_COUNTER)
+class RenderingTests(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='John', birth_date='1990-01-01')
+        self.quotes = [
+            Quote.objects.create(author=self.author, text=f"Some text number {num} " * 5) for num in range(10)
+        ]
+        self._compact = "application/vnd.quotes.compact+json"
+        cache.clear()
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            "id": self.author.id,
+            "at": timezone.now(),
+            "amount": decimal.Decimal("1.50"),
+            "text": "line\u2028separator é",
+            "error": ErrorDetail("invalid", code="invalid"),
+            "lazy": gettext_lazy("This field is required."),
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+        if orjson is not None:
+            # where JSONRenderer raises
+            self.assertEqual(FastJSONRenderer().render([float("nan"), float("inf")]), b"[null,null]")
+
+    def test_compact(self):
+        response = self.client.get(reverse('quote-list'), HTTP_ACCEPT=self._compact)
+        self.assertIsInstance(response, RenderedResponse)
+        self.assertEqual(response["Content-Type"], self._compact)
+        quote = response.json()["results"][0]
+        self.assertEqual(quote["author"], str(self.author.id))
+        self.assertNotIn("tag_listing", quote)
+
+        detail_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        response = self.client.get(detail_url, {"format": "compact"})
+        self.assertEqual(response.json()["author"], str(self.author.id))
+        self.assertNotIn("tag_listing", response.json())
+
+        payload = {"author": str(self.author.id), "text": "Some text number eleven"}
+        response = self.client.post(reverse('quote-list'), payload, format='json', HTTP_ACCEPT=self._compact)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["author"], str(self.author.id))
+
+    def test_compression(self):
+        url = reverse('quote-list')
+        plain = self.client.get(url, format='json')
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.client.get(url, format='json', HTTP_ACCEPT_ENCODING="gzip;q=0.5, identity")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        for accept_encoding in ("gzip;q=0", "identity", "compress"):
+            response = self.client.get(url, format='json', HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertFalse(response.has_header("Content-Encoding"))
+        # below the size threshold
+        detail_url = reverse('quote-detail', kwargs={"quote_id": str(self.quotes[0].id)})
+        response = self.client.get(detail_url, format='json', HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_negotiate_encoding(self):
+        codecs = ("zstd", "br", "gzip")
+        self.assertEqual(negotiate_encoding("gzip, deflate, br, zstd", codecs), "zstd")
+        self.assertEqual(negotiate_encoding("gzip, br;q=0.8", codecs), "gzip")
+        self.assertEqual(negotiate_encoding("*;q=0.5, zstd;q=0", codecs), "br")
+        self.assertIsNone(negotiate_encoding("deflate, gzip;q=0", codecs))
+        self.assertIsNone(negotiate_encoding("", codecs))
+
+
+class PooledSQLiteDatabaseWrapper(PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(close_pools)
+
+    def _wrapper(self, **pool_options):
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict["OPTIONS"]["pool"] = {"max_size": 2, **pool_options}
+        return PooledSQLiteDatabaseWrapper(settings_dict, alias="pooled")
+
+    def _in_use(self):
+        return metrics.DB_POOL_CONNECTIONS._values[("pooled", "in_use")]
+
+    def test_connections_are_reused(self):
+        wrapper = self._wrapper()
+        wrapper.ensure_connection()
+        raw_connection = wrapper.connection
+        self.assertEqual(self._in_use(), 1)
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE pooled (value integer)")
+        raw_connection.execute("BEGIN")
+        raw_connection.execute("INSERT INTO pooled VALUES (1)")
+        wrapper.close()
+        # rolled back on its way to the pool
+        self.assertFalse(raw_connection.in_transaction)
+        self.assertEqual(self._in_use(), 0)
+
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw_connection)
+        wrapper.close()
+
+        # other threads get the same connection
+        def connect():
+            other = self._wrapper()
+            other.ensure_connection()
+            try:
+                return other.connection
+            finally:
+                other.close()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIs(executor.submit(connect).result(), raw_connection)
+
+    def test_released_with_the_wrapper(self):
+        wrapper = self._wrapper()
+        wrapper.ensure_connection()
+        del wrapper
+        gc.collect()
+        self.assertEqual(self._in_use(), 0)
+
+    def test_limits(self):
+        pool = ConnectionPool("pooled", max_size=1, timeout=0.01, check_after=0)
+        first = pool.acquire(lambda: sqlite3.connect(":memory:", check_same_thread=False))
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(lambda: sqlite3.connect(":memory:"))
+        self.assertEqual(metrics.DB_POOL_TIMEOUTS._values[("pooled",)], 1)
+
+        # a closed connection fails the check and is replaced
+        first.close()
+        pool.release(first)
+        second = pool.acquire(lambda: sqlite3.connect(":memory:", check_same_thread=False))
+        self.assertIsNot(second, first)
+        self.assertIn('db_pool_wait_seconds_count{alias="pooled"} 2', metrics.registry.expose())
+
+        wrapper = self._wrapper(max_size=1, timeout=0.01)
+        wrapper.ensure_connection()
+        other = self._wrapper(max_size=1, timeout=0.01)
+        with self.assertRaises(OperationalError):
+            other.ensure_connection()
+        wrapper.close()
+        other.ensure_connection()
+        other.close()
+
+
+class WorkerTests(SimpleTestCase):
+    def test_restarts_after_max_requests(self):
+        sock = bind("127.0.0.1", 0, 1)
+        self.addCleanup(sock.close)
+        served = []
+
+        async def application(scope, receive, send):
+            served.append(scope["type"])
+
+        server = WorkerServer(application, sock.fileno(), max_requests=2)
+        server.drain = served.append
+        for scope_type in ("http", "websocket", "http"):
+            asyncio.run(server.serve({"type": scope_type}, None, None))
+        # websockets do not count
+        self.assertEqual(served, ["http", "websocket", "served 2 requests", "http"])
+        self.assertEqual(server.family, sock.family)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        CHANNEL_LAYERS={"default": {"BACKEND": "channels_redis.core.RedisChannelLayer"}},
+    )
+    def test_shared_state(self):
+        self.assertEqual(check_shared_state(1), [])
+        with self.assertLogs("server.worker", "WARNING"):
+            warnings = check_shared_state(2)
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("CACHES['default']", warnings[0])
+        self.assertGreater(get_rss(), 0)
+
+
+@override_settings(DATABASE_REPLICAS={"ALIASES": ["replica_1"], "STICKY_WINDOW": 60, "RETRY_AFTER": 60})
+class ReplicaTests(APITransactionTestCase):
+    """A copy of the primary taken mid-test stands in for a lagging replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # added past the checks of the test case, which only knows the databases of the settings
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings["replica_1"] = {
+            **connections.settings["default"], "NAME": os.path.join(cls.replica_dir.name, "replica.sqlite3")
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica_1"].close()
+        del connections["replica_1"]
+        del connections.settings["replica_1"]
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("replicates with sqlite's VACUUM INTO")
+        health.reset()
+        metrics.registry.clear()
+        cache.clear()
+        self.replicated = Author.objects.create(first_name="Replicated", last_name="Author", birth_date="1900-01-01")
+        connections["replica_1"].close()
+        replica = connections["replica_1"].settings_dict["NAME"]
+        if os.path.exists(replica):
+            os.remove(replica)
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM INTO %s", [replica])
+        self.lagging = Author.objects.create(first_name="Lagging", last_name="Author", birth_date="1900-01-01")
+
+    def _get(self, author, client="reader"):
+        return self.client.get(reverse("author-detail", args=[author.id]), HTTP_AUTHORIZATION=f"Token {client}")
+
+    def test_routing(self):
+        self.assertEqual(Author.objects.all().db, "default")
+        with read_from("replica_1"):
+            self.assertEqual(Author.objects.all().db, "replica_1")
+            self.assertEqual(Author.objects.select_for_update().db, "default")
+            with transaction.atomic():
+                # reads in a transaction go with its writes
+                self.assertEqual(Author.objects.all().db, "default")
+
+    def test_reads_from_replica_until_writing(self):
+        self.assertEqual(self._get(self.replicated).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._get(self.lagging).status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(ASYNC_READ_VIEWS=True):
+            self.assertEqual(self._get(self.lagging).status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.patch(
+            reverse("author-detail", args=[self.replicated.id]),
+            {"first_name": "Written"},
+            HTTP_AUTHORIZATION="Token writer",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the writer sticks to the primary, the others still read from the replica
+        self.assertEqual(self._get(self.lagging, "writer").status_code, status.HTTP_200_OK)
+        with override_settings(ASYNC_READ_VIEWS=True):
+            self.assertEqual(self._get(self.lagging, "writer").status_code, status.HTTP_200_OK)
+        # rather than the response cached from the primary
+        cache.clear()
+        self.assertEqual(self._get(self.lagging).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_falls_back_to_primary(self):
+        replica = connections["replica_1"]
+        replica.close()
+        self.addCleanup(replica.settings_dict.__setitem__, "NAME", replica.settings_dict["NAME"])
+        replica.settings_dict["NAME"] = os.path.join(self.replica_dir.name, "missing", "db.sqlite3")
+        self.assertEqual(self._get(self.lagging).status_code, status.HTTP_200_OK)
+        self.assertFalse(health.is_healthy("replica_1"))
+        self.assertEqual(metrics.DB_REPLICA_FALLBACKS._values[("replica_1",)], 1)
+        # left out until retried
+        self.assertEqual(self._get(self.lagging).status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.DB_REPLICA_FALLBACKS._values[("replica_1",)], 1)
+
+
+class ImportTests(APITestCase):
+    def setUp(self):
+        self.tag = Tag.objects.create(name="wisdom")
+        self.author = {"first_name": "John", "last_name": "Doe", "birth_date": "1990-01-01"}
+        self._url = reverse('quote-import')
+
+    def _rows(self, count):
+        return [
+            {"text": f"Some imported quote {num}", "author": self.author, "tags": ["wisdom", f"tag-{num % 3}"]}
+            for num in range(count)
+        ]
+
+    def test_import_command(self):
+        rows = [json.dumps(row) for row in self._rows(20)] + ['{"text": "two words", "author": {}}', "not json"]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as file:
+            file.write("\n".join(rows))
+        self.addCleanup(os.remove, file.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_quotes", file.name, stdout=out, stderr=err)
+        self.assertIn("Imported 20 of 22 rows", out.getvalue())
+        self.assertIn("Line 21", err.getvalue())
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Tag.objects.count(), 4)
+        self.assertEqual(Quote.objects.count(), 20)
+        self.assertEqual(QuoteStat.objects.count(), 20)
+        self.assertEqual(Quote.tags.through.objects.filter(tag=self.tag).count(), 20)
+
+    def test_import_invalidates_cached_counters(self):
+        tag_url = reverse('tag-detail', kwargs={"tag_id": str(self.tag.id)})
+        self.assertEqual(self.client.get(tag_url, format='json').json()["quotes_count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuoteImporter().run(io.StringIO("\n".join(json.dumps(row) for row in self._rows(3))), "jsonl")
+        self.assertEqual(self.client.get(tag_url, format='json').json()["quotes_count"], 3)
+
+    def test_queries_do_not_grow_with_rows(self):
+        importer = QuoteImporter()
+        # savepoint, authors and tags resolved and created, quotes, tags and stats inserted, counters, release
+        with self.assertNumQueries(13):
+            importer.import_chunk(list(enumerate(self._rows(10))))
+        with self.assertNumQueries(9):
+            importer.import_chunk(list(enumerate(self._rows(100))))
+        self.assertEqual(importer.report.created, 110)
+
+    def test_import_endpoint(self):
+        content = "text,author_first_name,author_last_name,author_birth_date,author_death_date,tags\n" \
+                  "Some imported quote here,John,Doe,1990-01-01,,wisdom|courage\n" \
+                  "Too short,John,Doe,1990-01-01,,\n"
+        upload = SimpleUploadedFile("quotes.csv", content.encode(), content_type="text/csv")
+        response = self.client.post(self._url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_superuser("admin", password="admin"))
+        upload.seek(0)
+        response = self.client.post(self._url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["rejected"], 1)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+        self.assertEqual(set(Quote.objects.get().tags.values_list("name", flat=True)), {"wisdom", "courage"})
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        author = Author.objects.create(first_name='John', last_name='Doe', birth_date='1990-01-01')
+        tags = Tag.objects.bulk_create([Tag(name="wisdom"), Tag(name="courage")])
+        self.quotes = Quote.objects.bulk_create([Quote(author=author, text=f"Some text number {num}") for num in range(5)])
+        self.quotes[0].tags.add(*tags)
+        QuoteStat.objects.create(quote=self.quotes[0], views=7)
+        self._url = reverse('quote-export')
+
+    def test_ndjson(self):
+        with self.assertNumQueries(2):  # quotes and their tags
+            response = self.client.get(self._url)
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(rows), 5)
+        row = next(row for row in rows if row["id"] == str(self.quotes[0].id))
+        self.assertEqual(row["author"], "John Doe")
+        self.assertEqual(sorted(row["tags"]), ["courage", "wisdom"])
+        self.assertEqual(row["views"], 7)
+
+    def test_csv(self):
+        response = self.client.get(self._url, {"file_format": "csv", "search": "number 3"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,text,created_at,author,tags,views")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{self.quotes[3].id},Some text number 3,"))
+
+    def test_failure_format(self):
+        response = self.client.get(self._url, {"file_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_stream(self):
+        response = await self.async_client.get(self._url)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
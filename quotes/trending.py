@@ -0,0 +1,164 @@
+"""
+Rolling view statistics: the views flushed by `quotes.counters` are also added to hourly buckets, which are
+compacted into daily ones once older than `TRENDING["HOURLY_RETENTION"]` hours and pruned after
+`TRENDING["DAILY_RETENTION"]` days, so the table holds a bounded number of rows per viewed quote.
+The trending quotes of a window are the top `TRENDING["SIZE"]` of its buckets, kept in the cache and
+recomputed every `TRENDING["REFRESH_INTERVAL"]` seconds by the flushing workers, so requests only rank the quotes
+when nothing has been flushed for a while, one at a time, the others serving the previous ranking meanwhile.
+"""
+import datetime
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Sum, Value, When
+from django.utils import timezone
+
+from quotes.models import QuoteViewBucket
+
+# window -> (length, resolutions of the buckets summed, the coarsest last)
+WINDOWS = {
+    "1h": (datetime.timedelta(hours=1), (QuoteViewBucket.HOUR,)),
+    "24h": (datetime.timedelta(hours=24), (QuoteViewBucket.HOUR,)),
+    "7d": (datetime.timedelta(days=7), (QuoteViewBucket.HOUR, QuoteViewBucket.DAY)),
+}
+BUCKET_LENGTHS = {QuoteViewBucket.HOUR: datetime.timedelta(hours=1), QuoteViewBucket.DAY: datetime.timedelta(days=1)}
+
+# how long a request ranking the quotes of a window keeps the others from ranking them, should it fail
+RANKING_LOCK_TIMEOUT = 10.0
+# how long the previous ranking of a window is kept, to be served while the quotes are ranked again
+STALE_RANKING_TIMEOUT = 24 * 3600
+
+
+def bucket_start(moment: datetime.datetime, resolution: str) -> datetime.datetime:
+    """The start of the bucket holding `moment`, buckets are aligned on UTC hours and days."""
+    start = moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if resolution == QuoteViewBucket.DAY:
+        start = start.replace(hour=0)
+    return start
+
+
+def record_views(counts: dict, now: datetime.datetime = None) -> None:
+    """Adds the views, by quote id, to the buckets of the current hour."""
+    if not counts:
+        return
+    start = bucket_start(now or timezone.now(), QuoteViewBucket.HOUR)
+    QuoteViewBucket.objects.bulk_create(
+        [QuoteViewBucket(quote_id=quote_id, resolution=QuoteViewBucket.HOUR, start=start) for quote_id in counts],
+        ignore_conflicts=True
+    )
+    by_amount = defaultdict(list)
+    for quote_id, amount in counts.items():
+        by_amount[amount].append(quote_id)
+    buckets = QuoteViewBucket.objects.filter(resolution=QuoteViewBucket.HOUR, start=start)
+    for amount, quote_ids in by_amount.items():
+        buckets.filter(quote_id__in=quote_ids).update(views=F("views") + amount)
+
+
+def compact_view_buckets(now: datetime.datetime = None) -> tuple[int, int]:
+    """
+    Folds the hourly buckets past their retention into daily ones and deletes the expired buckets,
+    returns the numbers of hourly buckets compacted and of buckets pruned.
+    """
+    config = settings.TRENDING
+    now = now or timezone.now()
+    hourly_until = bucket_start(now - datetime.timedelta(hours=config["HOURLY_RETENTION"]), QuoteViewBucket.HOUR)
+    daily_until = bucket_start(now - datetime.timedelta(days=config["DAILY_RETENTION"]), QuoteViewBucket.DAY)
+
+    with transaction.atomic():
+        hourly = QuoteViewBucket.objects.filter(resolution=QuoteViewBucket.HOUR, start__lt=hourly_until)
+        days = defaultdict(int)
+        compacted = 0
+        for quote_id, start, views in hourly.select_for_update().values_list("quote_id", "start", "views").iterator():
+            days[quote_id, bucket_start(start, QuoteViewBucket.DAY)] += views
+            compacted += 1
+        if days:
+            existing = QuoteViewBucket.objects.filter(
+                resolution=QuoteViewBucket.DAY,
+                start__in={start for _, start in days},
+                quote_id__in={quote_id for quote_id, _ in days},
+            )
+            updated = []
+            for bucket in existing:
+                if (views := days.pop((bucket.quote_id, bucket.start), None)) is not None:
+                    bucket.views += views
+                    updated.append(bucket)
+            QuoteViewBucket.objects.bulk_update(updated, ["views"], batch_size=1000)
+            QuoteViewBucket.objects.bulk_create(
+                [
+                    QuoteViewBucket(quote_id=quote_id, resolution=QuoteViewBucket.DAY, start=start, views=views)
+                    for (quote_id, start), views in days.items()
+                ],
+                batch_size=1000
+            )
+            hourly.delete()
+        pruned, _ = QuoteViewBucket.objects.filter(start__lt=daily_until).delete()
+    return compacted, pruned
+
+
+def compact_view_buckets_if_due() -> None:
+    interval = settings.TRENDING["COMPACTION_INTERVAL"]
+    # the first worker to claim the interval compacts, the others skip it
+    if interval and cache.add("quotes:trending:compaction", 1, timeout=interval):
+        compact_view_buckets()
+
+
+def rank_quotes(window: str, now: datetime.datetime = None, size: int = None) -> list[tuple]:
+    """
+    The ids and views of the most viewed quotes of the window, most viewed first. The views of the oldest buckets,
+    which start before the window, are weighted by the part of the bucket within it.
+    """
+    length, resolutions = WINDOWS[window]
+    since = (now or timezone.now()) - length
+    buckets, weights = [], []
+    for resolution in resolutions:
+        start = bucket_start(since, resolution)
+        buckets.append(Q(resolution=resolution, start__gte=start))
+        weight = 1 - (since - start) / BUCKET_LENGTHS[resolution]
+        weights.append(When(resolution=resolution, start=start, then=F("views") * Value(weight)))
+    ranking = (
+        QuoteViewBucket.objects.filter(reduce(or_, buckets))
+        .values_list("quote_id")
+        .annotate(total=Sum(Case(*weights, default=F("views"), output_field=FloatField())))
+        .order_by("-total", "quote_id")
+    )
+    return [(quote_id, round(total)) for quote_id, total in ranking[:size or settings.TRENDING["SIZE"]]]
+
+
+def _ranking_key(window: str) -> str:
+    return f"quotes:trending:{window}"
+
+
+def _cache_ranking(window: str) -> list[tuple]:
+    ranking = rank_quotes(window)
+    # outlives the refresh interval, so that the flushing workers replace it before it expires
+    cache.set(_ranking_key(window), ranking, timeout=settings.TRENDING["REFRESH_INTERVAL"] * 2)
+    cache.set(f"{_ranking_key(window)}:stale", ranking, timeout=STALE_RANKING_TIMEOUT)
+    return ranking
+
+
+def refresh_trending_if_due() -> None:
+    """Ranks the quotes of every window, called by the flushing workers."""
+    interval = settings.TRENDING["REFRESH_INTERVAL"]
+    # the first worker to claim the interval ranks, the others skip it
+    if interval and cache.add("quotes:trending:refresh", 1, timeout=interval):
+        for window in WINDOWS:
+            _cache_ranking(window)
+
+
+def trending_quotes(window: str) -> list[tuple]:
+    """`rank_quotes` of the window, shared by the workers through the cache."""
+    key = _ranking_key(window)
+    ranking = cache.get(key)
+    if ranking is not None:
+        return ranking
+    # a single request ranks the quotes, the others serve the previous ranking, if any, rather than wait for it
+    if cache.add(f"{key}:lock", 1, timeout=RANKING_LOCK_TIMEOUT):
+        try:
+            return _cache_ranking(window)
+        finally:
+            cache.delete(f"{key}:lock")
+    return cache.get(f"{key}:stale", [])
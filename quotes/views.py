@@ -1,57 +1,344 @@
+import io
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets, filters, decorators, response
+from rest_framework import viewsets, filters, decorators, response, permissions, parsers, status, exceptions
 
+from quotes.async_views import AsyncReadMixin
+from quotes.autocomplete import autocomplete
+from quotes.bulk import QuoteBulkWriter
+from quotes.cache import CachedResponseMixin, list_scope
+from quotes.counters import get_view_counter
+from quotes.exporters import QuoteExporter
+from quotes.fieldsets import SparseFieldsetMixin
 from quotes.filters import ListFilter
-from quotes.models import Quote, Tag, Author, QuoteStat
-from quotes.serializers import QuoteSerializer, TagSerializer, AuthorSerializer
+from quotes.importers import QuoteImporter
+from quotes.models import Quote, Tag, Author
+from quotes.pagination import OptInKeysetPagination
+from quotes.replicas import ReplicaReadMixin
+from quotes.sampling import random_quote, daily_quote
+from quotes.search import QuoteSearchFilter
+from quotes.serializers import (
+    QuoteSerializer,
+    QuoteListingSerializer,
+    QuoteBulkItemSerializer,
+    TagSerializer,
+    AuthorSerializer,
+    QuoteImportSerializer,
+    BatchGetSerializer,
+)
+from quotes.trending import WINDOWS, trending_quotes
+
+
+class BatchGetMixin:
+    """
+    `POST <resource>/batch-get` with `{"ids": [...]}` reads up to `settings.BATCH_GET_MAX_IDS` objects
+    with one query, returned in the order of the ids, along with the ids not found.
+    Takes `fields` and `expand` like the other reads.
+    """
+    # serializes the objects read, `serializer_class` by default
+    batch_serializer_class = None
+
+    @decorators.action(
+        methods=["POST"], detail=False, url_path="batch-get", url_name="batch-get", serializer_class=BatchGetSerializer
+    )
+    def batch_get(self, request, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        objects = self.get_queryset().in_bulk(ids)
+        found = [objects[object_id] for object_id in ids if object_id in objects]
+        self.perform_batch_get(found)
+
+        output_serializer = (self.batch_serializer_class or type(self).serializer_class)(
+            found,
+            many=True,
+            context=self.get_serializer_context(),
+            fields=self.get_requested_fields(),
+            expand=self.get_requested_expansions(),
+        )
+        return response.Response({
+            "results": output_serializer.data,
+            "missing": [object_id for object_id in ids if object_id not in objects],
+        })
+
+    def perform_batch_get(self, objects: list) -> None:
+        pass
+
+
+def get_limit(request, default: int, maximum: int) -> int:
+    try:
+        size = int(request.query_params.get("limit", default))
+    except ValueError:
+        size = 0
+    if not 0 < size <= maximum:
+        raise exceptions.ValidationError({"limit": f"Must be between 1 and {maximum}."})
+    return size
 
 
-class AuthorModelViewSet(viewsets.ModelViewSet):
+class LeaderboardMixin:
+    """
+    `GET <resource>/top?by=<ranking>&limit=<size>` lists the objects with the highest denormalized counters
+    (see `quotes.aggregates`), read from the counter's index instead of aggregating the quotes.
+    """
+    # ranking name -> counter field, the first one is the default
+    leaderboard_rankings = {}
+    leaderboard_size = 10
+
+    @decorators.action(methods=["GET"], detail=False, url_path="top", url_name="top")
+    def top(self, request, **kwargs):
+        ranking = request.query_params.get("by", next(iter(self.leaderboard_rankings)))
+        if ranking not in self.leaderboard_rankings:
+            raise exceptions.ValidationError({"by": f"Must be one of: {', '.join(self.leaderboard_rankings)}."})
+        size = get_limit(request, self.leaderboard_size, settings.LEADERBOARD_MAX_SIZE)
+        counter = self.leaderboard_rankings[ranking]
+        queryset = self.get_queryset().order_by(f"-{counter}", "id")[:size]
+        return response.Response(self.get_serializer(queryset, many=True).data)
+
+
+class AutocompleteMixin:
+    """
+    `GET <resource>/autocomplete?q=<prefix>&limit=<size>` lists the objects whose names start with the words
+    of `q`, most popular first, see `quotes.autocomplete`. Takes `fields` like the other reads.
+    """
+    autocomplete_size = 10
+
+    @decorators.action(methods=["GET"], detail=False, url_path="autocomplete", url_name="autocomplete")
+    def autocomplete(self, request, **kwargs):
+        text = request.query_params.get("q", "")
+        if not text.strip():
+            raise exceptions.ValidationError({"q": "This field is required."})
+        size = get_limit(request, self.autocomplete_size, settings.AUTOCOMPLETE_MAX_SIZE)
+        queryset = autocomplete(self.get_queryset(), text)[:size]
+        return response.Response(self.get_serializer(queryset, many=True).data)
+
+
+class AuthorModelViewSet(
+    AutocompleteMixin, LeaderboardMixin, BatchGetMixin, SparseFieldsetMixin, CachedResponseMixin, ReplicaReadMixin,
+    AsyncReadMixin, viewsets.ModelViewSet
+):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ("id", "first_name", "last_name")
+    pagination_class = OptInKeysetPagination
+    keyset_ordering = ("id",)
+    leaderboard_rankings = {"quotes": "quotes_count", "views": "views_total"}
+    cache_resource = "author"
     lookup_url_kwarg = "author_id"
     lookup_field = "id"
 
 
-class TagModelViewSet(viewsets.ModelViewSet):
+class TagModelViewSet(
+    AutocompleteMixin, LeaderboardMixin, BatchGetMixin, SparseFieldsetMixin, CachedResponseMixin, ReplicaReadMixin,
+    AsyncReadMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ("id", "name")
+    pagination_class = OptInKeysetPagination
+    keyset_ordering = ("name",)
+    leaderboard_rankings = {"quotes": "quotes_count"}
+    cache_resource = "tag"
     lookup_url_kwarg = "tag_id"
     lookup_field = "id"
 
 
-class QuoteModelViewSet(viewsets.ModelViewSet):
-    queryset = Quote.objects.select_related("author").all()
+class QuoteModelViewSet(
+    BatchGetMixin, SparseFieldsetMixin, CachedResponseMixin, ReplicaReadMixin, AsyncReadMixin, viewsets.ModelViewSet
+):
+    queryset = Quote.objects.select_related("author", "stat").all()
     serializer_class = QuoteSerializer
-    filter_backends = (filters.SearchFilter, ListFilter, filters.OrderingFilter)
-    search_fields = ("id", "text", "author__first_name", "author__last_name")
-    filter_by_fields = {"tags": "tags__in", "author_id": "author_id"}
+    filter_backends = (QuoteSearchFilter, ListFilter, filters.OrderingFilter)
+    filter_by_fields = {
+        "tags": "tags__any",
+        "tags_any": "tags__any",
+        "tags_all": "tags__all",
+        "author_id": "author_id__in",
+    }
+    # without postgres, search builds its in-memory index on first use
+    sync_filter_params = ("search",)
     ordering_fields = ("created_at",)
+    expand_select_related = ("author",)
+    expand_prefetch_related = ("tags",)
+    expand_cache_resources = {"author": "author", "tags": "tag"}
+    pagination_class = OptInKeysetPagination
+    keyset_ordering = ("-created_at", "id")
+    batch_serializer_class = QuoteListingSerializer
+    cache_resource = "quote"
+    list_cache_dependencies = ("author", "tag")
     lookup_url_kwarg = "quote_id"
     lookup_field = "id"
 
     @decorators.action(methods=["GET"], detail=True, url_path='tags', url_name="tags")
     def get_tags(self, request, **kwargs):
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
         quote = self.get_object()
-        tag_serializer = TagSerializer(instance=quote.tags.all(), context=self.get_serializer_context(), many=True)
+        tag_serializer = TagSerializer(
+            instance=quote.tags.all(),
+            context=self.get_serializer_context(),
+            many=True,
+            fields=self.get_requested_fields(),
+        )
         return response.Response(tag_serializer.data)
 
+    @decorators.action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        url_name="import",
+        serializer_class=QuoteImportSerializer,
+        parser_classes=(parsers.MultiPartParser,),
+        permission_classes=(permissions.IsAdminUser,)
+    )
+    def import_quotes(self, request, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stream = io.TextIOWrapper(serializer.validated_data["file"].file, encoding="utf-8", newline="")
+        report = QuoteImporter().run(stream, serializer.validated_data["file_format"])
+        return response.Response(report.as_dict(), status=status.HTTP_201_CREATED)
+
+    @decorators.action(
+        methods=["POST"], detail=False, url_path="bulk", url_name="bulk", serializer_class=QuoteBulkItemSerializer
+    )
+    def bulk(self, request, **kwargs):
+        """
+        Creates and updates a list of quotes in one transaction, the items with an `id` are partial updates.
+        Returns the written quotes in the same order, as the listing renders them.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        written = QuoteBulkWriter(serializer.validated_data).write()
+        # reloaded with their stats in one query
+        quotes = Quote.objects.select_related("stat").in_bulk([quote.id for quote in written])
+        output_serializer = QuoteListingSerializer(
+            [quotes[quote.id] for quote in written],
+            many=True,
+            context=self.get_serializer_context(),
+            fields=self.get_requested_fields(),
+        )
+        return response.Response(output_serializer.data)
+
+    @decorators.action(methods=["GET"], detail=False, url_path="export", url_name="export")
+    def export(self, request, **kwargs):
+        file_format = request.query_params.get("file_format", "ndjson")
+        if file_format not in QuoteExporter.content_types:
+            raise exceptions.ValidationError({"file_format": f"Must be one of: {', '.join(QuoteExporter.content_types)}."})
+
+        exporter = QuoteExporter(file_format)
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(request._request, ASGIRequest):
+            stream = exporter.astream(queryset)
+        else:
+            stream = exporter.stream(queryset)
+        export_response = StreamingHttpResponse(stream, content_type=exporter.content_type)
+        export_response["Content-Disposition"] = f'attachment; filename="quotes.{file_format}"'
+        return export_response
+
+    @decorators.action(methods=["GET"], detail=False, url_path="random", url_name="random")
+    def random(self, request, **kwargs):
+        """A random quote, filtered like the listing, e.g. by `tags` or `author_id`."""
+        return self._quote_response(random_quote(self.filter_queryset(self.get_queryset())))
+
+    @decorators.action(methods=["GET"], detail=False, url_path="daily", url_name="daily")
+    def daily(self, request, **kwargs):
+        """The quote of the day, the same for everyone until midnight."""
+        return self._quote_response(daily_quote(self.get_queryset()))
+
+    @decorators.action(methods=["GET"], detail=False, url_path="trending", url_name="trending")
+    def trending(self, request, **kwargs):
+        """The most viewed quotes of the last `window`, one of 1h, 24h or 7d, with their views in the window."""
+        window = request.query_params.get("window", "24h")
+        if window not in WINDOWS:
+            raise exceptions.ValidationError({"window": f"Must be one of: {', '.join(WINDOWS)}."})
+        ranking = trending_quotes(window)
+        quotes = self.get_queryset().in_bulk([quote_id for quote_id, _ in ranking])
+        # quotes deleted since the ranking was computed are left out
+        ranked = [(quotes[quote_id], views) for quote_id, views in ranking if quote_id in quotes]
+        serializer = QuoteListingSerializer(
+            [quote for quote, _ in ranked],
+            many=True,
+            context=self.get_serializer_context(),
+            fields=self.get_requested_fields(),
+            expand=self.get_requested_expansions(),
+        )
+        return response.Response({
+            "window": window,
+            "results": [{"views": views, "quote": data} for (_, views), data in zip(ranked, serializer.data)],
+        })
+
+    def _quote_response(self, quote):
+        if quote is None:
+            raise exceptions.NotFound()
+        # picked by the server rather than asked for, not counted as a view, which would skew the trending quotes
+        return response.Response(self.get_serializer(quote).data)
+
+    def perform_batch_get(self, objects: list) -> None:
+        get_view_counter().incr_many([quote.id for quote in objects])
+
     @staticmethod
     def _update_quote_stat_views(quote_id) -> None:
-        stat, _ = QuoteStat.objects.get_or_create(quote_id=quote_id)
-        stat.views += 1
-        stat.save()
+        get_view_counter().incr(quote_id)
+
+    @staticmethod
+    async def _aupdate_quote_stat_views(quote_id) -> None:
+        await get_view_counter().aincr(quote_id)
+
+    def _is_listing(self) -> bool:
+        # the browsable api builds its forms with the listing's view, and the schema describes `QuoteSerializer`
+        return self.action == "list" and self.request.method == "GET" and not getattr(self, "swagger_fake_view", False)
+
+    def get_queryset(self):
+        if self._is_listing() or self.action in ("batch_get", "trending"):
+            # the listing renders the author's URL from `author_id`
+            queryset = Quote.objects.select_related("stat").all()
+        else:
+            queryset = super().get_queryset()
+        return self.expand_queryset(queryset)
+
+    def get_serializer_class(self):
+        if self._is_listing():
+            return QuoteListingSerializer
+        return super().get_serializer_class()
+
+    def get_cache_scopes(self):
+        scopes = super().get_cache_scopes()
+        if self.action == "get_tags":
+            scopes.append(list_scope("tag"))
+        elif self.detail:
+            # author and tag changes invalidate the quote listing, not every quote embedding them
+            expand = self.get_requested_expansions() or ()
+            scopes.extend(
+                list_scope(resource) for name, resource in self.expand_cache_resources.items() if name in expand
+            )
+        return scopes
 
     def retrieve(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            # only existing quotes are cached, so the view still counts
+            self._update_quote_stat_views(self.get_cache_lookup())
+            return cached_response
         quote = self.get_object()
         self._update_quote_stat_views(quote.id)
         serializer = self.get_serializer(quote)
         return response.Response(serializer.data)
 
+    async def aretrieve(self, request, *args, **kwargs):
+        cached_response = await self.aget_cached_response(request)
+        if cached_response is not None:
+            await self._aupdate_quote_stat_views(self.get_cache_lookup())
+            return cached_response
+        quote = await self.aget_object()
+        await self._aupdate_quote_stat_views(quote.id)
+        serializer = self.get_serializer(quote)
+        return response.Response(serializer.data)
+
 
 def index(request):
     return render(request, "index.html")
@@ -11,4 +11,5 @@ python manage.py migrate --no-input
 echo 'done migrations.'
 
 echo 'Running server...'
-daphne -b 0.0.0.0 -p 8001 server.asgi:application
+# WEB_WORKERS daphne workers (one per CPU by default) sharing the port, see server/supervisor.py
+exec python -m server.supervisor --bind 0.0.0.0 --port 8001 server.asgi:application
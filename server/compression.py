@@ -0,0 +1,127 @@
+"""
+Response compression negotiated with `Accept-Encoding`: zstd and brotli when the `zstandard` and `brotli` packages
+are installed, gzip always. Responses smaller than `COMPRESSION["MIN_SIZE"]` bytes, streamed ones and the content
+types outside `COMPRESSION["CONTENT_TYPES"]` are left alone. HTML is not listed by default, pages carrying
+a CSRF token would be exposed to BREACH.
+"""
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(content: bytes, level: int) -> bytes:
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def _brotli(content: bytes, level: int) -> bytes:
+    return brotli.compress(content, quality=level)
+
+
+def _zstd(content: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(content)
+
+
+def get_codecs() -> dict:
+    """The available encodings, most preferred first, mapped to their compress functions."""
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = _zstd
+    if brotli is not None:
+        codecs["br"] = _brotli
+    codecs["gzip"] = _gzip
+    return codecs
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """The encodings of an `Accept-Encoding` header mapped to their weights."""
+    weights = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights
+
+
+def negotiate_encoding(header: str, codecs) -> str | None:
+    """The acceptable encoding with the highest weight, ties going to the order of `codecs`."""
+    weights = parse_accept_encoding(header)
+    default = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in codecs:
+        weight = weights.get(coding, default)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses the responses with the encoding negotiated from `Accept-Encoding`, see `COMPRESSION`.
+    Keep it right after `RequestTimingMiddleware`, so that the timings include it. Works without a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.codecs = get_codecs()
+
+    def _should_compress(self, response, config: dict) -> bool:
+        if not config["ENABLED"] or response.streaming or response.has_header("Content-Encoding"):
+            return False
+        if response.status_code != 200 or len(response.content) < config["MIN_SIZE"]:
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        return content_type in config["CONTENT_TYPES"]
+
+    def process_response(self, request, response):
+        config = settings.COMPRESSION
+        if not self._should_compress(response, config):
+            return response
+        # the representation differs per encoding, caches must tell them apart
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.codecs)
+        if encoding is None:
+            return response
+
+        compressed = self.codecs[encoding](response.content, config["LEVELS"][encoding])
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # the bytes differ, so a strong validator of the identity body no longer holds
+        if (etag := response.get("ETag")) and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
@@ -0,0 +1,216 @@
+"""
+A process-wide pool of database connections shared by the threads of a worker, for the database backends
+mixing in `PooledDatabaseWrapperMixin`, e.g. `server.db.postgresql`.
+Django keeps a connection per thread, and under ASGI the sync code of every request may run in a new thread,
+so persistent connections (`CONN_MAX_AGE`) pile up there. Pooled ones go back to the pool whenever Django closes
+them instead, at the end of every request with `CONN_MAX_AGE = 0`, and when their thread goes away.
+Options are read from `OPTIONS["pool"]`, see `ConnectionPool`.
+"""
+import threading
+import time
+import weakref
+from collections import deque
+from functools import partial
+
+from server import metrics
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Hands out up to `max_size` connections, waiting at most `timeout` seconds for one to be released.
+    Connections idle for more than `max_idle` seconds are closed, down to `min_size` connections, and the
+    ones idle for more than `check_after` seconds are checked before being handed out again.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        min_size: int = 0,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_idle: float = 300.0,
+        check_after: float = 30.0,
+    ):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._condition = threading.Condition()
+        # released connections with the time of their release, the most recent last
+        self._idle = deque()
+        # connections open, idle or in use
+        self._size = 0
+        self._closed = False
+        metrics.DB_POOL_CONNECTIONS.set(max_size, alias, "max")
+        self._update_metrics()
+
+    def _update_metrics(self) -> None:
+        metrics.DB_POOL_CONNECTIONS.set(self._size - len(self._idle), self.alias, "in_use")
+        metrics.DB_POOL_CONNECTIONS.set(len(self._idle), self.alias, "idle")
+
+    @staticmethod
+    def _close(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_usable(connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _take(self, deadline: float):
+        """An idle connection and its idle time, or `None` when a new one may be opened."""
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    self._update_metrics()
+                    return connection, time.monotonic() - released_at
+                if self._closed:
+                    raise PoolTimeout(f"The {self.alias!r} pool is closed.")
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._update_metrics()
+                    return None, 0.0
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.DB_POOL_TIMEOUTS.inc(self.alias)
+                    raise PoolTimeout(
+                        f"No connection of the {self.alias!r} pool was released within {self.timeout}s, "
+                        f"all {self.max_size} are in use."
+                    )
+                self._condition.wait(remaining)
+
+    def acquire(self, connect):
+        """A connection of the pool, or a new one opened by `connect` when the pool may grow."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, idle_for = self._take(deadline)
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self._discard(None)
+                    raise
+                break
+            if idle_for > self.check_after and not self._is_usable(connection):
+                # closed by the server or the network in the meantime
+                self._discard(connection)
+                continue
+            break
+        metrics.DB_POOL_WAIT.observe(time.monotonic() - started, self.alias)
+        return connection
+
+    def _discard(self, connection) -> None:
+        if connection is not None:
+            self._close(connection)
+        with self._condition:
+            self._size -= 1
+            self._update_metrics()
+            self._condition.notify()
+
+    def release(self, connection, reusable: bool = True) -> None:
+        if not reusable or self._closed:
+            self._discard(connection)
+            return
+        now = time.monotonic()
+        expired = []
+        with self._condition:
+            self._idle.append((connection, now))
+            # the least recently used connections are the first to expire
+            while self._size > self.min_size and self._idle and now - self._idle[0][1] > self.max_idle:
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+            self._update_metrics()
+            self._condition.notify()
+        for connection in expired:
+            self._close(connection)
+
+    def close(self) -> None:
+        """Closes the idle connections, the ones in use are closed when released."""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            self._closed = True
+            self._update_metrics()
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._close(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, options: dict) -> ConnectionPool:
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(alias, **options)
+        return _pools[alias]
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Takes the connections of a database wrapper from the `ConnectionPool` of its alias and gives them back
+    when Django closes them. Use it with `CONN_MAX_AGE = 0`, so that they are released after every request.
+    """
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict["OPTIONS"].get("pool") or {})
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        try:
+            connection = pool.acquire(partial(super().get_new_connection, conn_params))
+        except PoolTimeout as exc:
+            # raised as django.db.OperationalError by `wrap_database_errors`
+            raise self.Database.OperationalError(str(exc)) from exc
+        # released when the wrapper is collected without having been closed, e.g. along with its thread
+        self._pool_lease = weakref.finalize(self, pool.release, connection, False)
+        return connection
+
+    def _close(self):
+        lease = getattr(self, "_pool_lease", None)
+        detached = lease.detach() if lease is not None else None
+        if detached is None:
+            return super()._close()
+        _, release, (connection, _), _ = detached
+        reusable = not self.in_atomic_block
+        if reusable:
+            try:
+                with self.wrap_database_errors:
+                    # a transaction left open would keep its locks and snapshot for the next thread
+                    connection.rollback()
+            except Exception:
+                reusable = False
+        release(connection, reusable)
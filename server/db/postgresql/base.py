@@ -0,0 +1,15 @@
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from server.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, PostgresDatabaseWrapper):
+    """The PostgreSQL backend with pooled connections, `ENGINE = "server.db.postgresql"`."""
+
+    def get_new_connection(self, conn_params):
+        # set by the backend when it opens a connection, a pooled one may be open already
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+        return super().get_new_connection(conn_params)
@@ -0,0 +1,305 @@
+"""
+In-process Prometheus metrics, exposed in the text format by `metrics_view`.
+Every worker process keeps its own values. With `METRICS["MULTIPROCESS_DIR"]`, set by `server.supervisor`,
+the workers write them to that directory, see `MetricsRegistry.write`, and `/metrics` serves their sum, whichever
+worker answers the scrape. The values of the other workers are then up to `METRICS["WRITE_INTERVAL"]` seconds old.
+"""
+import bisect
+import fcntl
+import ipaddress
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+ARCHIVE = "archive"
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], buckets: tuple = DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [count per bucket..., count above the last bucket], sum
+        self._series = defaultdict(lambda: [[0] * (len(self.buckets) + 1), 0.0])
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series[label_values]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def copy(self) -> "Histogram":
+        """A metric of the same name and labels, without values."""
+        return Histogram(self.name, self.documentation, self.labels, self.buckets)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(label_values), list(counts), total] for label_values, (counts, total) in self._series.items()]
+
+    def load(self, snapshot: list, live: bool = True) -> None:
+        """Adds the values of a snapshot, e.g. of another process."""
+        with self._lock:
+            for label_values, counts, total in snapshot:
+                series = self._series[tuple(label_values)]
+                series[0] = [count + other for count, other in zip(series[0], counts)]
+                series[1] += total
+
+    @staticmethod
+    def _format_labels(pairs) -> str:
+        escaped = (
+            (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for name, value in pairs
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self._series.items()]
+
+        for label_values, counts, total in sorted(series):
+            pairs = list(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels([*pairs, ('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(pairs)} {cumulative}")
+        return lines
+
+
+class _ValueMetric:
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def copy(self):
+        """A metric of the same name and labels, without values."""
+        return type(self)(self.name, self.documentation, self.labels)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(label_values), value] for label_values, value in self._values.items()]
+
+    def load(self, snapshot: list, live: bool = True) -> None:
+        """Adds the values of a snapshot, e.g. of another process."""
+        with self._lock:
+            for label_values, value in snapshot:
+                self._values[tuple(label_values)] += value
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{Histogram._format_labels(zip(self.labels, label_values))} {value}")
+        return lines
+
+
+class Gauge(_ValueMetric):
+    """
+    The values of the processes are summed, e.g. connections, or their minimum is kept with `aggregate="min"`,
+    e.g. for a health flag. Only the processes still running count.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], aggregate: str = "sum"):
+        super().__init__(name, documentation, labels)
+        self.aggregate = aggregate
+
+    def copy(self) -> "Gauge":
+        return Gauge(self.name, self.documentation, self.labels, self.aggregate)
+
+    def load(self, snapshot: list, live: bool = True) -> None:
+        if not live:
+            return
+        if self.aggregate == "sum":
+            return super().load(snapshot)
+        with self._lock:
+            for label_values, value in snapshot:
+                key = tuple(label_values)
+                self._values[key] = min(self._values[key], value) if key in self._values else value
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Counter(_ValueMetric):
+    metric_type = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] += amount
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.expose()) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+    def snapshot(self) -> dict:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def _empty_copy(self) -> "MetricsRegistry":
+        merged = MetricsRegistry()
+        for metric in self.metrics:
+            merged.register(metric.copy())
+        return merged
+
+    def _load(self, snapshot: dict, live: bool) -> None:
+        for metric in self.metrics:
+            metric.load(snapshot.get(metric.name, []), live=live)
+
+    @staticmethod
+    @contextmanager
+    def _locked(directory: str, operation: int):
+        # readers share the lock, so that they never see a process archived and still in its own file
+        with open(os.path.join(directory, f"{ARCHIVE}.lock"), "a") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    @staticmethod
+    def _dump(directory: str, name: str, snapshot: dict) -> None:
+        path = os.path.join(directory, f"{name}.json")
+        with open(f"{path}.{os.getpid()}.tmp", "w") as file:
+            json.dump(snapshot, file)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def write(self, directory: str) -> None:
+        """Writes the values of this process to the directory, in its own file."""
+        self._dump(directory, str(os.getpid()), self.snapshot())
+
+    def collect(self, directory: str) -> "MetricsRegistry":
+        """The sum of the values written to the directory by every process, this one included."""
+        self.write(directory)
+        merged = self._empty_copy()
+        with self._locked(directory, fcntl.LOCK_SH):
+            for entry in os.scandir(directory):
+                name, extension = os.path.splitext(entry.name)
+                if extension != ".json":
+                    continue
+                try:
+                    with open(entry.path) as file:
+                        snapshot = json.load(file)
+                except (OSError, ValueError):
+                    # removed meanwhile
+                    continue
+                # the counters and histograms of the processes gone are kept, their gauges dropped
+                merged._load(snapshot, live=name != ARCHIVE and _is_running(int(name)))
+        return merged
+
+    def archive(self, directory: str) -> None:
+        """Folds the values of this process into the archive of the directory, when the process stops."""
+        with self._locked(directory, fcntl.LOCK_EX):
+            merged = self._empty_copy()
+            try:
+                with open(os.path.join(directory, f"{ARCHIVE}.json")) as file:
+                    merged._load(json.load(file), live=False)
+            except FileNotFoundError:
+                pass
+            merged._load(self.snapshot(), live=False)
+            self._dump(directory, ARCHIVE, merged.snapshot())
+            try:
+                os.remove(os.path.join(directory, f"{os.getpid()}.json"))
+            except FileNotFoundError:
+                pass
+
+
+registry = MetricsRegistry()
+
+ROUTE_LABELS = ("route", "method")
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling requests.", (*ROUTE_LABELS, "status")
+))
+DB_DURATION = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL queries per sampled request.", ROUTE_LABELS
+))
+DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL queries per sampled request.", ROUTE_LABELS, buckets=COUNT_BUCKETS
+))
+SERIALIZE_DURATION = registry.register(Histogram(
+    "http_request_serialize_duration_seconds", "Time spent serializing per sampled request.", ROUTE_LABELS
+))
+RENDER_DURATION = registry.register(Histogram(
+    "http_request_render_duration_seconds", "Time spent rendering per sampled request.", ROUTE_LABELS
+))
+
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled database connection.", ("alias",)
+))
+DB_POOL_CONNECTIONS = registry.register(Gauge(
+    "db_pool_connections", "Pooled database connections, by state: in_use, idle or max.", ("alias", "state")
+))
+DB_POOL_TIMEOUTS = registry.register(Counter(
+    "db_pool_timeouts_total", "Requests for a pooled database connection which timed out.", ("alias",)
+))
+DB_REPLICA_HEALTHY = registry.register(Gauge(
+    "db_replica_healthy", "Whether reads go to a replica, 0 after a failed read until it is retried.", ("alias",),
+    aggregate="min",
+))
+DB_REPLICA_FALLBACKS = registry.register(Counter(
+    "db_replica_fallbacks_total", "Reads of a replica which failed and were retried on the primary.", ("alias",)
+))
+
+
+def is_allowed(address: str) -> bool:
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS["ALLOWED_NETWORKS"])
+
+
+def metrics_view(request):
+    # served on the public port, only scrapers from the allowed networks may read it, straight rather than through
+    # the reverse proxy: the address of a request it forwards is the proxy's, whoever sent it
+    if "HTTP_X_FORWARDED_FOR" in request.META or not is_allowed(request.META.get("REMOTE_ADDR", "")):
+        return HttpResponseForbidden()
+    directory = settings.METRICS["MULTIPROCESS_DIR"]
+    collected = registry.collect(directory) if directory else registry
+    return HttpResponse(collected.expose(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,58 @@
+"""
+JSON renderers of the API. `FastJSONRenderer` encodes with orjson when it is installed, falling back to the
+standard library, and `CompactJSONRenderer` answers `Accept: application/vnd.quotes.compact+json` (or
+`?format=compact`) with the same data, ids taking the place of absolute URLs in the serializers (see `is_compact`).
+Unlike `JSONRenderer`, which raises on NaN and infinite floats (`STRICT_JSON`), orjson encodes them as `null`:
+the API serializes no float field, and a `null` is still valid JSON, so the faster encoder is kept for them.
+"""
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+from server.timing import TimedRendererMixin
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # whatever orjson does not encode itself, encoded like DRF does, e.g. datetimes, decimals or lazy strings
+    return _encoder.default(obj)
+
+
+class FastJSONRendererMixin:
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        content = orjson.dumps(
+            data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        # escaped by JSONRenderer as well, they end lines in javascript
+        if b"\xe2\x80" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
+
+
+class FastJSONRenderer(TimedRendererMixin, FastJSONRendererMixin, renderers.JSONRenderer):
+    pass
+
+
+class CompactJSONRenderer(FastJSONRenderer):
+    media_type = "application/vnd.quotes.compact+json"
+    format = "compact"
+
+
+def is_compact(context: dict) -> bool:
+    """Whether the serializers render ids in place of absolute URLs, for `CompactJSONRenderer`."""
+    request = context.get("request")
+    return isinstance(getattr(request, "accepted_renderer", None), CompactJSONRenderer)
@@ -0,0 +1,123 @@
+"""
+Read replicas, configured in `DATABASE_REPLICAS["ALIASES"]` (see `DATABASE_REPLICA_URLS`).
+`ReplicaRouter` sends the reads made within `read_from(alias)` to that replica and everything else to the primary,
+so only the code opting in, e.g. the safe requests of `quotes.replicas.ReplicaReadMixin`, reads from replicas.
+Clients are pinned to the primary for `STICKY_WINDOW` seconds after they write, so that they read their own writes,
+and a replica failing a read is left out for `RETRY_AFTER` seconds, the reads falling back to the other replicas
+or the primary meanwhile.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from server import metrics
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+# the replica read from and the depth of the primary's transactions when reading started
+_reading_from = ContextVar("reading_from", default=None)
+
+
+def get_replicas() -> list[str]:
+    return settings.DATABASE_REPLICAS["ALIASES"]
+
+
+@contextmanager
+def read_from(alias: str):
+    token = _reading_from.set((alias, len(connections[PRIMARY].atomic_blocks)))
+    try:
+        yield
+    finally:
+        _reading_from.reset(token)
+
+
+def current_replica() -> str | None:
+    state = _reading_from.get()
+    return state[0] if state is not None else None
+
+
+class ReplicaHealth:
+    """Replicas are deemed healthy until a read fails, then left out for `RETRY_AFTER` seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failed_until = {}
+
+    def is_healthy(self, alias: str) -> bool:
+        failed_until = self._failed_until.get(alias)
+        if failed_until is None:
+            return True
+        if time.monotonic() < failed_until:
+            return False
+        with self._lock:
+            self._failed_until.pop(alias, None)
+        metrics.DB_REPLICA_HEALTHY.set(1, alias)
+        return True
+
+    def mark_failed(self, alias: str) -> None:
+        with self._lock:
+            self._failed_until[alias] = time.monotonic() + settings.DATABASE_REPLICAS["RETRY_AFTER"]
+        metrics.DB_REPLICA_HEALTHY.set(0, alias)
+        metrics.DB_REPLICA_FALLBACKS.inc(alias)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failed_until.clear()
+
+
+health = ReplicaHealth()
+
+
+def pick_replica() -> str | None:
+    """A healthy replica at random, `None` when reads should go to the primary."""
+    replicas = [alias for alias in get_replicas() if health.is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+def _pin_key(client: str) -> str:
+    return f"db:pinned:{client}"
+
+
+def pin_to_primary(client: str) -> None:
+    cache.set(_pin_key(client), True, timeout=settings.DATABASE_REPLICAS["STICKY_WINDOW"])
+
+
+def is_pinned(client: str) -> bool:
+    return cache.get(_pin_key(client), False)
+
+
+async def ais_pinned(client: str) -> bool:
+    return await cache.aget(_pin_key(client), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _reading_from.get()
+        if state is None:
+            return None
+        alias, depth = state
+        if len(connections[PRIMARY].atomic_blocks) > depth:
+            # a transaction opened since, e.g. to flush counters, reads what it is about to write
+            return PRIMARY
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication
+        if db in get_replicas():
+            return False
+        return None
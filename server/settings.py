@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'server.timing.RequestTimingMiddleware',
+    'server.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,8 +93,61 @@ DATABASES = {
     }
 }
 
+# read replicas of the primary ("default"), comma separated, e.g. postgres://host-1/quotes,postgres://host-2/quotes
+# the safe requests of the quote, author and tag endpoints read from them, see server.routers
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+for index, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(url) | {"TEST": {"MIRROR": "default"}}
+
+DATABASE_ROUTERS = ["server.routers.ReplicaRouter"]
+DATABASE_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias.startswith("replica_")],
+    # after a write, the client reads from the primary for this many seconds, to see its own writes
+    "STICKY_WINDOW": float(os.getenv("DATABASE_REPLICA_STICKY_WINDOW", 5)),
+    # a replica failing a read is left out for this many seconds
+    "RETRY_AFTER": float(os.getenv("DATABASE_REPLICA_RETRY_AFTER", 30)),
+}
+
+# "pool" shares up to DB_POOL_MAX_SIZE PostgreSQL connections between the threads of a worker (see server.db.pool),
+# "persistent" keeps a connection per thread for DB_CONN_MAX_AGE seconds, which only pays off under WSGI,
+# "none" opens a connection per request. Replicas are connected to the same way.
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "pool")
+for database in DATABASES.values():
+    if DB_CONNECTION_MODE == "pool" and database.get("ENGINE", "").startswith("django.db.backends.postgresql"):
+        database |= {
+            "ENGINE": "server.db.postgresql",
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": database.get("OPTIONS", {}) | {
+                "pool": {
+                    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+                    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+                    "check_after": float(os.getenv("DB_POOL_CHECK_AFTER", 30)),
+                },
+            },
+        }
+    elif DB_CONNECTION_MODE == "persistent":
+        database |= {"CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)), "CONN_HEALTH_CHECKS": True}
+
 REDIS_CONNECTION_URL = os.getenv('REDIS_DB_CONNECTION_URL')
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+if REDIS_CONNECTION_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CONNECTION_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -145,7 +200,12 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.TemplateHTMLRenderer'
     ],
     'PAGE_SIZE': 10,
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination'
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'server.renderers.FastJSONRenderer',
+        'server.timing.TimedBrowsableAPIRenderer',
+        'server.renderers.CompactJSONRenderer',
+    ],
 }
 
 # swagger
@@ -168,3 +228,83 @@ CHANNEL_LAYERS = {
     },
 }
 NOTIFICATION_ROOM = "notifications"
+# new quote notifications are published in batches, see notifications.outbox
+NOTIFICATION_OUTBOX = {
+    "WINDOW": float(os.getenv("NOTIFICATION_OUTBOX_WINDOW", 0.5)),
+    "MAX_BATCH": 1000,
+}
+# tests publish the notifications by hand
+TEST_RUNNER = "server.test_runner.TestRunner"
+
+# buffered quote view counters, see quotes.counters
+VIEW_COUNTER = {
+    "BACKEND": os.getenv(
+        "VIEW_COUNTER_BACKEND",
+        "quotes.counters.RedisViewCounterBuffer" if REDIS_CONNECTION_URL else "quotes.counters.LocalViewCounterBuffer"
+    ),
+    "FLUSH_INTERVAL": float(os.getenv("VIEW_COUNTER_FLUSH_INTERVAL", 5)),
+}
+
+# hourly view buckets compacted into daily ones, and the cached top quotes of /quotes/trending, see quotes.trending
+TRENDING = {
+    "SIZE": int(os.getenv("TRENDING_SIZE", 20)),
+    "REFRESH_INTERVAL": int(os.getenv("TRENDING_REFRESH_INTERVAL", 60)),
+    # the hourly buckets must cover the 24h window
+    "HOURLY_RETENTION": int(os.getenv("TRENDING_HOURLY_RETENTION", 48)),
+    "DAILY_RETENTION": int(os.getenv("TRENDING_DAILY_RETENTION", 8)),
+    "COMPACTION_INTERVAL": int(os.getenv("TRENDING_COMPACTION_INTERVAL", 3600)),
+}
+
+# SQL, serialization and render timings of a share of the requests, see server.timing and /metrics
+REQUEST_TIMING = {
+    "ENABLED": bool(int(os.getenv("REQUEST_TIMING_ENABLED", 1))),
+    "SAMPLE_RATE": float(os.getenv("REQUEST_TIMING_SAMPLE_RATE", 0.1)),
+    "SERVER_TIMING_HEADER": bool(int(os.getenv("REQUEST_TIMING_SERVER_TIMING_HEADER", 1))),
+}
+
+# /metrics, see server.metrics
+METRICS = {
+    # the scrapers' addresses, separated by commas, e.g. 10.0.0.0/8
+    "ALLOWED_NETWORKS": [
+        network.strip()
+        for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1,::1").split(",")
+        if network.strip()
+    ],
+    # where the workers of server.supervisor share their metrics, set by the supervisor
+    "MULTIPROCESS_DIR": os.getenv("METRICS_MULTIPROCESS_DIR"),
+    "WRITE_INTERVAL": float(os.getenv("METRICS_WRITE_INTERVAL", 5)),
+}
+
+# responses compressed with the encoding negotiated from Accept-Encoding, see server.compression
+COMPRESSION = {
+    "ENABLED": bool(int(os.getenv("COMPRESSION_ENABLED", 1))),
+    # smaller responses fit in a packet or two anyway
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    "LEVELS": {"zstd": 3, "br": 4, "gzip": 5},
+    "CONTENT_TYPES": (
+        "application/json",
+        "application/vnd.quotes.compact+json",
+        "application/vnd.oai.openapi",
+        "application/vnd.oai.openapi+json",
+        "text/csv",
+        "text/plain",
+    ),
+}
+
+# list and retrieve served by async views under ASGI, see quotes.async_views
+ASYNC_READ_VIEWS = bool(int(os.getenv("ASYNC_READ_VIEWS", 1)))
+
+# most ids read by one batch-get request
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", 100))
+# most authors or tags listed by the top endpoints
+LEADERBOARD_MAX_SIZE = int(os.getenv("LEADERBOARD_MAX_SIZE", 100))
+# most suggestions listed by /authors/autocomplete and /tags/autocomplete
+AUTOCOMPLETE_MAX_SIZE = int(os.getenv("AUTOCOMPLETE_MAX_SIZE", 50))
+# most quotes created or updated by one bulk request
+BULK_WRITE_MAX_QUOTES = int(os.getenv("BULK_WRITE_MAX_QUOTES", 500))
+
+# cached API responses, see quotes.cache
+RESPONSE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300)),
+}
@@ -0,0 +1,213 @@
+"""
+Serves the ASGI application with several daphne workers sharing one listening socket:
+
+    python -m server.supervisor server.asgi:application --workers 4
+
+The supervisor binds the socket, starts `WEB_WORKERS` processes of `server.worker` on it (one per CPU by default)
+and starts a new one whenever one exits. Workers restart themselves gracefully after `WEB_MAX_REQUESTS` requests
+or once they use more than `WEB_MAX_MEMORY_MB` megabytes, see `server.worker`. SIGTERM and SIGINT drain every
+worker, killing the ones still running after `WEB_GRACEFUL_TIMEOUT` seconds, and SIGHUP replaces them all,
+e.g. to pick up new code. Options default to the environment variables named in their help.
+The workers share their metrics through the `METRICS_MULTIPROCESS_DIR` directory, a temporary one unless set,
+so that `/metrics` serves the sum of them all, see `server.metrics`.
+The supervisor itself imports neither Django nor twisted.
+"""
+import argparse
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger("server.supervisor")
+
+# a worker exiting with an error sooner than this after its start is not restarted right away, e.g. on a broken import
+MIN_UPTIME = 2.0
+RESPAWN_DELAY = 5.0
+# on top of the graceful timeout of the workers, before killing them
+KILL_DELAY = 5.0
+POLL_INTERVAL = 0.2
+
+
+def default_workers() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_parser(description: str = __doc__) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("application", nargs="?", default="server.asgi:application")
+    parser.add_argument("-b", "--bind", default=os.getenv("WEB_BIND", "0.0.0.0"), help="WEB_BIND")
+    parser.add_argument("-p", "--port", type=int, default=int(os.getenv("WEB_PORT", 8001)), help="WEB_PORT")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("WEB_BACKLOG", 2048)), help="WEB_BACKLOG")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=int(os.getenv("WEB_WORKERS", 0)) or default_workers(), help="WEB_WORKERS"
+    )
+    parser.add_argument(
+        "--max-requests", type=int, default=int(os.getenv("WEB_MAX_REQUESTS", 0)),
+        help="WEB_MAX_REQUESTS, 0 for no limit",
+    )
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=int(os.getenv("WEB_MAX_REQUESTS_JITTER", 0)),
+        help="WEB_MAX_REQUESTS_JITTER, added at random to the limit of each worker, so they do not restart together",
+    )
+    parser.add_argument(
+        "--max-memory", type=int, default=int(os.getenv("WEB_MAX_MEMORY_MB", 0)),
+        help="WEB_MAX_MEMORY_MB, resident memory of a worker, 0 for no limit",
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=float, default=float(os.getenv("WEB_GRACEFUL_TIMEOUT", 30)),
+        help="WEB_GRACEFUL_TIMEOUT, seconds given to the requests and WebSockets in flight when a worker stops",
+    )
+    return parser
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    # shared by the workers, each accepting from its own event loop
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.socket = None
+        # a process per slot, `None` while waiting to respawn it
+        self.workers = []
+        self.respawn_at = []
+        self.started = {}
+        # replaced on SIGHUP, still draining
+        self.retiring = []
+        self.stopping = False
+        self.reloading = False
+        self.metrics_dir = None
+        self.owns_metrics_dir = False
+
+    def command(self) -> list[str]:
+        args = self.args
+        return [
+            sys.executable, "-m", "server.worker", args.application,
+            "--fd", str(self.socket.fileno()),
+            "--workers", str(args.workers),
+            "--max-requests", str(args.max_requests),
+            "--max-requests-jitter", str(args.max_requests_jitter),
+            "--max-memory", str(args.max_memory),
+            "--graceful-timeout", str(args.graceful_timeout),
+        ]
+
+    def spawn(self) -> subprocess.Popen:
+        env = {**os.environ, "METRICS_MULTIPROCESS_DIR": self.metrics_dir}
+        worker = subprocess.Popen(self.command(), pass_fds=(self.socket.fileno(),), env=env)
+        self.started[worker.pid] = time.monotonic()
+        logger.info("Started worker %s", worker.pid)
+        return worker
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def handle_reload(self, signum, frame) -> None:
+        self.reloading = True
+
+    def reap(self) -> None:
+        now = time.monotonic()
+        for index, worker in enumerate(self.workers):
+            if worker is None:
+                if now >= self.respawn_at[index]:
+                    self.workers[index] = self.spawn()
+                continue
+            code = worker.poll()
+            if code is None:
+                continue
+            uptime = now - self.started.pop(worker.pid)
+            if code != 0 and uptime < MIN_UPTIME:
+                logger.error(
+                    "Worker %s exited with %s after %.1fs, restarting it in %ss",
+                    worker.pid, code, uptime, RESPAWN_DELAY,
+                )
+                self.workers[index] = None
+                self.respawn_at[index] = now + RESPAWN_DELAY
+                continue
+            logger.info("Worker %s exited with %s, restarting it", worker.pid, code)
+            self.workers[index] = self.spawn()
+        for worker in self.retiring:
+            if worker.poll() is not None:
+                self.started.pop(worker.pid, None)
+        self.retiring = [worker for worker in self.retiring if worker.returncode is None]
+
+    def reload(self) -> None:
+        """Starts new workers, the old ones drain their connections meanwhile."""
+        self.reloading = False
+        logger.info("Replacing %s workers", len(self.workers))
+        for index, worker in enumerate(self.workers):
+            self.workers[index] = self.spawn()
+            if worker is not None and worker.poll() is None:
+                worker.terminate()
+                self.retiring.append(worker)
+
+    def stop(self) -> None:
+        workers = [worker for worker in [*self.workers, *self.retiring] if worker is not None]
+        logger.info("Stopping %s workers", len(workers))
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+        deadline = time.monotonic() + self.args.graceful_timeout + KILL_DELAY
+        for worker in workers:
+            try:
+                worker.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                logger.warning("Worker %s did not stop in time, killing it", worker.pid)
+                worker.kill()
+                worker.wait()
+        self.socket.close()
+        if self.owns_metrics_dir:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def prepare_metrics_dir(self) -> None:
+        self.metrics_dir = os.getenv("METRICS_MULTIPROCESS_DIR")
+        if not self.metrics_dir:
+            self.metrics_dir = tempfile.mkdtemp(prefix="quotes-metrics-")
+            self.owns_metrics_dir = True
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        # the values of a previous run
+        for entry in os.scandir(self.metrics_dir):
+            if entry.name.endswith(".json"):
+                os.remove(entry.path)
+
+    def run(self) -> None:
+        args = self.args
+        self.socket = bind(args.bind, args.port, args.backlog)
+        self.prepare_metrics_dir()
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        logger.info("Listening on %s:%s with %s workers", args.bind, args.port, args.workers)
+        self.workers = [self.spawn() for _ in range(args.workers)]
+        self.respawn_at = [0.0] * args.workers
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+            self.reap()
+            time.sleep(POLL_INTERVAL)
+        self.stop()
+
+
+def main():
+    args = get_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s %(message)s")
+    Supervisor(args).run()
+
+
+if __name__ == "__main__":
+    main()
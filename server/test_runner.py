@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests without the notification outbox worker: its thread would publish to the configured channel layer
+    in the background, e.g. to a redis nobody started. Events wait for `flush()`, see `notifications.tests`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._outbox_override = override_settings(NOTIFICATION_OUTBOX={"WINDOW": 0, "MAX_BATCH": 1000})
+        self._outbox_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._outbox_override.disable()
+        super().teardown_test_environment(**kwargs)
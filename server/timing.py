@@ -0,0 +1,161 @@
+"""
+Per-request timing of SQL, serialization and rendering, for a sampled share of the requests.
+The spans are sent back in the `Server-Timing` header and observed by the histograms of `server.metrics`.
+Requests which are not sampled only pay for a context variable lookup at each hook.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import renderers, serializers
+
+from server import metrics
+
+_current_timing = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.durations = {"db": 0.0, "serialize": 0.0, "render": 0.0}
+        self.queries = 0
+        self._open_spans = set()
+
+    @contextmanager
+    def span(self, name: str):
+        # nested spans of the same kind, e.g. a serializer serializing its fields, are counted once
+        if name in self._open_spans:
+            yield
+            return
+        self._open_spans.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started
+            self._open_spans.discard(name)
+
+    def server_timing(self, total: float) -> str:
+        entries = [f'db;dur={self.durations["db"] * 1000:.1f};desc="{self.queries} queries"']
+        entries.extend(f"{name};dur={self.durations[name] * 1000:.1f}" for name in ("serialize", "render"))
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def measure(name: str):
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    with timing.span(name):
+        yield
+
+
+def sql_timer(execute, sql, params, many, context):
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    timing.queries += 1
+    with timing.span("db"):
+        return execute(sql, params, many, context)
+
+
+def install_sql_timer(connection, **kwargs):
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+# connections may be reopened on every request, the wrapper is kept once per connection object
+connection_created.connect(install_sql_timer)
+
+
+class TimedSerializerMixin:
+    """Times `data` of the outermost serializer, add `list_serializer_class = TimedListSerializer` for `many=True`."""
+
+    @property
+    def data(self):
+        with measure("serialize"):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class TimedRendererMixin:
+    def render(self, *args, **kwargs):
+        with measure("render"):
+            return super().render(*args, **kwargs)
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, renderers.BrowsableAPIRenderer):
+    pass
+
+
+class RequestTimingMiddleware:
+    """
+    Observes the duration of every request per route, and for the sampled ones (`REQUEST_TIMING["SAMPLE_RATE"]`)
+    the time spent in SQL, serializers and renderers, also reported in the `Server-Timing` header.
+    Keep it first in `MIDDLEWARE`. Works without a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install_sql_timer(connection)
+
+    @staticmethod
+    def _start():
+        config = settings.REQUEST_TIMING
+        if not config["ENABLED"]:
+            return None, None, None
+        timing = RequestTiming() if random.random() < config["SAMPLE_RATE"] else None
+        return time.perf_counter(), timing, _current_timing.set(timing)
+
+    @staticmethod
+    def _finish(request, response, started, timing):
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        labels = (match.view_name if match else "unmatched", request.method)
+        metrics.REQUEST_DURATION.observe(total, *labels, str(response.status_code))
+        if timing is None:
+            return response
+
+        metrics.DB_DURATION.observe(timing.durations["db"], *labels)
+        metrics.DB_QUERIES.observe(timing.queries, *labels)
+        metrics.SERIALIZE_DURATION.observe(timing.durations["serialize"], *labels)
+        metrics.RENDER_DURATION.observe(timing.durations["render"], *labels)
+        if settings.REQUEST_TIMING["SERVER_TIMING_HEADER"]:
+            response["Server-Timing"] = timing.server_timing(total)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, timing, token = self._start()
+        if started is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self._finish(request, response, started, timing)
+
+    async def __acall__(self, request):
+        started, timing, token = self._start()
+        if started is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self._finish(request, response, started, timing)
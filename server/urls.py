@@ -21,6 +21,7 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 from quotes.views import index
+from server.metrics import metrics_view
 
 docs_urlpatterns = [
     path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -32,5 +33,6 @@ docs_urlpatterns = [
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('quotes.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path("", index, name='quotes-index')
 ] + docs_urlpatterns + static(settings.STATIC_URL, docement_root=settings.STATIC_ROOT)
@@ -0,0 +1,181 @@
+"""
+A worker of `server.supervisor`, serving the ASGI application with daphne on the listening socket it inherits.
+It stops gracefully on SIGTERM and SIGINT, after `--max-requests` HTTP requests or once its resident memory
+exceeds `--max-memory` megabytes: it stops accepting connections, closes its WebSockets with 1001 (going away),
+so that the clients reconnect to another worker, and waits up to `--graceful-timeout` seconds for the requests
+and the consumers in flight. WebSocket groups span the workers through the Redis channel layer.
+"""
+# daphne.server installs the asyncio reactor, which has to happen before anything imports twisted.internet.reactor
+from daphne.server import Server  # isort:skip
+
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from daphne.utils import import_by_path
+from daphne.ws_protocol import WebSocketProtocol
+from django.conf import settings
+from twisted.internet import reactor, task
+
+from server.metrics import registry
+from server.supervisor import get_parser
+
+logger = logging.getLogger("server.worker")
+
+MEMORY_CHECK_INTERVAL = 5.0
+DRAIN_CHECK_INTERVAL = 0.1
+
+# backends keeping their state in the memory of each worker
+PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "channels.layers.InMemoryChannelLayer",
+}
+
+
+def get_rss() -> int:
+    """The resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # the peak rather than the current size, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def check_shared_state(workers: int) -> list[str]:
+    """Warns about the caches and channel layers that the workers would not share."""
+    if workers < 2:
+        return []
+    warnings = []
+    for setting in ("CACHES", "CHANNEL_LAYERS"):
+        for alias, config in getattr(settings, setting, {}).items():
+            if config.get("BACKEND") in PROCESS_LOCAL_BACKENDS:
+                warnings.append(
+                    f"{setting}[{alias!r}] uses {config['BACKEND']}, each of the {workers} workers has its own, "
+                    f"set REDIS_DB_CONNECTION_URL to share it."
+                )
+    for warning in warnings:
+        logger.warning(warning)
+    return warnings
+
+
+class WorkerServer(Server):
+    """A daphne server on an inherited socket, draining its connections before it stops."""
+
+    def __init__(self, application, fd: int, max_requests: int = 0, max_memory: int = 0,
+                 graceful_timeout: float = 30.0, **kwargs):
+        sock = socket.socket(fileno=fd)
+        self.family = sock.family
+        sock.detach()
+        super().__init__(
+            self.serve, endpoints=[f"fd:fileno={fd}"], signal_handlers=False, ready_callable=self.ready, **kwargs
+        )
+        # adopted in `ready`, twisted has no string endpoint for an inherited socket
+        self.endpoints = []
+        self.fd = fd
+        self.listen_failed = False
+        self.wrapped_application = application
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.graceful_timeout = graceful_timeout
+        self.requests = 0
+        self.ports = []
+        self.draining = False
+        self.drain_deadline = None
+        self.metrics_dir = settings.METRICS["MULTIPROCESS_DIR"]
+        self.metrics_write_interval = settings.METRICS["WRITE_INTERVAL"]
+
+    async def serve(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.requests += 1
+            if self.max_requests and self.requests >= self.max_requests:
+                self.drain(f"served {self.requests} requests")
+        return await self.wrapped_application(scope, receive, send)
+
+    def ready(self) -> None:
+        try:
+            self.listen_success(reactor.adoptStreamPort(self.fd, self.family, self.http_factory))
+        except OSError as exc:
+            logger.critical("Listen failure: %s", exc)
+            self.listen_failed = True
+            reactor.callWhenRunning(self.stop)
+            return
+        loop = reactor._asyncioEventloop
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.drain, f"received {signal.Signals(signum).name}")
+        if self.max_memory:
+            task.LoopingCall(self.check_memory).start(MEMORY_CHECK_INTERVAL, now=False)
+        if self.metrics_dir:
+            task.LoopingCall(registry.write, self.metrics_dir).start(self.metrics_write_interval)
+
+    def listen_success(self, port):
+        self.ports.append(port)
+        super().listen_success(port)
+
+    def check_memory(self) -> None:
+        if (rss := get_rss()) > self.max_memory:
+            self.drain(f"uses {rss // 2 ** 20}MB")
+
+    def drain(self, reason: str) -> None:
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Worker %s %s, draining its connections", os.getpid(), reason)
+        # the other workers keep accepting on the socket, the ports are duplicates of it
+        for port in self.ports:
+            port.stopListening()
+        for protocol, details in list(self.connections.items()):
+            if isinstance(protocol, WebSocketProtocol) and "disconnected" not in details:
+                protocol.serverClose(code=1001)
+        self.drain_deadline = time.monotonic() + self.graceful_timeout
+        self.wait_for_connections()
+
+    def wait_for_connections(self) -> None:
+        # connections are forgotten once closed and their application instance is done, see `application_checker`
+        if self.connections and time.monotonic() < self.drain_deadline:
+            reactor.callLater(DRAIN_CHECK_INTERVAL, self.wait_for_connections)
+            return
+        if self.connections:
+            logger.warning("Worker %s stops with %s connections left", os.getpid(), len(self.connections))
+        self.stop()
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument("--fd", type=int, required=True, help="the listening socket, inherited from the supervisor")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s %(message)s")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+
+    application = import_by_path(args.application)
+    check_shared_state(args.workers)
+    max_requests = args.max_requests
+    if max_requests:
+        max_requests += random.randint(0, args.max_requests_jitter)
+    server = WorkerServer(
+        application,
+        args.fd,
+        max_requests=max_requests,
+        max_memory=args.max_memory * 2 ** 20,
+        graceful_timeout=args.graceful_timeout,
+    )
+    server.run()
+
+    from server.db.pool import close_pools
+
+    close_pools()
+    if server.metrics_dir:
+        # the counters of the worker outlive it
+        registry.archive(server.metrics_dir)
+    if server.listen_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()